@@ -0,0 +1,100 @@
+import math
+
+import numpy as np
+import pytest
+
+from vizg.arcFitting import ArcFitter
+from vizg.modals import word_code
+from vizg.parser import GCodeParser
+from vizg.program import Program
+
+TOLERANCE = 0.0005
+
+
+def parse(text):
+    program = Program(1)
+    for block in GCodeParser().iter_blocks(text.split("\n")):
+        program.add_block(block)
+    return program
+
+
+def sampled_path(program, samples=400):
+    """XY points along the programmed path, with arcs sampled finely (G90, G17 programs only)."""
+    motion = None
+    x, y = 0.0, 0.0
+    points = []
+    for block in program.blocks:
+        words = {word.address.__name__: word for word in block.words}
+        if "G" in words and word_code(words["G"]) in (0, 1, 2, 3):
+            motion = word_code(words["G"])
+        if "X" not in words and "Y" not in words:
+            continue
+        end_x = float(words["X"].numeric) if "X" in words else x
+        end_y = float(words["Y"].numeric) if "Y" in words else y
+        if motion in (2, 3):
+            cx, cy = x + float(words["I"].numeric), y + float(words["J"].numeric)
+            start, end = math.atan2(y - cy, x - cx), math.atan2(end_y - cy, end_x - cx)
+            sweep = (end - start) % (2 * math.pi)
+            if motion == 2:
+                sweep -= 2 * math.pi
+            start_radius, end_radius = math.hypot(x - cx, y - cy), math.hypot(end_x - cx, end_y - cy)
+            for t in np.linspace(0.0, 1.0, samples)[1:]:
+                radius = start_radius + t * (end_radius - start_radius)
+                points.append((cx + radius * math.cos(start + t * sweep), cy + radius * math.sin(start + t * sweep)))
+        else:
+            points.append((end_x, end_y))
+        x, y = end_x, end_y
+    return np.array(points)
+
+
+def deviation(points, polyline):
+    """Largest distance from a point to the polyline."""
+    start = polyline[:-1]
+    segment = polyline[1:] - start
+    offsets = points[:, None, :] - start[None, :, :]
+    length = np.maximum(np.einsum("ij,ij->i", segment, segment), 1e-30)
+    t = np.clip(np.einsum("pij,ij->pi", offsets, segment) / length, 0.0, 1.0)
+    distances = np.linalg.norm(offsets - t[..., None] * segment, axis=2)
+    return distances.min(axis=1).max()
+
+
+def contour():
+    """Quarter circle, straight line, then a half circle turning the other way, as G01 moves."""
+    lines = ["G90", "G17", "G00 X2. Y0", "G01 Z-0.1 F25."]
+    for degrees in range(1, 91):
+        angle = math.radians(degrees)
+        lines.append(f"X{2 * math.cos(angle):.4f} Y{2 * math.sin(angle):.4f}")
+    for step in range(1, 5):
+        lines.append(f"X{-0.5 * step:.4f} Y2.")
+    for degrees in range(2, 181, 2):
+        angle = math.radians(90 - degrees)
+        lines.append(f"X{-2 + 1.5 * math.cos(angle):.4f} Y{0.5 + 1.5 * math.sin(angle):.4f}")
+    lines.append("G00 Z1.")
+    return "\n".join(lines)
+
+
+def test_arcs_replace_circular_runs():
+    program = parse(contour())
+    fitter = ArcFitter(TOLERANCE)
+    fitted = fitter.fit(program)
+    assert fitter.arcs >= 2
+    assert len(fitted.blocks) == len(program.blocks) - fitter.removed_blocks
+    text = [str(block) for block in fitted.blocks]
+    assert any(line.startswith("G02") for line in text) and any(line.startswith("G03") for line in text)
+    fitted.validate()
+
+
+@pytest.mark.parametrize("tolerance", [0.0005, 0.002])
+def test_deviation_stays_within_tolerance(tolerance):
+    program = parse(contour())
+    fitted = ArcFitter(tolerance).fit(program)
+    original = sampled_path(program)
+    arcs = sampled_path(fitted)
+    assert deviation(original, arcs) <= tolerance + 1e-6
+    assert deviation(arcs, original) <= tolerance + 1e-6
+
+
+def test_straight_runs_are_left_alone():
+    program = parse("G90\nG17\nG00 X0 Y0\nG01 X1. F10.\nX2.\nX3.\nX4.\nX5.")
+    fitted = ArcFitter(TOLERANCE).fit(program)
+    assert [str(block) for block in fitted.blocks] == [str(block) for block in program.blocks]
@@ -0,0 +1,37 @@
+import pytest
+
+from vizg.block import Block
+from vizg.words import XWord, YWord
+
+
+def block(*words):
+    b = Block()
+    for word in words:
+        b.add_word(word)
+    return b
+
+
+def test_unfrozen_blocks_compare_by_identity():
+    first, second = block(XWord(1)), block(XWord(1))
+    assert first != second
+    blocks = [first, second]
+    blocks.remove(second)
+    assert blocks == [first] and blocks[0] is first
+    assert len({first, second}) == 2
+
+
+def test_frozen_blocks_are_values():
+    first, second = block(XWord(1), YWord(2)).freeze(), block(XWord(1), YWord(2)).freeze()
+    assert first == second and hash(first) == hash(second)
+    assert len({first, second}) == 1
+    with pytest.raises(AttributeError):
+        first.add_word(XWord(3))
+
+
+def test_hashed_blocks_cannot_be_frozen():
+    b = block(XWord(1))
+    blocks = {b: 1}
+    with pytest.raises(TypeError):
+        b.freeze()
+    assert not b.frozen and blocks[b] == 1
+    b.add_word(YWord(2))
@@ -0,0 +1,44 @@
+from vizg.block import Block
+from vizg.words import XWord, YWord, ZWord
+
+
+def block(*words):
+    b = Block()
+    for word in words:
+        b.add_word(word)
+    return b
+
+
+def test_text_is_rendered_once():
+    b = block(XWord(1, precision=4), YWord(2, precision=4))
+    text = repr(b)
+    assert text == "X1.0000 Y2.0000"
+    assert repr(b) is text
+
+
+def test_edits_invalidate_the_text():
+    b = block(XWord(1, precision=4))
+    assert repr(b) == "X1.0000"
+    b.add_word(YWord(2, precision=4))
+    assert repr(b) == "X1.0000 Y2.0000"
+    b.insert_word(0, ZWord(3, precision=4))
+    assert repr(b) == "Z3.0000 X1.0000 Y2.0000"
+    b.replace_word(1, XWord(5, precision=4))
+    assert repr(b) == "Z3.0000 X5.0000 Y2.0000"
+    assert repr(b.remove_word(0)) == "Z3.0000"
+    assert repr(b) == "X5.0000 Y2.0000"
+
+
+def test_direct_edits_need_invalidate():
+    b = block(XWord(1, precision=4))
+    assert repr(b) == "X1.0000"
+    b.words.append(YWord(2, precision=4))
+    assert repr(b) == "X1.0000"
+    b.invalidate()
+    assert repr(b) == "X1.0000 Y2.0000"
+
+
+def test_frozen_blocks_keep_their_text():
+    b = block(XWord(1, precision=4))
+    text = repr(b)
+    assert repr(b.freeze()) == text
@@ -0,0 +1,83 @@
+import math
+
+from vizg.changes import ChangeSet, Subscription
+from vizg.machine import Machine
+from vizg.macroStorage import MACRO_RANGES
+
+
+def subscribed(ranges=None):
+    machine = Machine("test")
+    received = []
+    machine.subscribe(received.append, ranges)
+    return machine, received
+
+
+def test_each_set_is_delivered_outside_a_transaction():
+    machine, received = subscribed()
+    machine.set_macro_variable(100, 1.0)
+    machine.set_macro_variable(100, 2.0)
+    assert [dict(changes) for changes in received] == [{100: (0.0, 1.0)}, {100: (1.0, 2.0)}]
+
+
+def test_transactions_coalesce_changes():
+    machine, received = subscribed()
+    with machine.transaction():
+        machine.set_macro_variable(100, 1.0)
+        machine.set_macro_variable(100, 2.0)
+        machine.set_macro_variable(101, 5.0)
+        with machine.transaction():
+            machine.set_macro_variable(101, 0.0)  # Back to its old value
+        assert received == []
+    assert len(received) == 1
+    assert dict(received[0]) == {100: (0.0, 2.0)}
+    assert received[0].new_values() == {100: 2.0}
+
+
+def test_unchanged_values_are_not_delivered():
+    machine, received = subscribed()
+    machine.set_macro_variable(100, 0.0)
+    assert received == []
+
+
+def test_subscriptions_filter_by_range():
+    machine, received = subscribed([(500, 600), 100])
+    machine.set_macro_variables(100, [1.0, 2.0])
+    machine.set_macro_variable(550, 3.0)
+    assert [sorted(changes) for changes in received] == [[100], [550]]
+
+
+def test_subscription_ranges():
+    subscription = Subscription(print, [MACRO_RANGES[0], (500, 510), 3000])
+    assert subscription.matches(MACRO_RANGES[0].start)
+    assert subscription.matches(509) and not subscription.matches(510)
+    assert subscription.matches(3000) and not subscription.matches(3001)
+    assert Subscription(print).matches(12345)
+
+
+def test_deferred_delivery():
+    machine, received = subscribed()
+    machine.auto_flush = False
+    machine.set_macro_variable(100, 1.0)
+    machine.set_macro_variable(100, 2.0)
+    assert received == []
+    assert dict(machine.flush_changes()) == {100: (0.0, 2.0)}
+    assert len(received) == 1
+    assert machine.flush_changes() == ChangeSet()
+
+
+def test_unsubscribe():
+    machine = Machine("test")
+    received = []
+    subscription = machine.subscribe(received.append)
+    machine.unsubscribe(subscription)
+    machine.set_macro_variable(100, 1.0)
+    assert received == []
+
+
+def test_vacant_values_compare_equal():
+    machine, received = subscribed()
+    machine.set_macro_variable(100, math.nan)
+    machine.set_macro_variable(100, math.nan)
+    assert len(received) == 1
+    old, new = received[0][100]
+    assert old == 0.0 and math.isnan(new)
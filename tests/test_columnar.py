@@ -0,0 +1,56 @@
+import numpy as np
+
+from vizg.columnar import ColumnarProgram
+from vizg.parser import GCodeParser
+from vizg.program import Program
+
+
+def parse(text):
+    program = Program(1)
+    for block in GCodeParser().iter_blocks(text.split("\n")):
+        program.add_block(block)
+    return program
+
+
+PROGRAM = """G00 X1.5 Y2.;
+G01 Z-0.5 F10.;
+X#101 Y3.;
+#101 = #101 + 1;
+X2.25;
+M30;"""
+
+
+def texts(program):
+    return [repr(block) for block in program.blocks]
+
+
+def test_round_trip_keeps_every_block():
+    program = parse(PROGRAM)
+    columnar = ColumnarProgram.from_program(program)
+    assert len(columnar) == len(program.blocks)
+    assert texts(columnar.to_program()) == texts(program)
+    assert [repr(block) for block in columnar] == texts(program)
+
+
+def test_values_and_block_queries():
+    columnar = ColumnarProgram.from_program(parse(PROGRAM))
+    assert np.allclose(columnar.values("X"), [1.5, 2.25])  # X#101 is not a plain value
+    assert list(columnar.blocks_with("G", 1)) == [1]
+    assert list(columnar.blocks_with("X")) == [0, 2, 4]
+
+
+def test_offset_returns_a_shifted_copy():
+    columnar = ColumnarProgram.from_program(parse(PROGRAM))
+    shifted = columnar.offset("X", 1.0)
+    assert np.allclose(shifted.values("X"), [2.5, 3.25])
+    assert np.allclose(columnar.values("X"), [1.5, 2.25])
+    assert texts(shifted.to_program())[1:4] == texts(columnar.to_program())[1:4]
+
+
+def test_select_blocks():
+    columnar = ColumnarProgram.from_program(parse(PROGRAM))
+    selected = columnar.select([0, 4])
+    assert texts(selected.to_program()) == [repr(columnar.block(0)), repr(columnar.block(4))]
+    mask = np.zeros(len(columnar), dtype=bool)
+    mask[1] = True
+    assert texts(columnar.select(mask).to_program()) == [repr(columnar.block(1))]
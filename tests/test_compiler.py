@@ -0,0 +1,70 @@
+import pytest
+
+from vizg import compiler
+from vizg.compiler import compile_expression, compiled_count, evaluate, expression_key
+from vizg.interpreter import MacroInterpreter
+from vizg.machine import Machine
+from vizg.parser import GCodeParser
+from vizg.program import Program
+
+
+def expression(text):
+    return GCodeParser().parse_line(f"#100 = {text}").words[2]
+
+
+def machine(**values):
+    m = Machine("test")
+    for name, value in values.items():
+        m.set_macro_variable(int(name[1:]), value)
+    return m
+
+
+def test_evaluate_against_a_machine():
+    m = machine(v101=10.0, v102=4.0)
+    assert evaluate(expression("#101 + [#102 * 2.5]"), m) == pytest.approx(20.0)
+    assert evaluate(expression("#101 - #102 / 2."), m) == pytest.approx(8.0)
+    assert evaluate(expression("[#101 - #102] / 2."), m) == pytest.approx(3.0)
+
+
+def test_same_structure_shares_one_evaluator():
+    first, second = expression("#101 * [#102 + 1.5]"), expression("#101 * [#102 + 1.5]")
+    assert first is not second
+    assert expression_key(first) == expression_key(second)
+    compile_expression(first)
+    count = compiled_count()
+    compile_expression(second)
+    assert compiled_count() == count
+    assert expression_key(expression("#101 * [#103 + 1.5]")) != expression_key(first)
+
+
+def test_interpreter_uses_compiled_evaluators():
+    m = machine(v101=3.0)
+    program = Program(1)
+    for block in GCodeParser().iter_blocks(["#100 = #101 * 2. + 1.", "#102 = #100 / #101"]):
+        program.add_block(block)
+    MacroInterpreter(m).execute(program)
+    assert float(m.get_macro_variable(100)) == pytest.approx(7.0)
+    assert float(m.get_macro_variable(102)) == pytest.approx(7.0 / 3.0)
+
+
+def test_unknown_operands_raise():
+    with pytest.raises(ValueError):
+        compile_expression("not an expression")
+
+
+def test_constants_do_not_compile_new_functions():
+    m = machine(v101=2.0)
+    compile_expression(expression("#101 * 3. + 1."))
+    count = compiled_count()
+    for n in range(50):
+        assert evaluate(expression(f"#101 * {n}. + 0.5"), m) == pytest.approx(2.0 * n + 0.5)
+    assert compiled_count() == count
+
+
+def test_compiled_functions_are_bounded(monkeypatch):
+    monkeypatch.setattr(compiler, "_COMPILED_SIZE", 5)
+    for n in range(20):
+        compile_expression(expression(f"#{100 + n} + 1."))
+    assert compiled_count() <= 5
+    m = machine(v101=1.0)
+    assert evaluate(expression("#101 + 1."), m) == pytest.approx(2.0)
@@ -0,0 +1,84 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from vizg.decimation import PolylineDecimator, douglas_peucker
+from vizg.parser import GCodeParser
+from vizg.program import Program
+
+TOLERANCE = 0.0005
+
+
+def parse(text):
+    program = Program(1)
+    for block in GCodeParser().iter_blocks(text.split("\n")):
+        program.add_block(block)
+    return program
+
+
+def path(program):
+    """X/Y/Z position after every block that moves (absolute programs only)."""
+    position = {"X": 0.0, "Y": 0.0, "Z": 0.0}
+    points = []
+    for block in program.blocks:
+        axes = {word.address.__name__: float(word.numeric) for word in block.words if word.address.__name__ in position}
+        if axes:
+            position.update(axes)
+            points.append((position["X"], position["Y"], position["Z"]))
+    return np.array(points)
+
+
+def deviation(points, polyline):
+    """Largest distance from a point to the polyline."""
+    start = polyline[:-1]
+    segment = polyline[1:] - start
+    offsets = points[:, None, :] - start[None, :, :]
+    length = np.maximum(np.einsum("ij,ij->i", segment, segment), 1e-30)
+    t = np.clip(np.einsum("pij,ij->pi", offsets, segment) / length, 0.0, 1.0)
+    distances = np.linalg.norm(offsets - t[..., None] * segment, axis=2)
+    return distances.min(axis=1).max()
+
+
+def noisy_curve(count, seed):
+    rng = random.Random(seed)
+    lines = ["G90 G00 X0 Y0 Z0.1", "G01 Z-0.1 F30."]
+    for i in range(1, count):
+        angle = i / count * math.pi
+        x = 3 * math.cos(angle) + rng.uniform(-0.0002, 0.0002)
+        y = 2 * math.sin(angle) + 0.001 * i + rng.uniform(-0.0002, 0.0002)
+        lines.append(f"X{x:.4f} Y{y:.4f}")
+    lines.append("G00 Z1.")
+    return "\n".join(lines)
+
+
+def test_douglas_peucker_keeps_points_outside_tolerance():
+    points = np.array([(0.0, 0.0), (1.0, 0.0001), (2.0, 0.0), (3.0, 1.0)])
+    assert douglas_peucker(points, 0.001).tolist() == [True, False, True, True]
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_deviation_stays_within_tolerance(seed):
+    program = parse(noisy_curve(800, seed))
+    decimator = PolylineDecimator(TOLERANCE)
+    decimated = decimator.decimate(program)
+    assert decimator.removed_blocks > 0
+    assert len(decimated.blocks) == len(program.blocks) - decimator.removed_blocks
+    assert deviation(path(program), path(decimated)) <= TOLERANCE + 1e-9
+
+
+def test_feed_changes_and_jump_targets_are_kept():
+    text = "G90 G00 X0 Y0\nG01 X1. F10.\nX2.\nX3. F20.\nN10 X4.\nX5.\nX6.\nM99 P10"
+    decimated = PolylineDecimator(TOLERANCE).decimate(parse(text))
+    lines = [str(block) for block in decimated.blocks]
+    assert any("F20.0" in line for line in lines)
+    assert any(line.startswith("N10") for line in lines)
+
+
+def test_state_is_forgotten_at_jump_targets():
+    # Y is 5 when M99 P10 jumps back, so X2 Y1 is not on the line from N10 to X3 Y2
+    text = "G90 G01 X0 Y0 F10.\nN10 X1.\nX2. Y1.\nX3. Y2.\nY5.\nM99 P10"
+    program = parse(text)
+    decimated = PolylineDecimator(TOLERANCE).decimate(program)
+    assert [str(block) for block in decimated.blocks] == [str(block) for block in program.blocks]
@@ -0,0 +1,48 @@
+import pytest
+
+from vizg.fleet import MachineFleet
+from vizg.interpreter import MacroInterpreter
+from vizg.machine import Machine
+from vizg.parser import GCodeParser
+from vizg.program import Program
+
+
+def parse(text, o_number=1):
+    program = Program(o_number)
+    for block in GCodeParser().iter_blocks(text.split("\n")):
+        program.add_block(block)
+    return program
+
+
+def test_machines_take_different_iteration_counts():
+    fleet = MachineFleet.replicate(Machine("test"), 4)
+    fleet.set(100, [1, 2, 3, 4])
+    fleet.execute(parse("#101 = 0\nWHILE [#101 LT #100] DO1\n#101 = #101 + 1.\nEND1"))
+    assert fleet.get(101).tolist() == [1.0, 2.0, 3.0, 4.0]
+
+
+@pytest.mark.parametrize("call", ["M98 P2000", "G65 P2000 A1."])
+def test_calls_to_unregistered_programs_raise(call):
+    with pytest.raises(ValueError):
+        MachineFleet.replicate(Machine("test"), 2).execute(parse(call))
+
+
+def test_g65_sets_arguments_on_every_machine():
+    macro = parse("#101 = #1 * 2.\nM99", 9000)
+    fleet = MachineFleet.replicate(Machine("test"), 3, programs=[macro])
+    fleet.execute(parse("G65 P9000 A1.5"))
+    assert fleet.get(101).tolist() == [3.0, 3.0, 3.0]
+
+
+def test_fleet_matches_the_interpreter():
+    sub = parse("#102 = #102 + #101\nM99", 2000)
+    main = parse("#101 = 0\nWHILE [#101 LT #100] DO1\n#101 = #101 + 1.\nM98 P2000\nEND1\nG65 P9832\nM98 P2000 L2\nM30\n#102 = -1.")
+    fleet = MachineFleet.replicate(Machine("test"), 3, programs=[sub])
+    fleet.set(100, [0, 2, 5])
+    fleet.execute(main)
+    for index, limit in enumerate([0, 2, 5]):
+        machine = Machine("test")
+        machine.set_macro_variable(100, limit)
+        MacroInterpreter(machine, [sub]).execute(main)
+        assert fleet.get(102)[index] == pytest.approx(float(machine.get_macro_variable(102)))
+    assert fleet.get(102).tolist() == [0.0, 7.0, 25.0]
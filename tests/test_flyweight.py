@@ -0,0 +1,38 @@
+import gc
+
+from vizg.flyweight import interned_count
+from vizg.parser import GCodeParser
+from vizg.words import G01, M06, M98, XWord
+
+
+def test_parameterless_words_are_shared():
+    assert G01() is G01()
+    assert M06() is M06()
+
+
+def test_words_with_arguments_are_not_shared():
+    assert M98(1000) is not M98(1000)
+    assert M98(1000) == M98(1000)
+
+
+def test_intern_returns_the_equal_shared_word():
+    first, second = XWord(1.5, precision=4), XWord(1.5, precision=4)
+    assert first is not second
+    assert first.intern() is second.intern()
+    assert XWord(2.5, precision=4).intern() is not first.intern()
+
+
+def test_parser_interns_repeated_words():
+    parser = GCodeParser(intern_words=True)
+    first, second = parser.parse_line("G01 X1. F10."), parser.parse_line("G01 X1. F10.")
+    assert all(a is b for a, b in zip(first.words, second.words))
+    plain = GCodeParser()
+    assert plain.parse_line("X1.").words[0] is not plain.parse_line("X1.").words[0]
+
+
+def test_unused_interned_words_are_released():
+    words = [XWord(1000 + n).intern() for n in range(10)]
+    count = interned_count()
+    del words
+    gc.collect()
+    assert interned_count() <= count - 10
@@ -0,0 +1,71 @@
+import pytest
+
+from vizg.machine import Machine
+
+
+def parent():
+    machine = Machine("parent")
+    machine.set_macro_variable(100, 1.0)
+    machine.set_macro_variable(101, 2.0)
+    return machine
+
+
+def test_fork_reads_through_to_the_parent():
+    machine = parent()
+    fork = machine.fork("child")
+    assert fork.machine_id == "child" and fork.parent is machine
+    assert fork.get_macro_variable(100) == 1.0
+    machine.set_macro_variable(101, 5.0)
+    assert fork.get_macro_variable(101) == 5.0  # Not overridden, so it follows the parent
+
+
+def test_fork_changes_stay_in_the_fork():
+    machine = parent()
+    fork = machine.fork()
+    fork.set_macro_variable(100, 10.0)
+    fork.set_macro_variables(500, [1.0, 2.0])
+    assert fork.get_macro_variable(100) == 10.0
+    assert list(fork.get_macro_variables(500, 502)) == [1.0, 2.0]
+    assert machine.get_macro_variable(100) == 1.0
+    assert machine.get_macro_variable(500) != 1.0
+    assert sorted(fork.macro_variables.overrides()) == [100, 500, 501]
+
+
+def test_merge_writes_the_changes_back():
+    machine = parent()
+    fork = machine.fork()
+    fork.set_macro_variable(100, 10.0)
+    fork.state["tool"] = 3
+    assert fork.merge() == 1
+    assert machine.get_macro_variable(100) == 10.0
+    assert machine.state["tool"] == 3
+
+
+def test_merge_conflicts():
+    machine = parent()
+    fork = machine.fork()
+    fork.set_macro_variable(100, 10.0)
+    machine.set_macro_variable(100, 20.0)
+    assert fork.macro_variables.conflicts() == [100]
+    with pytest.raises(ValueError):
+        fork.merge()
+    assert machine.get_macro_variable(100) == 20.0
+    fork.merge(force=True)
+    assert machine.get_macro_variable(100) == 10.0
+
+
+def test_forks_of_forks():
+    machine = parent()
+    child = machine.fork()
+    child.set_macro_variable(100, 3.0)
+    grandchild = child.fork()
+    assert grandchild.get_macro_variable(100) == 3.0
+    grandchild.set_macro_variable(101, 4.0)
+    grandchild.merge()
+    assert child.get_macro_variable(101) == 4.0
+    assert machine.get_macro_variable(101) == 2.0
+
+
+def test_only_forks_merge():
+    with pytest.raises(ValueError):
+        parent().merge()
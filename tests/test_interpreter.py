@@ -0,0 +1,61 @@
+import pytest
+
+from vizg.commands import ProbeOff, ProbeOn, SafeMove
+from vizg.interpreter import MacroInterpreter
+from vizg.machine import Machine
+from vizg.parser import GCodeParser
+from vizg.program import Program
+
+
+def parse(text, o_number=1):
+    program = Program(o_number)
+    for block in GCodeParser().iter_blocks(text.split("\n")):
+        program.add_block(block)
+    return program
+
+
+def test_loop_and_subprogram_call():
+    machine = Machine("test")
+    sub = parse("#101 = #101 + 2.\nM99", 2000)
+    main = parse("#100 = 0\n#101 = 0\nWHILE [#100 LT 5] DO1\nM98 P2000\n#100 = #100 + 1\nEND1\nM30")
+    MacroInterpreter(machine, [sub]).execute(main)
+    assert float(machine.get_macro_variable(101)) == pytest.approx(10.0)
+
+
+@pytest.mark.parametrize("call", ["M98 P2000", "G65 P2000 A1."])
+def test_calls_to_unregistered_programs_raise(call):
+    with pytest.raises(ValueError):
+        MacroInterpreter(Machine("test")).execute(parse(call))
+
+
+def test_compiled_evaluators_are_bounded():
+    interpreter = MacroInterpreter(Machine("test"))
+    interpreter._compiled.size = 10
+    for _ in range(5):
+        interpreter.execute(parse("\n".join(f"#100 = #100 + {n}." for n in range(1, 40))))
+    assert len(interpreter._compiled) <= 10
+    assert float(interpreter.machine.get_macro_variable(100)) == pytest.approx(5 * sum(range(1, 40)))
+
+
+def probing_program():
+    program = parse("#100 = 1.")
+    program.add_block(ProbeOn())
+    program.add_block(SafeMove(x=2.5, y=1.0, f=50.0))
+    program.add_block(ProbeOff())
+    for block in GCodeParser().iter_blocks(["#100 = #100 + 1.", "M30"]):
+        program.add_block(block)
+    return program
+
+
+def test_resident_macros_are_skipped():
+    machine = Machine("test")
+    steps = list(MacroInterpreter(machine).run(probing_program()))
+    assert len(steps) == 6
+    assert float(machine.get_macro_variable(100)) == pytest.approx(2.0)
+
+
+def test_registered_stubs_replace_resident_macros():
+    machine = Machine("test")
+    stub = parse("#101 = #24\nM99", 9810)
+    MacroInterpreter(machine, [stub]).execute(probing_program())
+    assert float(machine.get_macro_variable(101)) == pytest.approx(2.5)
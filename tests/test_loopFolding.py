@@ -0,0 +1,86 @@
+import random
+
+import numpy as np
+
+from vizg import loopFolding
+from vizg.block import Block
+from vizg.interpreter import MacroInterpreter
+from vizg.loop import Loop
+from vizg.loopFolding import LoopFolder
+from vizg.machine import Machine
+from vizg.parser import GCodeParser
+from vizg.program import Program
+
+
+def parse(text):
+    program = Program(1)
+    for block in GCodeParser().iter_blocks(text.split("\n")):
+        program.add_block(block)
+    return program
+
+
+def moves(program):
+    """Run a program through the interpreter and return every executed block with its values resolved."""
+    interpreter = MacroInterpreter(Machine("test"))
+    executed = []
+    for step in interpreter.run(program):
+        block = step.block
+        if not isinstance(block, Block) or step.assigned is not None:
+            continue
+        executed.append(tuple((word.address.__name__, round(interpreter.evaluate(word.numeric), 4))
+                              if word.address.__name__ in "XYZIJ" else str(word) for word in block.words))
+    return executed
+
+
+def test_grid_drilling_folds_into_one_loop():
+    text = ["G81 Z-0.5 R0.1 F20."]
+    text += [f"X{0.25 * i:.4f} Y{1.5 - 0.1 * i:.4f}" for i in range(40)]
+    text += ["G80"]
+    program = parse("\n".join(text))
+    folder = LoopFolder()
+    folded = folder.fold(program)
+    assert folder.loops == 1 and folder.folded_blocks == 40
+    assert any(isinstance(item, Loop) for item in folded.blocks)
+    assert len(list(folded.iter_lines())) < len(list(program.iter_lines()))
+    assert moves(folded) == moves(program)
+
+
+def test_step_down_passes_with_several_blocks_per_iteration():
+    text = []
+    for i in range(1, 30):
+        z = -0.05 * i
+        text += [f"G01 Z{z:.4f} F10.", "X2.", "Y1.", "X0", "Y0"]
+    program = parse("\n".join(text))
+    folded = LoopFolder().fold(program)
+    assert len(folded.blocks) < 10
+    assert moves(folded) == moves(program)
+
+
+def test_programs_without_progressions_are_unchanged():
+    program = parse("G00 X1. Y2.\nG01 Z-1. F10.\nX3.\nY7.\nX-2.")
+    folded = LoopFolder().fold(program)
+    assert [str(item) for item in folded.blocks] == [str(item) for item in program.blocks]
+
+
+def test_screen_does_not_change_the_result(monkeypatch):
+    rng = random.Random(7)
+    lines = ["G90", "G01 X0 Y0 F10."]
+    while len(lines) < 400:
+        kind = rng.randrange(3)
+        if kind == 0:
+            lines += [f"X{rng.randint(0, 99)}.{rng.randint(0, 9)} Y{rng.randint(0, 9)}." for _ in range(rng.randint(1, 6))]
+        elif kind == 1:
+            x, step, period = rng.randint(0, 9), rng.randint(1, 3), rng.randint(1, 4)
+            for n in range(rng.randint(2, 8)):
+                lines += [f"X{x + n * step}. Y{j}." for j in range(period)]
+        else:
+            lines += ["Z-0.1", "Z0.1"] * rng.randint(1, 4)
+    program = parse("\n".join(lines))
+    folder = LoopFolder()
+    screened = folder.fold(program)
+    assert folder.loops > 5
+
+    def everything(shapes, values, max_period):
+        return [None] + [np.ones(len(shapes), dtype=bool)] * max_period
+    monkeypatch.setattr(loopFolding, "_screen", everything)
+    assert [str(item) for item in LoopFolder().fold(program).blocks] == [str(item) for item in screened.blocks]
@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+import pytest
+
+from vizg.machine import Machine
+from vizg.macroVariable import MacroVariable
+
+
+def test_resolve_rounds_half_up():
+    machine = Machine("test")
+    machine.set_macro_variable(100, 1.23456)
+    assert machine.resolve_macro_variable(100) == Decimal("1.2346")
+    assert machine.resolve_macro_variable(100, 2) == Decimal("1.23")
+    assert machine.resolve_many([100, 100], 1) == [Decimal("1.2")] * 2
+
+
+def test_resolved_values_are_cached_until_the_range_changes():
+    machine = Machine("test")
+    machine.set_macro_variable(100, 1.5)
+    first = machine.resolve_macro_variable(100)
+    assert machine.resolve_macro_variable(100) is first
+    machine.set_macro_variable(500, 2.0)  # Another range keeps the cache
+    assert machine.resolve_macro_variable(100) is first
+    machine.set_macro_variable(101, 2.0)  # Same range drops it
+    assert machine.resolve_macro_variable(100) == first
+    machine.set_macro_variable(100, 2.5)
+    assert machine.resolve_macro_variable(100) == Decimal("2.5000")
+    machine.set_macro_variables(100, [3.5])
+    assert machine.resolve_macro_variable(100) == Decimal("3.5000")
+
+
+def test_version_counters():
+    machine = Machine("test")
+    storage = machine.macro_variables
+    version = storage.version_of(100)
+    machine.set_macro_variable(100, 1.0)
+    assert storage.version_of(100) > version
+    assert storage.version_of(500) == 0
+
+
+def test_fork_sees_parent_writes():
+    machine = Machine("test")
+    machine.set_macro_variable(100, 1.0)
+    fork = machine.fork()
+    assert fork.resolve_macro_variable(100) == Decimal("1.0000")
+    machine.set_macro_variable(100, 2.0)
+    assert fork.resolve_macro_variable(100) == Decimal("2.0000")
+
+
+def test_macro_variable_resolves_through_the_machine():
+    machine = Machine("test")
+    machine.set_macro_variable(100, 0.125)
+    variable = MacroVariable(100, 100, machine=machine, precision=2)
+    assert variable.resolve() == Decimal("0.13")
+    machine.set_macro_variable(100, 0.5)
+    assert variable.resolve() == Decimal("0.50")
+
+
+def test_unknown_variables_raise():
+    with pytest.raises(ValueError):
+        Machine("test").resolve_macro_variable(99999)
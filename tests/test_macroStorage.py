@@ -0,0 +1,41 @@
+import math
+
+import pytest
+
+from vizg.machine import Machine
+
+
+def test_none_sets_a_variable_vacant():
+    machine = Machine("test")
+    machine.set_macro_variable(100, 1.5)
+    machine.set_macro_variable(100, None)
+    assert math.isnan(machine.get_macro_variable(100))
+
+
+def test_text_values_are_kept():
+    machine = Machine("test")
+    machine.set_macro_variable(3000, "TOOL BROKEN")
+    assert machine.get_macro_variable(3000) == "TOOL BROKEN"
+
+
+@pytest.mark.parametrize("value", [object(), [1.0]])
+def test_other_values_raise_value_error(value):
+    with pytest.raises(ValueError):
+        Machine("test").set_macro_variable(100, value)
+
+
+def test_set_range_with_vacant_values():
+    machine = Machine("test")
+    machine.set_macro_variables(100, [1.0, None, 3.0])
+    assert machine.get_macro_variable(100) == 1.0
+    assert math.isnan(machine.get_macro_variable(101))
+    with pytest.raises(ValueError):
+        machine.set_macro_variables(100, [1.0, object()])
+
+
+def test_fork_stores_the_same_values():
+    fork = Machine("test").fork()
+    fork.set_macro_variable(100, None)
+    assert math.isnan(fork.get_macro_variable(100))
+    with pytest.raises(ValueError):
+        fork.set_macro_variable(100, object())
@@ -0,0 +1,113 @@
+import pytest
+
+from vizg.modalIndex import ModalCheckpointIndex, ProgramState
+from vizg.modals import ModalGroup
+from vizg.parser import GCodeParser
+from vizg.program import Program
+
+
+def parse(text):
+    program = Program(1)
+    for block in GCodeParser().iter_blocks(text.split("\n")):
+        program.add_block(block)
+    return program
+
+
+PROGRAM = """T01 M06;
+G43 H01;
+G154 P12;
+S1000 M03;
+G90;
+G00 X1. Y2.;
+G01 Z-0.25 F20.;
+X3.;
+M08;
+T02 M06;
+G43 H02;
+S2000 M04;
+G55;
+G91;
+X1.;
+Y-1. F10.;
+M09;
+M05;
+M30;"""
+
+
+def scan(program, index):
+    state = ProgramState()
+    for block in program.blocks[:index + 1]:
+        state.apply(block)
+    return state
+
+
+def summary(state):
+    return (repr(state.active(ModalGroup.MOTION)), repr(state.active(ModalGroup.DISTANCE_MODE)), dict(state.position),
+            state.tool, state.length_offset, state.feed, state.spindle_speed, repr(state.spindle),
+            repr(state.work_offset), state.coolant)
+
+
+def test_state_after_blocks():
+    index = ModalCheckpointIndex(parse(PROGRAM), interval=4)
+    state = index.state_at(8)
+    assert state.tool == 1 and state.length_offset == 1
+    assert state.position == {"X": 3.0, "Y": 2.0, "Z": -0.25}
+    assert state.feed == 20.0 and state.spindle_speed == 1000.0 and state.coolant
+    assert [repr(word) for word in state.work_offset] == ["G154", "P12"]
+    state = index.state_at(15)
+    assert state.tool == 2 and repr(state.spindle) == "M04"
+    assert state.position == {"X": 4.0, "Y": 1.0, "Z": -0.25}
+    assert [repr(word) for word in state.work_offset] == ["G55"]
+
+
+@pytest.mark.parametrize("interval", [1, 3, 1000])
+def test_checkpoints_match_a_full_scan(interval):
+    program = parse(PROGRAM)
+    index = ModalCheckpointIndex(program, interval)
+    for position in reversed(range(len(program.blocks))):
+        assert summary(index.state_at(position)) == summary(scan(program, position))
+    assert index.state_before(0).position == {}
+
+
+def test_build_records_every_checkpoint():
+    program = parse(PROGRAM)
+    index = ModalCheckpointIndex(program, interval=5).build()
+    assert len(index.checkpoints) == len(program.blocks) // 5 + 1
+
+
+def test_returned_states_are_copies():
+    index = ModalCheckpointIndex(parse(PROGRAM), interval=2)
+    index.state_at(7).position["X"] = 100.0
+    assert index.state_at(7).position["X"] == 3.0
+
+
+def test_invalidate_after_an_edit():
+    program = parse(PROGRAM)
+    index = ModalCheckpointIndex(program, interval=3).build()
+    assert index.state_at(15).tool == 2
+    program.blocks[9] = GCodeParser().parse_line("T05 M06")
+    index.invalidate(9)
+    assert index.state_at(15).tool == 5
+
+
+def test_out_of_range():
+    index = ModalCheckpointIndex(parse(PROGRAM))
+    with pytest.raises(IndexError):
+        index.state_before(100)
+    with pytest.raises(ValueError):
+        ModalCheckpointIndex(parse(PROGRAM), interval=0)
+
+
+def state_after(text):
+    state = ProgramState()
+    for block in parse(text).blocks:
+        state.apply(block)
+    return state
+
+
+def test_macro_calls():
+    start = "G90;\nG00 X1. Y1. Z1.;\n"
+    assert state_after(start + "G65 P9810 X5. Y5. F50.;").position == {"X": 5.0, "Y": 5.0, "Z": 1.0}
+    assert state_after(start + "G65 P9832;\nG65 P9811 Z-1.;\nG04 P1.;").position == {"X": 1.0, "Y": 1.0, "Z": 1.0}
+    assert state_after(start + "G65 P1000 X5.;").position == {"X": None, "Y": None, "Z": None, "A": None}
+    assert state_after(start + "G91;\nG65 P9810 Z-0.5 F50.;").position["Z"] == 0.5
@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from vizg.modalOptimizer import ModalOptimizer, optimize_program, verify_equivalent
+from vizg.parser import GCodeParser
+from vizg.program import Program
+
+
+def parse(text):
+    program = Program(1)
+    for block in GCodeParser().iter_blocks(text.split("\n")):
+        program.add_block(block)
+    return program
+
+
+def lines(program):
+    return [str(block).rstrip(";") for block in program.blocks]
+
+
+def test_redundant_words_are_dropped():
+    program = parse("G90;\nG00 X0 Y0;\nG01 X1. F10.;\nG01 X2. F10.;\nG01 X2. Y1.;")
+    optimized = optimize_program(program)
+    assert lines(optimized)[2:] == lines(parse("G01 X1. F10.;\nX2.;\nY1."))
+    assert verify_equivalent(program.blocks, optimized.blocks)
+
+
+def test_state_is_forgotten_at_jump_targets():
+    program = parse("G01 X0 F10.;\nN10 G01 X0 F10.;\nG01 X5.;\nM99 P10;")
+    optimized = optimize_program(program)
+    assert lines(optimized)[1] == lines(program)[1]
+
+
+def test_verify_equivalent_refuses_jumps():
+    program = parse("G01 X0 F10.;\nN10 X1.;\nM97 P10;")
+    with pytest.raises(ValueError):
+        verify_equivalent(program.blocks, program.blocks)
+    program = parse("G01 X0 F10.;\nN10 X1.;\nM99 P10;")
+    with pytest.raises(ValueError):
+        verify_equivalent(program.blocks, program.blocks)
+
+
+def test_random_programs_stay_equivalent():
+    rng = random.Random(7)
+    text = []
+    for _ in range(2000):
+        words = [rng.choice(["G00", "G01", ""]), rng.choice(["G90", "G91", "", "", ""])]
+        words += [f"{axis}{rng.randint(-2, 2)}." for axis in "XYZ" if rng.random() < 0.5]
+        if rng.random() < 0.3:
+            words.append(f"F{rng.choice([10, 20])}.")
+        if rng.random() < 0.05:
+            words.append(rng.choice(["M08", "M09", "S1000"]))
+        text.append(" ".join(word for word in words if word))
+    program = parse("\n".join(line for line in text if line))
+    optimized = optimize_program(program, ModalOptimizer())
+    assert len(optimized.blocks) <= len(program.blocks)
+    assert verify_equivalent(program.blocks, optimized.blocks)
+
+
+def test_words_required_by_the_block_are_kept():
+    program = parse("G90;\nS1000 M03;\nG00 X0 Y0 Z1.;\nG01 Z0 F10.;\nG00 Z1.;\nG01 Z1. F10.;\nM05;\nS1000 M03;\nG01 X1. F10.;")
+    program.validate()
+    optimized = optimize_program(program)
+    assert lines(optimized)[5:] == lines(parse("G01 Z1. F10.;\nM05;\nS1000 M03;\nX1."))
+    optimized.validate()
+    assert verify_equivalent(program.blocks, optimized.blocks)
@@ -0,0 +1,60 @@
+from enum import Enum
+
+import pytest
+
+from vizg.modalState import ModalState
+from vizg.modals import ModalGroup, is_word_in_group, modal_group_of, register_modal_group, word_code
+from vizg.parser import GCodeParser
+from vizg.rules import ExcludeModalGroup
+from vizg.validation import BlockHistogram
+
+
+class GearGroup(Enum):
+    GEAR = 1
+
+
+register_modal_group(GearGroup.GEAR, ["M41", 42], address="M")
+
+
+def words(text):
+    return GCodeParser().parse_line(text).words
+
+
+def test_groups_are_found_by_address_and_code():
+    g91, g01, x, f = words("G91 G01 X1. F10.")
+    assert modal_group_of(g91) is ModalGroup.DISTANCE_MODE
+    assert modal_group_of(g01) is ModalGroup.MOTION
+    assert modal_group_of(x) is None and modal_group_of(f) is None
+    assert is_word_in_group(ModalGroup.MOTION, g01)
+    assert not is_word_in_group(ModalGroup.MOTION, g91)
+    assert word_code(g01) == 1 and word_code(x) == 1
+    assert word_code(words("X1.5")[0]) is None
+
+
+def test_non_integer_codes_are_not_modal():
+    assert modal_group_of(words("G01 X1. F10.")[0]) is ModalGroup.MOTION
+    assert modal_group_of(words("G#101")[0]) is None
+
+
+def test_registered_groups():
+    m41, m42 = words("M41 M42")
+    assert modal_group_of(m41) is GearGroup.GEAR and modal_group_of(m42) is GearGroup.GEAR
+    assert modal_group_of(words("M03 S100")[0]) is None
+    assert BlockHistogram(GCodeParser().parse_line("M41 M42")).modal_words_in(GearGroup.GEAR) == [m41, m42]
+    ExcludeModalGroup(GearGroup.GEAR)
+
+
+def test_register_rejects_conflicts_and_plain_values():
+    with pytest.raises(ValueError):
+        register_modal_group(GearGroup.GEAR, ["G01"])
+    with pytest.raises(TypeError):
+        register_modal_group("GEAR", ["M43"])
+
+
+def test_modal_state_checks_the_group():
+    state = ModalState()
+    g01, g91 = words("G01 G91")
+    state.update(ModalGroup.MOTION, g01)
+    assert state.get_active(ModalGroup.MOTION) is g01
+    with pytest.raises(ValueError):
+        state.update(ModalGroup.MOTION, g91)
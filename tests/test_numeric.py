@@ -0,0 +1,52 @@
+from decimal import Decimal
+
+import pytest
+
+from vizg.fixedPoint import format_value, to_scaled
+from vizg.macroVariable import MacroVariable
+from vizg.numeric import Numeric
+
+
+@pytest.mark.parametrize("value, precision, text", [
+    (1.5, 4, "1.5000"),
+    (-0.25, 4, "-0.2500"),
+    (Decimal("2.12345"), 4, "2.1234"),
+    ("3.1", 4, "3.1000"),
+    (1, 0, "01"),
+    (-1.5, 2, "-1.50"),
+])
+def test_repr_matches_the_decimal_formatting(value, precision, text):
+    assert repr(Numeric(value, precision)) == text
+
+
+def test_leading_zero_pads_integer_values():
+    assert repr(Numeric(3, leading_zero=True)) == "03.0000"
+    assert repr(Numeric(3.5, leading_zero=True)) == "3.5000"
+
+
+def test_value_is_stored_scaled():
+    numeric = Numeric(1.5)
+    assert numeric.scaled == 15000
+    assert numeric.value == Decimal("1.5000")
+    assert numeric == 1.5 and numeric == Decimal("1.5")
+
+
+@pytest.mark.parametrize("value", [0.1, 2.675, 1e-5, 0.00015, -7.77775, 123456.78905])
+def test_floats_round_like_decimal_quantize(value):
+    assert to_scaled(value, 4) == int(Decimal(value).quantize(Decimal("1.0000")).scaleb(4))
+
+
+def test_format_value_without_a_numeric():
+    assert format_value(1.23456, 3) == "1.235"
+    assert format_value(2, 0) == "02"
+
+
+def test_macro_variables_are_kept():
+    numeric = Numeric(MacroVariable(101, 101))
+    assert numeric.scaled is None
+    assert repr(numeric) == "#101"
+
+
+def test_invalid_values_raise():
+    with pytest.raises(ValueError):
+        Numeric("abc")
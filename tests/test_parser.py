@@ -0,0 +1,34 @@
+import pytest
+
+from vizg.parser import GCodeParser, precision_of
+
+
+def round_trip(line):
+    parser = GCodeParser()
+    return str(parser.parse_line(str(parser.parse_line(line))))
+
+
+@pytest.mark.parametrize("text, precision", [("1", 0), ("1.", 1), ("1.25", 2), (".5", 1), ("-.5", 1)])
+def test_precision_of(text, precision):
+    assert precision_of(text) == precision
+
+
+@pytest.mark.parametrize("line", ["X1.", "F10.", "X0", "X.5", "L3", "G01 X1. Y-2.5 F100."])
+def test_round_trip_keeps_values_and_decimal_points(line):
+    parser = GCodeParser()
+    original = parser.parse_line(line)
+    written = str(original)
+    reparsed = parser.parse_line(written)
+    for before, after in zip(original.words, reparsed.words):
+        assert before.numeric.value == after.numeric.value
+        assert ("." in repr(before.numeric)) == ("." in repr(after.numeric))
+    assert round_trip(line) == written
+
+
+def test_trailing_point_is_written_with_a_decimal_point():
+    assert "." in str(GCodeParser().parse_line("X1."))
+
+
+@pytest.mark.parametrize("line", ["M08", "M09", "M30", "G17", "G01 X1. F10. M08"])
+def test_validating_parser_accepts_other_g_and_m_codes(line):
+    GCodeParser(validate=True).parse_line(line)
@@ -0,0 +1,70 @@
+import io
+import socket
+
+from vizg.parser import GCodeParser
+from vizg.program import Program
+
+
+def parse(text):
+    program = Program(1, "TEST")
+    for block in GCodeParser().iter_blocks(text.split("\n")):
+        program.add_block(block)
+    return program
+
+
+PROGRAM = "G00 X1. Y2.;\n#100 = 0;\nWHILE [#100 LT 3] DO1;\nG01 Z-0.1 F10.;\n#100 = #100 + 1;\nEND1;\nM30;"
+
+
+class Chunks:
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(data)
+
+
+def test_iter_lines_frames_the_program():
+    lines = list(parse(PROGRAM).iter_lines())
+    assert lines[0] == "%;" and lines[1] == "O1 (TEST);" and lines[-1] == "%;"
+    assert all(line.endswith(";") for line in lines)
+    assert "\n".join(lines) == repr(parse(PROGRAM))
+
+
+def test_write_to_matches_the_text():
+    program = parse(PROGRAM)
+    buffer = io.BytesIO()
+    assert program.write_to(buffer) == len(buffer.getvalue())
+    assert buffer.getvalue() == repr(program).encode("ascii")
+
+
+def test_write_to_flushes_in_chunks():
+    program = parse("\n".join(f"G01 X{n}. F10.;" for n in range(200)))
+    out = Chunks()
+    total = program.write_to(out, newline="\r\n", chunk_size=256)
+    assert len(out.chunks) > 1
+    assert all(len(chunk) < 256 + 64 for chunk in out.chunks)
+    assert b"".join(out.chunks) == "\r\n".join(program.iter_lines()).encode("ascii")
+    assert total == sum(len(chunk) for chunk in out.chunks)
+
+
+def test_write_to_socket():
+    program = parse(PROGRAM)
+    sender, receiver = socket.socketpair()
+    with sender, receiver:
+        total = program.write_to(sender, chunk_size=16)
+        sender.shutdown(socket.SHUT_WR)
+        received = b""
+        while True:
+            data = receiver.recv(4096)
+            if not data:
+                break
+            received += data
+    assert total == len(received)
+    assert received == repr(program).encode("ascii")
+
+
+def test_write_file(tmp_path):
+    program = parse(PROGRAM)
+    path = tmp_path / "O0001.nc"
+    assert program.write_file(str(path)) == path.stat().st_size
+    assert path.read_bytes() == repr(program).encode("ascii")
@@ -0,0 +1,77 @@
+import pytest
+
+from vizg.modalIndex import ProgramState
+from vizg.parser import GCodeParser
+from vizg.program import Program
+from vizg.restart import RestartGenerator
+
+
+def parse(text):
+    program = Program(1)
+    for block in GCodeParser().iter_blocks(text.split("\n")):
+        program.add_block(block)
+    return program
+
+
+PROGRAM = """T01 M06;
+G43 H01;
+G54;
+S1000 M03;
+M08;
+G00 X1. Y2.;
+Z0.1;
+G01 Z-0.25 F20.;
+X3.;
+Y4.;
+M09;
+M30;"""
+
+
+def state_after(text):
+    state = ProgramState()
+    for block in parse(text).blocks:
+        state.apply(block)
+    return state
+
+
+def test_preamble_after_parsing_program_with_coolant_and_end():
+    program = parse(PROGRAM)
+    preamble = RestartGenerator(program).preamble(9)
+    text = str(preamble)
+    assert "M08" in text
+    assert "X3.0" in text and "Y2.0" in text
+
+
+def test_incremental_move_from_unknown_position_is_unknown():
+    state = state_after("G91;\nG00 X1. Y1.;")
+    assert state.position == {"X": None, "Y": None}
+
+
+def test_incremental_move_from_known_position():
+    state = state_after("G00 X1.;\nG91;\nG00 X0.5;")
+    assert state.position["X"] == pytest.approx(1.5)
+
+
+def test_argument_and_machine_move_blocks():
+    state = state_after("G00 X1. Y1. Z1.;\nG65 P9810 X5. Y5. F50.;\nG65 P9811 X7.;\nG10 L2 P1 X7.;\nG53 Z0;")
+    assert state.position == {"X": 5.0, "Y": 5.0, "Z": None}
+
+
+def test_restart_after_protected_move():
+    program = parse("G90;\nG00 X1. Y1. Z1.;\nG65 P9810 X5. Y5. F50.;\nG01 Z-1. F10.;")
+    text = str(RestartGenerator(program).preamble(3))
+    assert "X5.0" in text and "Y5.0" in text
+
+
+def test_restart_after_macro_call_is_refused():
+    program = parse("G90;\nG00 X1. Y1. Z1.;\nG65 P1000 A1.;\nG01 Z-1. F10.;")
+    with pytest.raises(ValueError):
+        RestartGenerator(program).preamble(3)
+
+
+def test_preamble_refuses_unknown_position():
+    program = parse("G91;\nG00 X1. Y1.;\nG90;\nG01 Z-1. F10.;")
+    with pytest.raises(ValueError):
+        RestartGenerator(program).preamble(3)
+    text = str(RestartGenerator(program, allow_unknown_position=True).preamble(3))
+    assert "UNKNOWN X Y POSITION" in text and "M00" in text
@@ -0,0 +1,135 @@
+import pytest
+
+from vizg.machine import Machine
+from vizg.snapshot import MachineJournal, MachineSnapshot, load_machine, read_snapshot, replay_journal, write_snapshot
+
+
+def machine():
+    m = Machine("Haas_VF2")
+    m.set_macro_variable(100, 1.5)
+    m.set_macro_variable(101, -2.25)
+    m.set_macro_variable(500, 42.0)
+    m.set_macro_variable(3000, "TOOL BROKEN")
+    m.state["units"] = "inch"
+    return m
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "machine.snap")
+    original = machine()
+    assert write_snapshot(original, path) > 0
+    restored = read_snapshot(path)
+    assert restored.machine_id == "Haas_VF2"
+    assert restored.state == {"units": "inch"}
+    for number, value in original.macro_variables.items():
+        restored_value = restored.get_macro_variable(number)
+        assert restored_value == value or (value != value and restored_value != restored_value)
+    assert restored.get_macro_variable(3000) == "TOOL BROKEN"
+    assert restored.get_macro_variable(102) == original.get_macro_variable(102)
+
+
+def test_snapshot_is_read_without_loading(tmp_path):
+    path = str(tmp_path / "machine.snap")
+    write_snapshot(machine(), path)
+    with MachineSnapshot(path) as snapshot:
+        assert snapshot.get(100) == 1.5
+        assert snapshot.get(3000) == "TOOL BROKEN"
+        assert snapshot.values(100, 102).tolist() == [1.5, -2.25]
+
+
+def test_not_a_snapshot(tmp_path):
+    path = tmp_path / "other.snap"
+    path.write_bytes(b"not a snapshot at all, but long enough to read a header")
+    with pytest.raises(ValueError):
+        MachineSnapshot(str(path))
+
+
+def test_journal_replays_the_changes(tmp_path):
+    path = str(tmp_path / "machine.journal")
+    m = Machine("test")
+    with MachineJournal(m, path) as journal:
+        m.set_macro_variable(100, 1.0)
+        m.set_macro_variable(100, 2.0)
+        m.set_macro_variable(101, 3.0)
+        assert journal.flush() == 2
+        assert journal.flush() == 0
+        m.set_macro_variable(3000, "ALARM")
+    replayed = Machine("test")
+    assert replay_journal(path, replayed) == 3
+    assert replayed.get_macro_variable(100) == 2.0
+    assert replayed.get_macro_variable(101) == 3.0
+    assert replayed.get_macro_variable(3000) == "ALARM"
+
+
+def test_checkpoint_empties_the_journal(tmp_path):
+    snapshot_path, journal_path = str(tmp_path / "machine.snap"), str(tmp_path / "machine.journal")
+    m = Machine("test")
+    journal = MachineJournal(m, journal_path)
+    m.set_macro_variable(100, 1.0)
+    journal.flush()
+    size = (tmp_path / "machine.journal").stat().st_size
+    journal.checkpoint(snapshot_path)
+    assert (tmp_path / "machine.journal").stat().st_size < size
+    m.set_macro_variable(101, 2.0)
+    journal.close()
+    restored = load_machine(snapshot_path, journal_path)
+    assert restored.get_macro_variable(100) == 1.0
+    assert restored.get_macro_variable(101) == 2.0
+    assert replay_journal(journal_path, Machine("test")) == 1
+
+
+def journal_with_torn_tail(path):
+    m = Machine("test")
+    with MachineJournal(m, path) as journal:
+        m.set_macro_variable(100, 1.0)
+        journal.flush()
+        m.set_macro_variable(101, 2.0)
+    with open(path, "ab") as fp:
+        fp.write(b"\x01\x00\x00\x00\x0d\x00\x00\x00\x64\x00")  # Batch cut off by a crash
+
+
+def test_torn_tail_is_ignored_on_replay(tmp_path):
+    path = str(tmp_path / "machine.journal")
+    journal_with_torn_tail(path)
+    replayed = Machine("test")
+    assert replay_journal(path, replayed) == 2
+    assert replayed.get_macro_variable(101) == 2.0
+
+
+def test_reopen_cuts_the_torn_tail_and_appends(tmp_path):
+    path = str(tmp_path / "machine.journal")
+    journal_with_torn_tail(path)
+    m = Machine("test")
+    replay_journal(path, m)
+    with MachineJournal(m, path):
+        m.set_macro_variable(102, 3.0)
+    replayed = Machine("test")
+    assert replay_journal(path, replayed) == 3
+    assert replayed.get_macro_variable(102) == 3.0
+
+
+def test_reopen_after_a_corrupt_batch(tmp_path):
+    path = str(tmp_path / "machine.journal")
+    m = Machine("test")
+    with MachineJournal(m, path) as journal:
+        m.set_macro_variable(100, 1.0)
+        journal.flush()
+        m.set_macro_variable(101, 2.0)
+    data = bytearray((tmp_path / "machine.journal").read_bytes())
+    data[-1] ^= 0xFF  # Bad CRC on the last batch
+    (tmp_path / "machine.journal").write_bytes(bytes(data))
+    with MachineJournal(m, path):
+        m.set_macro_variable(102, 3.0)
+    replayed = Machine("test")
+    assert replay_journal(path, replayed) == 2
+    assert replayed.get_macro_variable(100) == 1.0 and replayed.get_macro_variable(102) == 3.0
+
+
+def test_reopen_keeps_an_intact_journal(tmp_path):
+    path = str(tmp_path / "machine.journal")
+    m = Machine("test")
+    with MachineJournal(m, path):
+        m.set_macro_variable(100, 1.0)
+    size = (tmp_path / "machine.journal").stat().st_size
+    MachineJournal(Machine("test"), path).close()
+    assert (tmp_path / "machine.journal").stat().st_size == size
@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from vizg.parser import GCodeParser
+from vizg.program import Program
+from vizg.subprograms import SubprogramExtractor
+
+
+def parse(text, o_number=1):
+    program = Program(o_number)
+    for block in GCodeParser().iter_blocks(text.split("\n")):
+        program.add_block(block)
+    return program
+
+
+def lines(program):
+    return [str(block) for block in program.blocks]
+
+
+def pocket(x):
+    return [f"G00 X{x}. Y0", "G01 Z-0.1 F10.", "X{0}.5".format(x), "Y0.5", f"X{x}.", "Y0", "G00 Z0.1"]
+
+
+def test_inline_restores_the_program():
+    rng = random.Random(3)
+    text = []
+    for _ in range(60):
+        text.extend(pocket(rng.randint(0, 3)))
+        text.append(f"G00 Z{rng.randint(1, 9)}.")
+    program = parse("\n".join(text))
+    extractor = SubprogramExtractor()
+    bundle = extractor.extract(program)
+    assert bundle.subprograms
+    assert extractor.saved_lines > 0
+    assert lines(bundle.inline()) == lines(program)
+
+
+def test_back_to_back_repeats_use_one_call():
+    program = parse("\n".join(pocket(1) * 5))
+    bundle = SubprogramExtractor().extract(program)
+    assert len(bundle.main.blocks) == 1
+    assert lines(bundle.inline()) == lines(program)
+
+
+def test_called_o_numbers_are_not_reused():
+    program = parse("\n".join(["M98 P1000"] + pocket(1) * 3 + ["G65 P1001 X1.", "M98 P1002"]))
+    bundle = SubprogramExtractor().extract(program)
+    numbers = {int(subprogram.o_number) for subprogram in bundle.subprograms}
+    assert numbers and not numbers & {1, 1000, 1001, 1002}
+    assert lines(bundle.inline()) == lines(program)
+
+
+def test_max_length_bounds_the_search_not_the_subprogram():
+    program = parse("\n".join((pocket(1) + ["G00 Z5."]) * 4 + ["G00 Z9."] + pocket(2) * 3))
+    bounded = SubprogramExtractor(max_length=3).extract(program)
+    unbounded = SubprogramExtractor().extract(program)
+    # Matches found at the bounded length are still extended to the full sequence
+    assert max(len(sub.blocks) for sub in bounded.subprograms) >= len(pocket(1))
+    assert lines(bounded.main) == lines(unbounded.main)
+    assert lines(bounded.inline()) == lines(program)
+
+
+def test_max_length_below_min_length_is_rejected():
+    with pytest.raises(ValueError):
+        SubprogramExtractor(min_length=4, max_length=3)
@@ -0,0 +1,42 @@
+import pytest
+
+from vizg.address import X
+from vizg.modals import ModalGroup
+from vizg.parser import GCodeParser
+from vizg.validation import BlockHistogram, validate_blocks
+
+
+def parse_line(text):
+    return GCodeParser().parse_line(text)
+
+
+def test_histogram_counts_addresses_and_modal_words():
+    histogram = BlockHistogram(parse_line("G01 X1. Y2. X3. F10."))
+    assert histogram.count(X) == 2
+    assert repr(histogram.first(X)) == repr(parse_line("X1.").words[0])
+    assert histogram.duplicates() == [X]
+    assert [repr(word) for word in histogram.modal_words_in(ModalGroup.MOTION)] == ["G01"]
+    assert histogram.modal_words_in(ModalGroup.PLANE_SELECTION) == []
+
+
+@pytest.mark.parametrize("text", ["G01 X1. F10.", "M03 S1000", "G00 X1. Y2."])
+def test_valid_blocks(text):
+    parse_line(text).validate()
+
+
+@pytest.mark.parametrize("text, message", [
+    ("G00 G01 X1.", "modal group"),
+    ("G00 X1. X2.", "Duplicate addresses"),
+    ("G01 X1.", "address F"),
+    ("M03", "address S"),
+])
+def test_invalid_blocks(text, message):
+    with pytest.raises(ValueError, match=message):
+        parse_line(text).validate()
+
+
+def test_validate_blocks_reports_the_block_index():
+    blocks = [parse_line("G00 X1."), parse_line("G01 Y2. F10."), parse_line("G01 X1. X2. F10.")]
+    assert validate_blocks(blocks[:2]) == 2
+    with pytest.raises(ValueError, match="^Block 2: "):
+        validate_blocks(blocks)
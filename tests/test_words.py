@@ -0,0 +1,9 @@
+from vizg.numeric import Numeric
+from vizg.words import MWord
+
+
+def test_numeric_range_bounds_share_plan_with_plain_values():
+    # A Numeric bound equals and hashes like its value, so both words share one rule plan
+    MWord(Numeric(9, 0))
+    MWord(9).validate()
+    MWord(Numeric(9, 0)).validate()
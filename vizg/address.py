@@ -1,7 +1,7 @@
 # addresses.py
 
 class Address:
-    VALID_ADDRESSES = {"X", "Y", "Z", "A", "G", "F", "M", "S", "T", "R", "I", "J", "K", "L", "P", "D", "H"}
+    VALID_ADDRESSES = {"X", "Y", "Z", "A", "G", "F", "M", "S", "T", "R", "I", "J", "K", "L", "P", "D", "H", "N", "Q"}
 
     def __new__(cls, *args, **kwargs):
         raise TypeError(f"Cannot instantiate {cls.__name__}. Use the class directly for the address letter.")
@@ -48,9 +48,15 @@ class L(Address):
 class M(Address):
     pass
 
+class N(Address):
+    pass
+
 class P(Address):
     pass
 
+class Q(Address):
+    pass
+
 class R(Address):
     pass
 
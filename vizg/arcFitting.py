@@ -0,0 +1,228 @@
+import math
+
+import numpy as np
+
+from vizg.address import I, J
+from vizg.block import Block
+from vizg.decimation import AXES, _ChainPass, _chain_points
+from vizg.modals import ModalGroup
+from vizg.numeric import Numeric
+from vizg.program import Program
+from vizg.words import AddressWord, G01, G02, G03
+
+_CENTER_PRECISION = 4  # Decimal places of the I/J words
+
+
+class ArcFitter(_ChainPass):
+    """
+    Replaces runs of G01 moves whose end points lie on a circle with G02/G03 arcs.
+
+    Works on the same chains of plain G01 blocks as PolylineDecimator, in the
+    XY plane (G17) and at constant Z. An arc from point a to point b has its
+    center on the perpendicular bisector of ab, placed by a least-squares fit
+    of the points in between (one NumPy expression per candidate), and rounded
+    to the precision of the I/J words; it is accepted when every original
+    vertex lies within `tolerance` of the arc, counting the sagitta of the
+    original segments, all segments turn the same way and the arc sweeps less
+    than a full turn. Each arc is grown from its start point by doubling and
+    then bisecting its length.
+
+    Arcs are written as G02/G03 X Y I J F with I/J relative to the start point
+    and the feed in effect; the next G01 block gets G01 and the feed again. The
+    last block of every chain stays a G01 move, so the blocks after the chain
+    see G01 in effect as before.
+    """
+    REQUIRED_MODES = {**_ChainPass.REQUIRED_MODES, ModalGroup.PLANE_SELECTION: 17}
+    RESET_MODES = {**_ChainPass.RESET_MODES, ModalGroup.PLANE_SELECTION: 17}
+
+    def __init__(self, tolerance: float = 0.0005, min_segments: int = 3, max_radius: float = 100.0, assume_reset: bool = True):
+        """
+        :param tolerance: Maximum distance (program units) between the original path and the arcs.
+        :param min_segments: Fewest G01 blocks replaced by one arc.
+        :param max_radius: Largest arc radius; flatter runs are left as lines.
+        :param assume_reset: If True, the program starts with G17, G40 and G80 in effect, as after a control reset.
+        """
+        if tolerance <= 0:
+            raise ValueError("Tolerance must be positive")
+        if min_segments < 2:
+            raise ValueError("An arc must replace at least 2 segments")
+        super().__init__(assume_reset)
+        self.tolerance = tolerance
+        self.min_segments = min_segments
+        self.max_radius = max_radius
+        self.arcs = 0  # Arcs written by the last fit()
+        self.removed_blocks = 0  # G01 blocks replaced by the last fit()
+
+    def fit(self, program) -> Program:
+        """Return a copy of the program with arc-shaped G01 runs replaced by G02/G03 blocks."""
+        self.arcs = 0
+        self.removed_blocks = 0
+        return self._run(program)
+
+    def _rewrite(self, start, chain):
+        if self._feed is None or len(chain) <= self.min_segments:
+            for item, _ in chain:
+                yield item
+            return
+
+        points = _chain_points(start, chain)
+        linear = True  # G01 in effect
+        index = 1  # Next point (chain[index - 1] ends at points[index])
+        for first, last, clockwise, offset in self._find_arcs(points):
+            for position in range(index, first + 1):
+                yield self._linear(chain[position - 1][0], linear)
+                linear = True
+            _, axes = chain[last - 1]
+            yield self._arc(axes, clockwise, offset)
+            linear = False
+            self.arcs += 1
+            self.removed_blocks += last - first - 1
+            index = last + 1
+        for position in range(index, len(chain) + 1):
+            yield self._linear(chain[position - 1][0], linear)
+            linear = True
+
+    def _find_arcs(self, points):
+        """Return (first point, last point, clockwise, center offset) of the arcs of a chain, in order."""
+        xy = points[:, :2]
+        z = points[:, 2]
+        last_point = len(points) - 2  # The chain's last block stays a line
+        segments = self.min_segments
+
+        # Vertices where the path turns left (+1) or right (-1); an arc needs equal turns at every inner vertex
+        steps = np.diff(xy, axis=0)
+        turns = np.zeros(len(points), dtype=np.int64)
+        turns[1:-1] = np.sign(steps[:-1, 0] * steps[1:, 1] - steps[:-1, 1] * steps[1:, 0])
+        left = np.concatenate(([0], np.cumsum(turns > 0)))
+        right = np.concatenate(([0], np.cumsum(turns < 0)))
+        starts = np.arange(max(0, last_point - segments + 1))
+        inner = segments - 1
+        window_left = left[starts + 1 + inner] - left[starts + 1]
+        window_right = right[starts + 1 + inner] - right[starts + 1]
+        candidates = np.flatnonzero((window_left == inner) | (window_right == inner))
+        candidates = candidates[self._screen(xy, candidates)].tolist()
+
+        arcs = []
+        position = 0
+        for first in candidates:
+            if first < position:
+                continue
+            fit = self._fit(xy, z, first, first + segments)
+            if fit is None:
+                continue
+            good, good_fit = first + segments, fit
+            bad = None
+            step = 1
+            while good < last_point:
+                end = min(good + step, last_point)
+                fit = self._fit(xy, z, first, end)
+                if fit is None:
+                    bad = end
+                    break
+                good, good_fit = end, fit
+                step *= 2
+            while bad is not None and bad - good > 1:
+                end = (good + bad) // 2
+                fit = self._fit(xy, z, first, end)
+                if fit is None:
+                    bad = end
+                else:
+                    good, good_fit = end, fit
+            arcs.append((first, good) + good_fit)
+            position = good
+        return arcs
+
+    def _screen(self, xy, starts):
+        """
+        Return a mask of the start points whose shortest arc may fit, tested for all of them at once.
+
+        Uses the circle through the first, middle and last point of each window,
+        with a loose tolerance: the exact fit in _fit() only runs on the survivors.
+        """
+        segments = self.min_segments
+        windows = xy[starts[:, None] + np.arange(segments + 1)]
+        a, b, c = windows[:, 0], windows[:, segments // 2], windows[:, segments]
+        ab = b - a
+        ac = c - a
+        determinant = 2.0 * (ab[:, 0] * ac[:, 1] - ab[:, 1] * ac[:, 0])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ab2 = np.einsum("ij,ij->i", ab, ab)
+            ac2 = np.einsum("ij,ij->i", ac, ac)
+            center = a + np.stack((ac[:, 1] * ab2 - ab[:, 1] * ac2, ab[:, 0] * ac2 - ac[:, 0] * ab2), axis=1) / determinant[:, None]
+            offsets = windows - center[:, None, :]
+            radii = np.hypot(offsets[..., 0], offsets[..., 1])
+            deviation = np.abs(radii - radii[:, :1]).max(axis=1)
+            return (determinant != 0) & (radii[:, 0] <= self.max_radius) & (deviation <= 4 * self.tolerance)
+
+    def _fit(self, xy, z, first, last):
+        """Return (clockwise, center offset from the start point) of an arc through points first..last, or None."""
+        if (z[first:last + 1] != z[first]).any():
+            return None
+        points = xy[first:last + 1]
+        start = points[0]
+        chord = points[-1] - start
+        length = math.hypot(chord[0], chord[1])
+        if length == 0.0:
+            return None
+        normal = np.array((-chord[1], chord[0])) / length
+        middle = start + chord / 2
+
+        # Center = middle + t * normal, equidistant from the end points; least-squares t for the inner points
+        inner = points[1:-1] - start
+        b = 2.0 * (inner @ normal)
+        denominator = b @ b
+        if denominator == 0.0:
+            return None  # Collinear
+        a = np.einsum("ij,ij->i", points[1:-1], points[1:-1]) - start @ start - 2.0 * (inner @ middle)
+        t = (a @ b) / denominator
+        offset = np.round(middle + t * normal - start, _CENTER_PRECISION)
+        center = start + offset
+
+        vectors = points - center
+        radii = np.hypot(vectors[:, 0], vectors[:, 1])
+        radius = radii[0]
+        if radius > self.max_radius:
+            return None
+
+        cross = vectors[:-1, 0] * vectors[1:, 1] - vectors[:-1, 1] * vectors[1:, 0]
+        dot = np.einsum("ij,ij->i", vectors[:-1], vectors[1:])
+        angles = np.arctan2(cross, dot)
+        if not ((angles > 0).all() or (angles < 0).all()) or abs(angles.sum()) >= 2 * math.pi - 1e-9:
+            return None
+
+        # Deviation: end points off the circle, plus the sagitta of the original segments
+        half = np.hypot(np.diff(points[:, 0]), np.diff(points[:, 1])) / 2
+        if (half > radius).any():
+            return None
+        sagitta = radius - np.sqrt(radius * radius - half * half)
+        if np.abs(radii - radius).max() + sagitta.max() > self.tolerance:
+            return None
+        return bool(angles[0] < 0), (float(offset[0]), float(offset[1]))
+
+    def _arc(self, axes, clockwise, offset):
+        block = Block()
+        block.add_word(G02() if clockwise else G03())
+        block.add_word(axes["X"])
+        block.add_word(axes["Y"])
+        block.add_word(AddressWord(I, Numeric(offset[0], _CENTER_PRECISION)))
+        block.add_word(AddressWord(J, Numeric(offset[1], _CENTER_PRECISION)))
+        block.add_word(self._feed)
+        return block
+
+    def _linear(self, item, linear):
+        """Return a chain block, with G01 and the feed stated again if an arc came before it."""
+        if linear:
+            return item
+        block = item.get_block() if hasattr(item, "get_block") else item
+        restated = Block()
+        restated.add_word(G01())
+        for word in block.words:
+            if word.address.__name__ in AXES:
+                restated.add_word(word)
+        restated.add_word(self._feed)
+        return restated
+
+
+def fit_arcs(program, tolerance: float = 0.0005) -> Program:
+    """Return a copy of the program with arc-shaped G01 runs replaced by G02/G03 arcs (see ArcFitter)."""
+    return ArcFitter(tolerance).fit(program)
@@ -1,23 +1,98 @@
+from vizg.validation import validate_block
+
 class Block:
-    """Encapsulates a block of G-code words."""
+    """
+    Encapsulates a block of G-code words.
+
+    Blocks are built word by word with add_word, then can be frozen into an
+    immutable, hashable value usable as a dict/set key. Frozen blocks compare
+    by their words; a block that can still change compares and hashes by
+    identity, so list.index/remove and sets of blocks in a program being
+    edited find that very block. A block that has been hashed by identity (e.g.
+    used as a dict key) cannot be frozen, since its hash would change.
+
+    The rendered text is cached and only rebuilt after the block changes through
+    add_word, insert_word, replace_word or remove_word. Code that edits `words`
+    directly must call invalidate().
+    """
+    __slots__ = ('words', 'frozen', '_text', '_hashed')
     
     def __init__(self):
         """Initialize an empty block of words."""
         self.words = []
+        self.frozen = False
+        self._text = None  # Cached G-code text, None when dirty
+        self._hashed = False  # True once hashed by identity
+
+    def _check_mutable(self):
+        if self.frozen:
+            raise AttributeError("Cannot modify a frozen Block")
 
     def add_word(self, word):
         """Add a word to the block."""
+        self._check_mutable()
         self.words.append(word)
+        self._text = None
+
+    def insert_word(self, index, word):
+        """Insert a word at the given position."""
+        self._check_mutable()
+        self.words.insert(index, word)
+        self._text = None
+
+    def replace_word(self, index, word):
+        """Replace the word at the given position."""
+        self._check_mutable()
+        self.words[index] = word
+        self._text = None
+
+    def remove_word(self, index):
+        """Remove and return the word at the given position."""
+        self._check_mutable()
+        word = self.words.pop(index)
+        self._text = None
+        return word
+
+    def invalidate(self):
+        """Drop the cached text after the words were edited directly."""
+        self._text = None
+
+    def freeze(self):
+        """
+        Make the block immutable and hashable by value. Returns the block itself.
+
+        :raises TypeError: If the block was already hashed by identity.
+        """
+        if not self.frozen:
+            if self._hashed:
+                raise TypeError("Cannot freeze a Block that has been hashed (e.g. used as a dict key or set member)")
+            self.words = tuple(self.words)
+            self.frozen = True
+        return self
+
+    def __eq__(self, other):
+        if not isinstance(other, Block):
+            return NotImplemented
+        if self.frozen and other.frozen:
+            return self.words == other.words
+        return self is other
+
+    def __hash__(self):
+        if self.frozen:
+            return hash(self.words)
+        self._hashed = True
+        return object.__hash__(self)
 
     def validate(self):
-        """Validate all words in the block."""
-        for word in self.words:
-            word.validate(self)
+        """Validate all words in the block against a single shared address histogram."""
+        validate_block(self)
 
     def __iter__(self):
         """Make the Block class iterable by returning an iterator over the words."""
         return iter(self.words)
 
     def __repr__(self):
-        """Return the string representation of the block as a G-code block."""
-        return ' '.join(str(word) for word in self.words)
\ No newline at end of file
+        """Return the string representation of the block as a G-code block, rendered once per change."""
+        if self._text is None:
+            self._text = ' '.join(str(word) for word in self.words)
+        return self._text
\ No newline at end of file
@@ -0,0 +1,84 @@
+from collections.abc import Mapping
+from typing import Callable, Iterable, Optional, Tuple
+
+from vizg.macroStorage import MacroRange
+
+
+def same_value(a, b) -> bool:
+    """Compare two macro variable values, treating NaN as equal to NaN."""
+    return a == b or (a != a and b != b)
+
+
+class ChangeSet(Mapping):
+    """
+    Coalesced macro variable changes: variable number -> (old value, new value).
+
+    A variable set several times in one batch appears once, with the value it
+    had before the batch and the value it has now; variables that ended up back
+    at their old value are left out.
+    """
+    __slots__ = ('_changes',)
+
+    def __init__(self, changes: Optional[dict] = None):
+        self._changes = changes or {}
+
+    def __getitem__(self, number) -> Tuple[object, object]:
+        return self._changes[number]
+
+    def __iter__(self):
+        return iter(self._changes)
+
+    def __len__(self):
+        return len(self._changes)
+
+    def new_values(self) -> dict:
+        """Return {number: new value}."""
+        return {number: new for number, (_, new) in self._changes.items()}
+
+    def filter(self, subscription: "Subscription") -> "ChangeSet":
+        """Return the changes a subscription is interested in."""
+        if subscription.ranges is None:
+            return self
+        matches = subscription.matches
+        return ChangeSet({number: change for number, change in self._changes.items() if matches(number)})
+
+    def __repr__(self):
+        return f"<ChangeSet {', '.join(f'#{number}' for number in self._changes)}>"
+
+
+class Subscription:
+    """A callback registered with Machine.subscribe, optionally limited to some variable ranges."""
+    __slots__ = ('callback', 'ranges')
+
+    def __init__(self, callback: Callable[[ChangeSet], None], ranges: Optional[Iterable] = None):
+        """
+        :param callback: Called with a ChangeSet after every batch of changes that touches the ranges.
+        :param ranges: None for every variable, or an iterable of MacroRange objects,
+            (start, stop) pairs (stop excluded) and single variable numbers.
+        """
+        self.callback = callback
+        if ranges is None:
+            self.ranges = None
+        else:
+            spans = []
+            for item in ranges:
+                if isinstance(item, MacroRange):
+                    spans.append((item.start, item.stop))
+                elif isinstance(item, int):
+                    spans.append((item, item + 1))
+                else:
+                    start, stop = item
+                    spans.append((int(start), int(stop)))
+            self.ranges = tuple(spans)
+
+    def matches(self, number: int) -> bool:
+        """Return True if the subscription covers a variable number."""
+        if self.ranges is None:
+            return True
+        for start, stop in self.ranges:
+            if start <= number < stop:
+                return True
+        return False
+
+    def __repr__(self):
+        return f"<Subscription {self.callback!r} {self.ranges or 'all'}>"
@@ -0,0 +1,273 @@
+from typing import Iterator, Optional
+
+import numpy as np
+
+from vizg.address import Address
+from vizg.block import Block
+from vizg.macroVariable import MacroVariable
+from vizg.numeric import Numeric
+from vizg.program import Program
+from vizg.word import Word
+
+# Address letters are stored as small integer codes; 0 means "not an address word"
+ADDRESS_LETTERS = [None] + sorted(Address.VALID_ADDRESSES)
+ADDRESS_CODES = {letter: code for code, letter in enumerate(ADDRESS_LETTERS) if letter is not None}
+ADDRESS_CLASSES = {cls.__name__: cls for cls in Address.__subclasses__()}
+
+# Word flags
+LEADING_ZERO = 1  # Numeric renders integer values with a leading zero
+VARIABLE = 2      # Word value is a MacroVariable; the value column holds its number
+WRAPPED = 4       # Word value is a Numeric wrapping a MacroVariable
+OBJECT = 8        # Entry is kept as-is in the object table (special words, compound words...)
+NO_VALUE = 16     # Word has no numeric value
+
+# Block flags
+FROZEN = 1        # Block was frozen
+BLOCK_OBJECT = 2  # Entry is not a Block (e.g. a Loop) and is kept in the object table
+
+_plain_layouts = {}
+
+
+def _has_plain_layout(cls):
+    """True if a Word subclass only stores address, numeric and rules (no extra slots)."""
+    plain = _plain_layouts.get(cls)
+    if plain is None:
+        plain = _plain_layouts[cls] = all(
+            not vars(klass).get('__slots__', ())
+            for klass in cls.__mro__
+            if klass is not Word and issubclass(klass, Word)
+        )
+    return plain
+
+
+class ColumnarProgram:
+    """
+    Struct-of-arrays representation of a Program for fast analysis.
+
+    Every word is a row in contiguous NumPy columns (address code, scaled integer
+    value, precision, flags), and block_offsets[i]:block_offsets[i + 1] gives the
+    rows of block i. Anything the columns cannot describe (comments, DPRNT,
+    expressions, compound words, loops) is kept in an object table, so converting
+    back with to_program() is lossless. Block and Word objects are only built when
+    asked for.
+    """
+
+    def __init__(self, o_number, comment="", line_ending=";"):
+        self.o_number = o_number
+        self.comment = comment
+        self.line_ending = line_ending
+
+        self.block_offsets = np.zeros(1, dtype=np.int64)
+        self.block_flags = np.zeros(0, dtype=np.uint8)
+        self.block_objects = np.full(0, -1, dtype=np.int64)  # Object table index for BLOCK_OBJECT entries
+
+        self.address = np.zeros(0, dtype=np.uint8)
+        self.value = np.zeros(0, dtype=np.int64)  # Scaled integer value, or macro variable number
+        self.precision = np.zeros(0, dtype=np.int8)
+        self.flags = np.zeros(0, dtype=np.uint8)
+        self.layout = np.zeros(0, dtype=np.int32)  # Index into layouts, or into objects for OBJECT rows
+
+        self.layouts = []  # (word class, rule plan) pairs shared by rows
+        self.objects = []  # Values kept as-is (see OBJECT / BLOCK_OBJECT)
+
+    @classmethod
+    def from_program(cls, program: Program) -> "ColumnarProgram":
+        """Build the columnar form of a Program."""
+        columnar = cls(program.o_number, program.comment, program.line_ending)
+        columnar.extend(program.blocks)
+        return columnar
+
+    def extend(self, blocks):
+        """Append blocks (Block objects, or anything else a Program holds) to the columns."""
+        layout_index = {}
+        for i, (word_class, rules) in enumerate(self.layouts):
+            layout_index[(word_class, id(rules))] = i
+
+        offsets, block_flags, block_objects = [], [], []
+        address, value, precision, flags, layout = [], [], [], [], []
+        count = int(self.block_offsets[-1])
+
+        for block in blocks:
+            if not isinstance(block, Block):
+                block_flags.append(BLOCK_OBJECT)
+                block_objects.append(len(self.objects))
+                self.objects.append(block)
+                offsets.append(count)
+                continue
+
+            block_flags.append(FROZEN if block.frozen else 0)
+            block_objects.append(-1)
+            for word in block.words:
+                code, val, prec, flag, index = self._encode(word, layout_index)
+                address.append(code)
+                value.append(val)
+                precision.append(prec)
+                flags.append(flag)
+                layout.append(index)
+            count += len(block.words)
+            offsets.append(count)
+
+        self.block_offsets = np.concatenate([self.block_offsets, np.asarray(offsets, dtype=np.int64)])
+        self.block_flags = np.concatenate([self.block_flags, np.asarray(block_flags, dtype=np.uint8)])
+        self.block_objects = np.concatenate([self.block_objects, np.asarray(block_objects, dtype=np.int64)])
+        self.address = np.concatenate([self.address, np.asarray(address, dtype=np.uint8)])
+        self.value = np.concatenate([self.value, np.asarray(value, dtype=np.int64)])
+        self.precision = np.concatenate([self.precision, np.asarray(precision, dtype=np.int8)])
+        self.flags = np.concatenate([self.flags, np.asarray(flags, dtype=np.uint8)])
+        self.layout = np.concatenate([self.layout, np.asarray(layout, dtype=np.int32)])
+
+    def _encode(self, word, layout_index):
+        """Return the (address, value, precision, flags, layout) row of a word."""
+        if not isinstance(word, Word):
+            self.objects.append(word)
+            return 0, 0, -1, OBJECT, len(self.objects) - 1
+
+        code = ADDRESS_CODES[word.address.letter()]
+        numeric = word.numeric
+        if numeric is None:
+            val, prec, flag = 0, -1, NO_VALUE
+        elif isinstance(numeric, MacroVariable):
+            val, prec, flag = int(numeric.num), numeric.precision, VARIABLE
+        elif numeric.variable is not None:
+            val, prec, flag = int(numeric.variable.num), numeric.precision, WRAPPED
+        else:
+            val, prec, flag = numeric.scaled, numeric.precision, 0
+            if numeric.leading_zero:
+                flag |= LEADING_ZERO
+
+        if flag & (VARIABLE | WRAPPED) or not _has_plain_layout(type(word)):
+            # Columns still describe the word for scanning; the object table keeps it exact
+            self.objects.append(word)
+            return code, val, prec, flag | OBJECT, len(self.objects) - 1
+
+        key = (type(word), id(word.rules))
+        index = layout_index.get(key)
+        if index is None:
+            index = layout_index[key] = len(self.layouts)
+            self.layouts.append((type(word), word.rules))
+        return code, val, prec, flag, index
+
+    def __len__(self):
+        """Return the number of blocks."""
+        return len(self.block_flags)
+
+    @property
+    def word_count(self):
+        return len(self.address)
+
+    def word(self, row: int):
+        """Build the Word (or special word) stored at the given row."""
+        flag = int(self.flags[row])
+        if flag & OBJECT:
+            return self.objects[int(self.layout[row])]
+
+        word_class, rules = self.layouts[int(self.layout[row])]
+        if word_class.FLYWEIGHT:
+            return word_class()  # Shared instance
+
+        if flag & NO_VALUE:
+            numeric = None
+        else:
+            numeric = Numeric.from_scaled(int(self.value[row]), int(self.precision[row]), bool(flag & LEADING_ZERO))
+
+        word = object.__new__(word_class)
+        object.__setattr__(word, 'address', ADDRESS_CLASSES[ADDRESS_LETTERS[int(self.address[row])]])
+        object.__setattr__(word, 'numeric', numeric)
+        object.__setattr__(word, 'rules', rules)
+        return word
+
+    def block(self, index: int):
+        """Build the Block (or other stored entry) at the given block index."""
+        flag = int(self.block_flags[index])
+        if flag & BLOCK_OBJECT:
+            return self.objects[int(self.block_objects[index])]
+
+        block = Block()
+        for row in range(int(self.block_offsets[index]), int(self.block_offsets[index + 1])):
+            block.add_word(self.word(row))
+        if flag & FROZEN:
+            block.freeze()
+        return block
+
+    def __iter__(self) -> Iterator[object]:
+        """Lazily yield the blocks."""
+        for index in range(len(self)):
+            yield self.block(index)
+
+    def to_program(self) -> Program:
+        """Convert back to a Program of Block and Word objects."""
+        program = Program(self.o_number, self.comment, line_ending=self.line_ending)
+        for block in self:
+            program.add_block(block)
+        return program
+
+    def word_blocks(self) -> np.ndarray:
+        """Return the block index of every word row."""
+        return np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.block_offsets))
+
+    def rows(self, letter: str, numeric_only: bool = True) -> np.ndarray:
+        """
+        Return a boolean mask of the rows using the given address letter.
+
+        :param numeric_only: If True, skip rows whose value is a macro variable or missing.
+        """
+        mask = self.address == ADDRESS_CODES[letter]
+        if numeric_only:
+            mask &= (self.flags & (VARIABLE | WRAPPED | NO_VALUE)) == 0
+        return mask
+
+    def values(self, letter: str) -> np.ndarray:
+        """Return the plain numeric values of the given address as floats, in program order."""
+        mask = self.rows(letter)
+        return self.value[mask] / np.power(10.0, self.precision[mask])
+
+    def blocks_with(self, letter: str, code: Optional[int] = None) -> np.ndarray:
+        """
+        Return the indices of the blocks using the given address letter.
+
+        :param code: Optional integer value to match as well (e.g. 1 for G01).
+        """
+        mask = self.rows(letter, numeric_only=code is not None)
+        if code is not None:
+            steps = np.power(10, np.maximum(self.precision, 0).astype(np.int64))
+            mask &= self.value == code * steps
+        return np.unique(self.word_blocks()[mask])
+
+    def offset(self, letter: str, delta) -> "ColumnarProgram":
+        """
+        Return a copy with delta added to every plain value of the given address.
+
+        The shift is rounded to each row's precision, so rendering keeps its format.
+        Words kept in the object table (e.g. compound words) are left untouched.
+        """
+        shifted = self.copy()
+        mask = self.rows(letter) & ((self.flags & OBJECT) == 0)
+        steps = np.power(10.0, self.precision[mask])
+        shifted.value[mask] += np.rint(float(delta) * steps).astype(np.int64)
+        return shifted
+
+    def select(self, block_indices) -> "ColumnarProgram":
+        """Return a new ColumnarProgram holding only the given blocks (indices or a boolean mask)."""
+        block_indices = np.asarray(block_indices)
+        if block_indices.dtype == bool:
+            block_indices = np.flatnonzero(block_indices)
+        return ColumnarProgram.from_program(_BlockList(self, block_indices))
+
+    def copy(self) -> "ColumnarProgram":
+        """Return a copy with independent columns. Words and objects in the tables are shared (they are immutable)."""
+        duplicate = ColumnarProgram(self.o_number, self.comment, self.line_ending)
+        for name in ('block_offsets', 'block_flags', 'block_objects', 'address', 'value', 'precision', 'flags', 'layout'):
+            setattr(duplicate, name, getattr(self, name).copy())
+        duplicate.layouts = list(self.layouts)
+        duplicate.objects = list(self.objects)
+        return duplicate
+
+
+class _BlockList:
+    """Minimal Program stand-in used by ColumnarProgram.select."""
+
+    def __init__(self, columnar, block_indices):
+        self.o_number = columnar.o_number
+        self.comment = columnar.comment
+        self.line_ending = columnar.line_ending
+        self.blocks = (columnar.block(int(index)) for index in block_indices)
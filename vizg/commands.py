@@ -30,7 +30,7 @@ class Command:
         leading_zero = False
         if precision == 0:
             leading_zero = True
-        return Numeric(Decimal(value), precision, leading_zero)
+        return Numeric(value, precision, leading_zero)
 
     def get_block(self):
         """Return the block of words that form the command."""
@@ -335,4 +335,29 @@ class SetVariable(Command):
         self.block.add_word(self.value_to_set)
 
         # Validate the block
-        self.validate()
\ No newline at end of file
+        self.validate()
+
+
+class IncrementVariable(Command):
+    """
+    Command to add a constant step to a macro variable (e.g., #101 = #101 + 0.5), as used for loop counters.
+    """
+
+    def __init__(self, var_num: int, step: Union[int, float, Decimal], precision: int = 4):
+        """
+        Initialize the IncrementVariable command.
+
+        :param var_num: The macro variable number to increment (e.g., #101).
+        :param step: The value added to the variable; negative steps are written with '-'.
+        :param precision: Precision of the step.
+        """
+        super().__init__()
+        self.variable = MacroVariable(alias=f"#{var_num}", num=self.to_numeric(var_num, 0))
+        self.step = step
+        operator = OperatorWord("-" if step < 0 else "+")
+
+        self.block.add_word(self.variable)
+        self.block.add_word(OperatorWord("="))
+        self.block.add_word(Expression(self.variable, operator, Numeric(abs(step), precision)))
+
+        self.validate()
@@ -0,0 +1,123 @@
+from collections import OrderedDict
+from functools import partial
+
+from vizg.macroVariable import MacroVariable
+from vizg.numeric import Numeric
+from vizg.operators import Expression
+
+# Compiled evaluators keyed by expression shape, least recently used first
+_COMPILED = OrderedDict()
+_COMPILED_SIZE = 1024
+
+
+def expression_key(operand):
+    """
+    Return a hashable key describing the shape of an expression.
+
+    Constants are numbered placeholders in the key, so '#101 + [#102 * 2.5]'
+    and '#101 + [#102 * 4.]' share one key (and one compiled function) no
+    matter how many objects build them.
+    """
+    return _shape(operand, [])
+
+
+def _shape(operand, constants):
+    """Build the key of an operand, appending its constants to `constants` in placeholder order."""
+    if isinstance(operand, Expression):
+        return (operand.operator.operator, _shape(operand.left, constants), _shape(operand.right, constants))
+    if isinstance(operand, MacroVariable):
+        return ("#", int(operand.num))
+    if isinstance(operand, Numeric):
+        if operand.variable is not None:
+            return ("#", int(operand.variable.num))
+        constants.append(float(operand))
+        return ("c", len(constants) - 1)
+    raise ValueError(f"Cannot compile {operand!r}")
+
+
+def _source(key):
+    """Lower an expression key to Python source reading variables from `v` and constants from `c`."""
+    kind = key[0]
+    if kind == "#":
+        return f"v[{key[1]}]"
+    if kind == "c":
+        return f"c[{key[1]}]"
+    return f"({_source(key[1])} {kind} {_source(key[2])})"
+
+
+def compile_key(key):
+    """
+    Return the cached function of an expression key, compiling it on first use.
+
+    The function takes the variable storage `v` and the tuple of constants `c`.
+    At most _COMPILED_SIZE functions are kept; the least recently used are dropped.
+    """
+    function = _COMPILED.get(key)
+    if function is None:
+        source = f"lambda v, c: {_source(key)}"
+        function = _COMPILED[key] = eval(compile(source, "<expression>", "eval"), {"__builtins__": {}})
+        while len(_COMPILED) > _COMPILED_SIZE:
+            _COMPILED.popitem(last=False)
+    else:
+        _COMPILED.move_to_end(key)
+    return function
+
+
+def compile_expression(operand):
+    """
+    Compile a Numeric, MacroVariable or Expression tree into a single Python function.
+
+    The function takes a macro variable storage (anything indexable by variable
+    number, such as Machine.macro_variables) and returns the value. The tree
+    shape decides the evaluation order, so nested expressions keep their precedence.
+    Expressions with the same shape share one compiled function; their
+    constants are bound as its second argument.
+    """
+    constants = []
+    function = compile_key(_shape(operand, constants))
+    return partial(function, c=tuple(constants))
+
+
+class EvaluatorCache:
+    """
+    Compiled evaluators of the operand objects used most recently.
+
+    Looking an operand up by identity skips rebuilding its expression key on
+    every evaluation. The cache holds at most `size` operands (least recently
+    used ones are dropped), so it does not keep every program it has seen alive.
+    """
+    __slots__ = ('size', '_entries')
+
+    def __init__(self, size: int = 4096):
+        """
+        :param size: Maximum number of operands held.
+        """
+        self.size = size
+        self._entries = OrderedDict()  # id(operand) -> (operand, evaluator); the operand keeps its id unique
+
+    def __call__(self, operand):
+        """Return the evaluator of a Numeric, MacroVariable or Expression (see compile_expression)."""
+        entries = self._entries
+        entry = entries.get(id(operand))
+        if entry is not None and entry[0] is operand:
+            entries.move_to_end(id(operand))
+            return entry[1]
+        function = compile_expression(operand)
+        entries[id(operand)] = (operand, function)
+        entries.move_to_end(id(operand))
+        if len(entries) > self.size:
+            entries.popitem(last=False)
+        return function
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def evaluate(operand, machine):
+    """Evaluate an expression once against a Machine."""
+    return compile_expression(operand)(machine.macro_variables)
+
+
+def compiled_count():
+    """Return the number of distinct compiled expression shapes currently cached."""
+    return len(_COMPILED)
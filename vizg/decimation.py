@@ -0,0 +1,249 @@
+import numpy as np
+
+from vizg.block import Block
+from vizg.modalIndex import _is_word
+from vizg.modals import ModalGroup, modal_group_of, word_code
+from vizg.numeric import Numeric
+from vizg.program import Program
+
+AXES = ("X", "Y", "Z")
+
+# M codes after which the position and modes are no longer known (calls, returns, ends, tool change)
+_BARRIER_M_CODES = {2, 6, 30, 97, 98, 99}
+
+
+def douglas_peucker(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Return a boolean mask of the points of a polyline kept by the Douglas-Peucker algorithm.
+
+    Every dropped point lies within `tolerance` of the segment that replaces it,
+    so the simplified path stays within `tolerance` of the original one. The
+    distances of each span's inner points are computed in one NumPy operation.
+    :param points: (n, d) array of vertices.
+    :param tolerance: Maximum distance of a dropped vertex to the simplified path.
+    """
+    count = len(points)
+    keep = np.zeros(count, dtype=bool)
+    if count == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    spans = [(0, count - 1)]
+    while spans:
+        first, last = spans.pop()
+        if last - first < 2:
+            continue
+        start = points[first]
+        segment = points[last] - start
+        inner = points[first + 1:last] - start
+        length = segment @ segment
+        if length > 0:
+            t = np.clip(inner @ segment / length, 0.0, 1.0)
+            inner = inner - t[:, None] * segment
+        distances = np.einsum("ij,ij->i", inner, inner)
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance * tolerance:
+            middle = first + 1 + farthest
+            keep[middle] = True
+            spans.append((first, middle))
+            spans.append((middle, last))
+    return keep
+
+
+def _chain_points(start, chain) -> np.ndarray:
+    """Return the (len(chain) + 1, 3) array of X/Y/Z positions before a chain and after each of its blocks."""
+    # Axes still unknown at the start of the chain are never set inside it: constant
+    numerics = [(0, 0) if word is None else (word.numeric.scaled, word.numeric.precision)
+                for axes in [start] + [axes for _, axes in chain] for word in axes.values()]
+    scaled, precision = np.array(numerics, dtype=np.int64).T
+    return (scaled / 10.0 ** precision).reshape(len(chain) + 1, len(AXES))
+
+
+class _ChainPass:
+    """
+    Scan shared by the passes that rewrite chains of plain G01 moves.
+
+    Chains are runs of consecutive blocks that hold nothing but X/Y/Z values
+    (and possibly a repeated G01) while the REQUIRED_MODES are in effect.
+    Blocks with a feed, another G or M code, a macro variable value, a comment
+    or any other word end the chain and are kept as they are, so feed changes
+    and modal boundaries are preserved. Modes and positions are forgotten at
+    blocks with N labels, which jumps can reach from elsewhere. Subclasses rewrite each chain in
+    _rewrite(start, chain).
+    """
+    REQUIRED_MODES = {ModalGroup.MOTION: 1, ModalGroup.DISTANCE_MODE: 90, ModalGroup.TOOL_RADIUS_COMPENSATION: 40, ModalGroup.CANNED_CYCLES: 80}
+    RESET_MODES = {ModalGroup.TOOL_RADIUS_COMPENSATION: 40, ModalGroup.CANNED_CYCLES: 80}
+
+    def __init__(self, assume_reset: bool = True):
+        """
+        :param assume_reset: If True, the program starts in the control's reset state (RESET_MODES,
+            e.g. cutter compensation and canned cycles cancelled).
+        """
+        self.assume_reset = assume_reset
+
+    def _run(self, program) -> Program:
+        self._modal = dict(self.RESET_MODES) if self.assume_reset else {}
+        self._axes = dict.fromkeys(AXES)  # Axis letter -> word that set the current position, None if unknown
+        self._feed = None  # F word in effect
+        self._chainable = False  # REQUIRED_MODES in effect
+
+        rewritten = Program(program.o_number, program.comment, line_ending=program.line_ending)
+        chain = []  # (item, axis words after the block)
+        start = None
+        for item in program.blocks:
+            block = item.get_block() if hasattr(item, "get_block") else item
+            if self._in_chain(block):
+                if not chain:
+                    start = dict(self._axes)
+                for word in block.words:
+                    letter = word.address.__name__
+                    if letter in self._axes:
+                        self._axes[letter] = word
+                chain.append((item, dict(self._axes)))
+                continue
+            if chain:
+                rewritten.blocks.extend(self._rewrite(start, chain))
+                chain = []
+            rewritten.add_block(item)
+            self._update(block)
+        if chain:
+            rewritten.blocks.extend(self._rewrite(start, chain))
+        return rewritten
+
+    def _rewrite(self, start, chain):
+        """Yield the blocks replacing a chain, given the axis words in effect before it and after each block."""
+        raise NotImplementedError
+
+    def _in_chain(self, block):
+        """True if a block is a plain G01 move that may be rewritten."""
+        if type(block) is not Block or not self._chainable:
+            return False
+        moves = False
+        for word in block.words:
+            if not _is_word(type(word)) or word.numeric is None:
+                return False
+            letter = word.address.__name__
+            if letter in AXES:
+                numeric = word.numeric
+                if type(numeric) is not Numeric or numeric.variable is not None or self._axes[letter] is None:
+                    return False  # Macro variable value, or first position of an unknown axis
+                moves = True
+            elif letter != "G" or word_code(word) != 1:
+                return False
+        return moves
+
+    def _update(self, block):
+        """Track modes, feed and positions through a block that is kept as it is."""
+        if type(block) is not Block:
+            self._forget()  # Loops and other entries
+            return
+        if any(_is_word(type(word)) and word.address.__name__ == "N" for word in block.words):
+            self._forget()  # Jump target (M97, M99 P): the state on arrival is not the one tracked so far
+        modal = self._modal
+        axes = {}
+        for word in block.words:
+            if not _is_word(type(word)) or word.numeric is None:
+                continue
+            letter = word.address.__name__
+            if letter == "G":
+                group = modal_group_of(word)
+                if group is None:
+                    self._forget()  # Non-modal G code (G28, G53, G65...) or G set from a variable
+                    return
+                modal[group] = word_code(word)
+                if group in (ModalGroup.WORK_COORDINATE_SYSTEM, ModalGroup.TOOL_LENGTH_COMPENSATION, ModalGroup.UNIT_SELECTION):
+                    self._axes = dict.fromkeys(AXES)
+            elif letter == "M" and (word_code(word) is None or word_code(word) in _BARRIER_M_CODES):
+                self._forget()
+                return
+            elif letter == "F":
+                self._feed = word
+            elif letter in AXES:
+                axes[letter] = word
+        self._chainable = all(modal.get(group) == code for group, code in self.REQUIRED_MODES.items())
+        if modal.get(ModalGroup.DISTANCE_MODE) != 90:
+            self._axes = dict.fromkeys(AXES)
+            return
+        for letter, word in axes.items():
+            numeric = word.numeric
+            self._axes[letter] = word if type(numeric) is Numeric and numeric.variable is None else None
+
+    def _forget(self):
+        self._modal = {}
+        self._axes = dict.fromkeys(AXES)
+        self._feed = None
+        self._chainable = False
+
+
+class PolylineDecimator(_ChainPass):
+    """
+    Drops G01 blocks whose end points lie within a tolerance of the simplified path.
+
+    Each chain of plain G01 blocks (see _ChainPass: G01, G90, G40 and G80 in
+    effect, no feed or other words) is simplified with douglas_peucker() from
+    the position before its first block to the end of its last block; a kept
+    block that follows dropped ones gets the axis words the dropped blocks had
+    changed.
+    """
+
+    def __init__(self, tolerance: float = 0.0005, assume_reset: bool = True):
+        """
+        :param tolerance: Maximum distance (program units) between a dropped end point and the new path.
+        :param assume_reset: If True, the program starts with cutter compensation and canned cycles
+            cancelled (G40, G80), as after a control reset.
+        """
+        if tolerance < 0:
+            raise ValueError("Tolerance must not be negative")
+        super().__init__(assume_reset)
+        self.tolerance = tolerance
+        self.removed_blocks = 0  # Blocks dropped by the last decimate()
+        self.chains = 0  # Chains simplified by the last decimate()
+
+    def decimate(self, program) -> Program:
+        """Return a copy of the program with its G01 chains simplified."""
+        self.removed_blocks = 0
+        self.chains = 0
+        return self._run(program)
+
+    def _rewrite(self, start, chain):
+        """Yield the kept blocks of a chain."""
+        if len(chain) < 2:
+            for item, _ in chain:
+                yield item
+            return
+        points = _chain_points(start, chain)
+        keep = douglas_peucker(points, self.tolerance)[1:]
+        self.chains += 1
+        self.removed_blocks += len(chain) - int(np.count_nonzero(keep))
+        previous = start
+        dropped = False
+        for (item, axes), kept in zip(chain, keep):
+            if not kept:
+                dropped = True
+                continue
+            yield self._restated(item, axes, previous) if dropped else item
+            previous = axes
+            dropped = False
+
+    @staticmethod
+    def _restated(item, axes, previous):
+        """Return a block that also states the axes the dropped blocks before it had changed."""
+        block = item.get_block() if hasattr(item, "get_block") else item
+        own = {word.address.__name__: word for word in block.words if word.address.__name__ in AXES}
+        restated = Block()
+        for word in block.words:
+            if word.address.__name__ not in AXES:
+                restated.add_word(word)
+        added = False
+        for letter in AXES:
+            word = own.get(letter)
+            if word is None and axes[letter] is not None and axes[letter].numeric.value != previous[letter].numeric.value:
+                word = axes[letter]
+                added = True
+            if word is not None:
+                restated.add_word(word)
+        return restated if added else item
+
+
+def decimate_polylines(program, tolerance: float = 0.0005) -> Program:
+    """Return a copy of the program with G01 chains simplified within `tolerance` (see PolylineDecimator)."""
+    return PolylineDecimator(tolerance).decimate(program)
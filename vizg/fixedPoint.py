@@ -0,0 +1,83 @@
+from decimal import Decimal, InvalidOperation
+
+# Quanta and scale factors are built once per precision and reused
+_QUANTA = {}
+_SCALES = {}
+_ZEROS = {}
+
+
+def quantum(precision: int) -> Decimal:
+    """Return the cached Decimal quantum for a precision (e.g. Decimal('1.0000') for 4)."""
+    q = _QUANTA.get(precision)
+    if q is None:
+        q = _QUANTA[precision] = Decimal(f'1.{"0" * precision}')
+    return q
+
+
+def scale(precision: int) -> int:
+    """Return the cached integer scale factor 10 ** precision."""
+    s = _SCALES.get(precision)
+    if s is None:
+        s = _SCALES[precision] = 10 ** precision
+    return s
+
+
+def to_scaled(value, precision: int) -> int:
+    """
+    Convert a number to a scaled integer (value * 10 ** precision).
+
+    Non-integer values are quantized with the default Decimal context, exactly as
+    Numeric always has, so the stored digits do not change.
+
+    :param value: int, float, str or Decimal.
+    :param precision: Number of decimal places to keep.
+    """
+    if type(value) is int:
+        return value * scale(precision)
+    if type(value) is float and value - value == 0:
+        # Exact round-half-even of the binary value, the same result Decimal(value).quantize() gives
+        numerator, denominator = value.as_integer_ratio()
+        scaled, remainder = divmod(numerator * scale(precision), denominator)
+        remainder *= 2
+        if remainder > denominator or (remainder == denominator and scaled & 1):
+            scaled += 1
+        return scaled
+    try:
+        d = value if isinstance(value, Decimal) else Decimal(value)
+        return int(d.quantize(quantum(precision)).scaleb(precision))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Invalid numeric value: {value}")
+
+
+def to_decimal(scaled: int, precision: int) -> Decimal:
+    """Convert a scaled integer back to a Decimal with exactly `precision` decimal places."""
+    return Decimal(scaled).scaleb(-precision)
+
+
+def format_fixed(scaled: int, precision: int, leading_zero: bool = False) -> str:
+    """
+    Format a scaled integer as G-code text.
+
+    Produces the same text as the Decimal based Numeric.__repr__: integers with
+    precision 0 are zero padded to two digits (G01, T03), leading_zero pads
+    integer-valued numbers (01.0000), anything else is written as-is (1.5000).
+    """
+    sign = '-' if scaled < 0 else ''
+    if scaled < 0:
+        scaled = -scaled
+
+    if precision == 0:
+        return f"{sign}{scaled:02d}"
+
+    whole, fraction = divmod(scaled, scale(precision))
+    if fraction == 0 and leading_zero:
+        zeros = _ZEROS.get(precision)
+        if zeros is None:
+            zeros = _ZEROS[precision] = '0' * precision
+        return f"{sign}{whole:02d}.{zeros}"
+    return f"{sign}{whole}.{fraction:0{precision}d}"
+
+
+def format_value(value, precision: int = 4, leading_zero: bool = False) -> str:
+    """Format a plain number as G-code text without building a Numeric."""
+    return format_fixed(to_scaled(value, precision), precision, leading_zero)
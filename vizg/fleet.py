@@ -0,0 +1,149 @@
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+from vizg.interpreter import MacroRunner, TraceStep, as_float
+from vizg.machine import Machine
+from vizg.words import G65
+
+
+class MachineFleet(MacroRunner):
+    """
+    Batched macro execution over many Machine states at once.
+
+    The macro variable tables of N machines are stored as an N x V float matrix
+    (one row per machine, one column per variable number). The control flow is
+    MacroInterpreter's (see interpreter.MacroRunner); only the values are
+    vectorised: assignments and Expressions are evaluated column-wise for all
+    machines in one NumPy operation, using the same compiled evaluators.
+
+    WHILE loops run with a mask of the machines whose condition still holds, so
+    machines can take different numbers of iterations. Non-numeric variables
+    (e.g. #0) are stored as NaN. Motion blocks and DPRNT are skipped, and a
+    division by zero gives inf/NaN for the machines it affects instead of raising.
+    """
+
+    def __init__(self, machines: Iterable[Machine], programs=None, max_steps: int = 1_000_000, max_iterations: int = 100_000, max_depth: int = 16, resident=G65.RESIDENT_PROGRAMS):
+        """
+        :param machines: Machines whose macro variable tables fill the rows of the matrix.
+        :param programs: Optional iterable of Programs callable with M98/G65, looked up by O-number.
+        :param max_steps: Maximum number of blocks executed per run.
+        :param max_iterations: Maximum number of iterations of a single WHILE loop.
+        :param max_depth: Maximum subprogram nesting depth.
+        :param resident: O-numbers of the macros resident in the controller, skipped when not registered.
+        """
+        machines = list(machines)
+        if not machines:
+            raise ValueError("A fleet needs at least one machine")
+        super().__init__(programs, max_steps, max_iterations, max_depth, resident)
+
+        self.machine_ids = [machine.machine_id for machine in machines]
+        self.numbers = np.array(sorted(machines[0].macro_variables), dtype=np.int64)
+        self.columns = {int(num): col for col, num in enumerate(self.numbers)}
+
+        # Fortran order keeps every variable's column contiguous
+        self.values = np.empty((len(machines), len(self.numbers)), dtype=np.float64, order="F")
+        for row, machine in enumerate(machines):
+            self.values[row] = [as_float(machine.macro_variables[int(num)]) for num in self.numbers]
+        self._variables = _ColumnView(self)
+
+    @classmethod
+    def replicate(cls, machine: Machine, count: int, **kwargs) -> "MachineFleet":
+        """Build a fleet of `count` copies of one machine's state."""
+        fleet = cls([machine], **kwargs)
+        fleet.values = np.asfortranarray(np.repeat(fleet.values, count, axis=0))
+        fleet.machine_ids = [f"{machine.machine_id}[{i}]" for i in range(count)]
+        return fleet
+
+    def __len__(self):
+        """Return the number of machines."""
+        return self.values.shape[0]
+
+    def column(self, num: int) -> np.ndarray:
+        """Return the writable column (one value per machine) of a macro variable."""
+        col = self.columns.get(num)
+        if col is None:
+            raise ValueError(f"Macro variable #{num} does not exist.")
+        return self.values[:, col]
+
+    def get(self, num: int) -> np.ndarray:
+        """Return a copy of a macro variable's value on every machine."""
+        return self.column(num).copy()
+
+    def set(self, num: int, values):
+        """Set a macro variable on every machine, from a scalar or one value per machine."""
+        self.column(num)[...] = values
+
+    def to_machine(self, index: int, machine_id: Optional[str] = None) -> Machine:
+        """Build a Machine holding the state of one row. Non-numeric variables keep their default values."""
+        machine = Machine(machine_id or self.machine_ids[index])
+        for num, value in zip(self.numbers.tolist(), self.values[index].tolist()):
+            if isinstance(machine.macro_variables[num], str) and value != value:
+                continue
+            machine.set_macro_variable(num, value)
+        return machine
+
+    def execute(self, program, mask=None) -> int:
+        """
+        Run a program on every machine (or only those selected by a boolean mask).
+
+        Returns the number of executed blocks.
+        """
+        for _ in self.run(program, mask):
+            pass
+        return self._steps
+
+    def run(self, program, mask=None) -> Iterator[TraceStep]:
+        """Run a program like execute() and lazily yield a TraceStep for every executed block."""
+        mask = np.ones(len(self), dtype=bool) if mask is None else np.asarray(mask, dtype=bool).copy()
+        self._steps = 0
+        self._ended = np.zeros(len(self), dtype=bool)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            yield from self._run_program(program, mask, depth=0)
+
+    def evaluate(self, operand) -> np.ndarray:
+        """Evaluate a Numeric, MacroVariable or Expression on every machine."""
+        return self._compiled(operand)(self._variables)
+
+    def _assign(self, num, value, mask):
+        column = self.column(num)
+        if mask.all():
+            column[...] = value
+        else:
+            np.copyto(column, value, where=mask)
+
+    def _test(self, condition, mask):
+        return mask & condition(self.column)
+
+    def _target(self, values, mask, letter):
+        values = np.broadcast_to(values, mask.shape)[mask]
+        if (values != values[0]).any():
+            raise ValueError(f"Subprogram call {letter} value differs between machines")
+        return int(values[0])
+
+    @staticmethod
+    def _any(mask) -> bool:
+        return bool(mask.any())
+
+    @staticmethod
+    def _without(mask, other):
+        return mask & ~other
+
+    @staticmethod
+    def _union(mask, other):
+        return mask | other
+
+    @staticmethod
+    def _none(mask):
+        return np.zeros_like(mask)
+
+
+class _ColumnView:
+    """Indexable by macro variable number, returning that variable's column; what compiled evaluators read."""
+    __slots__ = ('fleet',)
+
+    def __init__(self, fleet):
+        self.fleet = fleet
+
+    def __getitem__(self, num):
+        return self.fleet.column(num)
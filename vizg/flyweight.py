@@ -0,0 +1,44 @@
+import weakref
+from abc import ABCMeta
+
+# One shared instance per parameterless word class (G00, M06, ...)
+_FLYWEIGHTS = {}
+
+# Interned words keyed by their value; entries vanish once no block uses the word
+_INTERNED = weakref.WeakValueDictionary()
+
+
+class FlyweightMeta(ABCMeta):
+    """
+    Metaclass for Word that returns a shared instance for classes declaring FLYWEIGHT = True.
+
+    Only argument-less calls are shared (e.g. G01()), so words that carry
+    per-instance data such as M98(subprogram_o_number) are built as usual.
+    """
+
+    def __call__(cls, *args, **kwargs):
+        if args or kwargs or not cls.FLYWEIGHT:
+            return super().__call__(*args, **kwargs)
+        instance = _FLYWEIGHTS.get(cls)
+        if instance is None:
+            instance = _FLYWEIGHTS[cls] = super().__call__()
+        return instance
+
+
+def intern_word(word):
+    """
+    Return the shared instance equal to the given word, registering it if it is the first.
+
+    Useful for address/value pairs that repeat through a program (e.g. Z-0.1000 or F20.0000).
+    Words are held weakly, so the registry does not keep unused words alive.
+    """
+    key = word._key()
+    shared = _INTERNED.get(key)
+    if shared is None:
+        _INTERNED[key] = shared = word
+    return shared
+
+
+def interned_count():
+    """Return the number of distinct words currently interned."""
+    return len(_INTERNED)
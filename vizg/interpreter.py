@@ -0,0 +1,422 @@
+import math
+import re
+from typing import Iterator
+
+from vizg.address import G, L, M, P
+from vizg.block import Block
+from vizg.compiler import EvaluatorCache
+from vizg.loop import Loop
+from vizg.macroVariable import MacroVariable
+from vizg.numeric import Numeric
+from vizg.operators import OperatorWord, Expression
+from vizg.specialWords import DPRNT
+from vizg.word import Word
+from vizg.words import G65
+
+# G65 argument letters and the local variables (#1-#26) they set
+G65_ARGUMENTS = {
+    "A": 1, "B": 2, "C": 3, "I": 4, "J": 5, "K": 6, "D": 7, "E": 8, "F": 9, "H": 11,
+    "M": 13, "Q": 17, "R": 18, "S": 19, "T": 20, "U": 21, "V": 22, "W": 23, "X": 24, "Y": 25, "Z": 26,
+}
+
+_ARITHMETIC = {
+    "+": lambda a, b: a + b,
+    "-": lambda a, b: a - b,
+    "*": lambda a, b: a * b,
+    "/": lambda a, b: a / b,
+}
+
+_COMPARISONS = {
+    "EQ": lambda a, b: a == b,
+    "NE": lambda a, b: a != b,
+    "GT": lambda a, b: a > b,
+    "GE": lambda a, b: a >= b,
+    "LT": lambda a, b: a < b,
+    "LE": lambda a, b: a <= b,
+}
+
+_CONDITION_TOKEN_RE = re.compile(r"\s*(#\d+|\d+\.?\d*|\.\d+|EQ|NE|GT|GE|LT|LE|AND|OR|[-+*/\[\]])")
+
+_DPRNT_VARIABLE_RE = re.compile(r"#(\d+)\[(\d)(\d)\]")
+
+
+class ExecutionLimitError(RuntimeError):
+    """Raised when a program exceeds the interpreter's step or loop iteration limits."""
+
+
+class TraceStep:
+    """One executed block of an interpreter run."""
+    __slots__ = ('step', 'o_number', 'block', 'assigned', 'output')
+
+    def __init__(self, step, o_number, block, assigned=None, output=None):
+        """
+        :param step: Running count of executed blocks.
+        :param o_number: O-number of the program the block belongs to.
+        :param block: The executed block (or Loop, when its condition was tested).
+        :param assigned: (variable number, value) if the block set a macro variable.
+        :param output: Text printed by a DPRNT in the block, if any.
+        """
+        self.step = step
+        self.o_number = o_number
+        self.block = block
+        self.assigned = assigned
+        self.output = output
+
+    def __repr__(self):
+        return f"<TraceStep {self.step} O{self.o_number}: {self.block}>"
+
+
+def as_float(value):
+    """Convert a machine variable value to a float; non-numeric values (e.g. '#0 NaN') become NaN."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def compile_condition(text: str):
+    """
+    Compile a WHILE condition such as '[#100 LT 50]' into a callable taking a variable getter.
+
+    Supports +, -, *, /, the EQ/NE/GT/GE/LT/LE comparisons, AND, OR and nested brackets.
+    """
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _CONDITION_TOKEN_RE.match(text, pos)
+        if match is None:
+            raise ValueError(f"Unsupported condition: {text}")
+        tokens.append(match.group(1))
+        pos = match.end()
+
+    levels = [("OR",), ("AND",), tuple(_COMPARISONS), ("+", "-"), ("*", "/")]
+
+    def parse(pos, level):
+        if level == len(levels):
+            return parse_operand(pos)
+        left, pos = parse(pos, level + 1)
+        while pos < len(tokens) and tokens[pos] in levels[level]:
+            op = tokens[pos]
+            right, pos = parse(pos + 1, level + 1)
+            left = _combine(op, left, right)
+        return left, pos
+
+    def parse_operand(pos):
+        if pos >= len(tokens):
+            raise ValueError(f"Condition ended unexpectedly: {text}")
+        token = tokens[pos]
+        if token == "[":
+            inner, pos = parse(pos + 1, 0)
+            if pos >= len(tokens) or tokens[pos] != "]":
+                raise ValueError(f"Missing closing ']' in condition: {text}")
+            return inner, pos + 1
+        if token.startswith("#"):
+            num = int(token[1:])
+            return (lambda get: get(num)), pos + 1
+        if token == "-":
+            operand, pos = parse_operand(pos + 1)
+            return (lambda get: -operand(get)), pos
+        try:
+            constant = float(token)
+        except ValueError:
+            raise ValueError(f"Unexpected {token!r} in condition: {text}")
+        return (lambda get: constant), pos + 1
+
+    condition, pos = parse(0, 0)
+    if pos != len(tokens):
+        raise ValueError(f"Unexpected {tokens[pos]!r} in condition: {text}")
+    return condition
+
+
+def _combine(op, left, right):
+    # Element-wise, so conditions also evaluate over NumPy columns (see fleet.MachineFleet)
+    if op == "AND":
+        return lambda get: (left(get) != 0) & (right(get) != 0)
+    if op == "OR":
+        return lambda get: (left(get) != 0) | (right(get) != 0)
+    function = _COMPARISONS.get(op) or _ARITHMETIC[op]
+    return lambda get: function(left(get), right(get))
+
+
+class MacroRunner:
+    """
+    Macro program control flow shared by MacroInterpreter and fleet.MachineFleet.
+
+    Walks the blocks, WHILE loops, M98/G65 calls, M99 returns and M02/M30 ends
+    of a run for the machine states selected by a mask, and yields a TraceStep
+    for every executed block. Subclasses supply the values: how operands are
+    evaluated and assigned, how a loop condition is tested and how masks
+    combine. MacroInterpreter runs one machine with a bool mask; MachineFleet
+    runs N machines with a boolean NumPy array.
+
+    Calls to controller-resident macros (`resident`, e.g. the O98xx probing
+    cycles) are traced and skipped unless a Program with that O-number is
+    registered as a stub; calls to other unregistered programs raise ValueError.
+    """
+
+    def __init__(self, programs=None, max_steps: int = 1_000_000, max_iterations: int = 100_000, max_depth: int = 16, resident=G65.RESIDENT_PROGRAMS):
+        """
+        :param programs: Optional iterable of Programs callable with M98/G65, looked up by O-number.
+        :param max_steps: Maximum number of blocks executed per run.
+        :param max_iterations: Maximum number of iterations of a single WHILE loop.
+        :param max_depth: Maximum subprogram nesting depth.
+        :param resident: O-numbers of the macros resident in the controller, skipped when not registered.
+        """
+        self.programs = {}
+        for program in programs or ():
+            self.register(program)
+        self.max_steps = max_steps
+        self.max_iterations = max_iterations
+        self.max_depth = max_depth
+        self.resident = resident
+        self._conditions = {}
+        self._compiled = EvaluatorCache()
+        self._steps = 0
+        self._ended = None  # Mask of the machines that reached M02/M30 or the main program's M99
+
+    def register(self, program):
+        """Make a Program callable by its O-number."""
+        self.programs[int(program.o_number)] = program
+
+    def evaluate(self, operand):
+        """Evaluate a Numeric, MacroVariable or Expression."""
+        raise NotImplementedError
+
+    # Value hooks, implemented by the subclasses
+
+    def _assign(self, num, value, mask):
+        """Set a macro variable on the masked machines."""
+        raise NotImplementedError
+
+    def _test(self, condition, mask):
+        """Return the mask of the machines in `mask` for which a compiled condition holds."""
+        raise NotImplementedError
+
+    def _target(self, value, mask, letter) -> int:
+        """Return a call's P or L value as an int, the same on every masked machine."""
+        raise NotImplementedError
+
+    def _print(self, text, mask):
+        """Run a DPRNT statement; return the printed text, or None."""
+        return None
+
+    @staticmethod
+    def _any(mask) -> bool:
+        return bool(mask)
+
+    @staticmethod
+    def _without(mask, other):
+        return mask and not other
+
+    @staticmethod
+    def _union(mask, other):
+        return mask or other
+
+    @staticmethod
+    def _none(mask):
+        return False
+
+    # Control flow
+
+    def _run_program(self, program, mask, depth):
+        """Run a program for the masked machines; returns the mask of the machines still running afterwards."""
+        if depth > self.max_depth:
+            raise ExecutionLimitError(f"Subprogram nesting deeper than {self.max_depth}")
+        yield from self._run_blocks(program.blocks, program.o_number, mask, depth)
+        return self._without(mask, self._ended)
+
+    def _run_blocks(self, blocks, o_number, mask, depth):
+        """Run blocks for the masked machines; returns the machines that did not return (M99) or end."""
+        for item in blocks:
+            if not self._any(mask):
+                break
+            if isinstance(item, Loop):
+                mask = yield from self._run_loop(item, o_number, mask, depth)
+                continue
+
+            block = item.get_block() if hasattr(item, "get_block") else item
+            self._count_step()
+            mask = yield from self._execute_block(block, o_number, mask, depth)
+        return mask
+
+    def _run_loop(self, loop, o_number, mask, depth):
+        condition = self._conditions.get(loop.condition_expression)
+        if condition is None:
+            condition = self._conditions[loop.condition_expression] = compile_condition(loop.condition_expression)
+
+        running = mask  # Machines that have not left the program or returned inside the loop
+        active = mask
+        iterations = 0
+        while True:
+            self._count_step()
+            yield TraceStep(self._steps, o_number, loop)
+            active = self._test(condition, active)
+            if not self._any(active):
+                return running
+            iterations += 1
+            if iterations > self.max_iterations:
+                raise ExecutionLimitError(f"WHILE loop {loop.condition_expression} exceeded {self.max_iterations} iterations")
+            survivors = yield from self._run_blocks(loop.blocks, o_number, active, depth)
+            running = self._without(running, self._without(active, survivors))
+            active = survivors
+
+    def _execute_block(self, block, o_number, mask, depth):
+        words = list(block) if isinstance(block, Block) else [block]
+
+        # Macro assignment: #n = value
+        if len(words) == 3 and isinstance(words[0], MacroVariable) and isinstance(words[1], OperatorWord) and words[1].operator == "=":
+            num = int(words[0].num)
+            value = self.evaluate(words[2])
+            self._assign(num, value, mask)
+            yield TraceStep(self._steps, o_number, block, assigned=(num, value))
+            return mask
+
+        output = None
+        addresses = {}
+        for word in words:
+            if isinstance(word, DPRNT):
+                output = self._print(word.text, mask)
+            elif isinstance(word, Word) and word.address not in addresses:
+                addresses[word.address] = word
+
+        yield TraceStep(self._steps, o_number, block, output=output)
+
+        m_code = self._code(addresses.get(M))
+        g_code = self._code(addresses.get(G))
+
+        if m_code == 98:
+            target, repeat = self._call_target(words, mask)
+            program = self._lookup(target)
+            if program is not None:
+                for _ in range(repeat):
+                    mask = yield from self._run_program(program, mask, depth + 1)
+        elif g_code == 65:
+            target, _ = self._call_target(words, mask)
+            program = self._lookup(target)
+            if program is not None:
+                for word in words:
+                    if isinstance(word, Word) and word.address.letter() in G65_ARGUMENTS and word.address not in (G, P, L):
+                        self._assign(G65_ARGUMENTS[word.address.letter()], self.evaluate(word.numeric), mask)
+                mask = yield from self._run_program(program, mask, depth + 1)
+        elif m_code == 99:
+            if depth == 0:
+                self._ended = self._union(self._ended, mask)
+            return self._none(mask)
+        elif m_code in (2, 30):
+            self._ended = self._union(self._ended, mask)
+            return self._none(mask)
+        return mask
+
+    def _code(self, word):
+        if word is None or isinstance(word.numeric, MacroVariable) or word.numeric.variable is not None:
+            return None
+        return int(word.numeric)
+
+    def _call_target(self, words, mask):
+        target, repeat = None, 1
+        for word in words:
+            if isinstance(word, Word) and word.address is P:
+                target = self._target(self.evaluate(word.numeric), mask, "P")
+            elif isinstance(word, Word) and word.address is L:
+                repeat = self._target(self.evaluate(word.numeric), mask, "L")
+        if target is None:
+            raise ValueError("Subprogram call without a P address")
+        return target, repeat
+
+    def _lookup(self, o_number):
+        """Return the registered program, or None for a resident macro to skip."""
+        program = self.programs.get(o_number)
+        if program is None and o_number not in self.resident:
+            raise ValueError(f"Subprogram O{o_number} is not registered")
+        return program
+
+    def _count_step(self):
+        self._steps += 1
+        if self._steps > self.max_steps:
+            raise ExecutionLimitError(f"Program exceeded {self.max_steps} steps")
+
+
+class MacroInterpreter(MacroRunner):
+    """
+    Runs macro programs offline against a Machine and yields an execution trace.
+
+    Executes macro assignments (#n = expression), WHILE/DO loops, M98 and G65
+    calls to registered programs, M99 returns and DPRNT output. Motion
+    blocks are traced but not simulated. Execution stops at M02/M30, or at M99
+    in the main program. Calls to unregistered controller-resident macros are
+    skipped (see MacroRunner).
+    """
+
+    def __init__(self, machine, programs=None, max_steps: int = 1_000_000, max_iterations: int = 100_000, max_depth: int = 16, resident=G65.RESIDENT_PROGRAMS):
+        """
+        :param machine: Machine whose macro variables are read and written.
+        :param programs: Optional iterable of Programs callable with M98/G65, looked up by O-number.
+        :param max_steps: Maximum number of blocks executed per run.
+        :param max_iterations: Maximum number of iterations of a single WHILE loop.
+        :param max_depth: Maximum subprogram nesting depth.
+        :param resident: O-numbers of the macros resident in the controller, skipped when not registered.
+        """
+        super().__init__(programs, max_steps, max_iterations, max_depth, resident)
+        self.machine = machine
+        self.output = []  # DPRNT lines printed during runs
+
+    def execute(self, program) -> int:
+        """Run a program to completion, discarding the trace. Returns the number of executed blocks."""
+        for _ in self.run(program):
+            pass
+        return self._steps
+
+    def run(self, program) -> Iterator[TraceStep]:
+        """Run a program and lazily yield a TraceStep for every executed block."""
+        self._steps = 0
+        self._ended = False
+        yield from self._run_program(program, True, depth=0)
+
+    def evaluate(self, operand) -> float:
+        """Evaluate a Numeric, MacroVariable or Expression against the machine, using a compiled evaluator."""
+        try:
+            return float(self._compiled(operand)(self.machine.macro_variables))
+        except (KeyError, TypeError):
+            # Missing or non-numeric variables: walk the tree to get the machine's error or NaN handling
+            return self._evaluate_tree(operand)
+
+    def _evaluate_tree(self, operand) -> float:
+        if isinstance(operand, Expression):
+            return _ARITHMETIC[operand.operator.operator](self._evaluate_tree(operand.left), self._evaluate_tree(operand.right))
+        if isinstance(operand, MacroVariable):
+            return self.get(int(operand.num))
+        if isinstance(operand, Numeric):
+            if operand.variable is not None:
+                return self.get(int(operand.variable.num))
+            return float(operand)
+        raise ValueError(f"Cannot evaluate {operand!r}")
+
+    def get(self, num: int) -> float:
+        """Read a macro variable as a float."""
+        return as_float(self.machine.get_macro_variable(num))
+
+    def _assign(self, num, value, mask):
+        self.machine.set_macro_variable(num, value)
+
+    def _test(self, condition, mask):
+        return mask and bool(condition(self.get))
+
+    def _target(self, value, mask, letter):
+        return int(value)
+
+    def _print(self, text, mask):
+        output = self._format_dprnt(text)
+        self.output.append(output)
+        return output
+
+    def _format_dprnt(self, text):
+        """Render a DPRNT statement the way the controller prints it."""
+        def variable(match):
+            value = self.get(int(match.group(1)))
+            whole, fraction = int(match.group(2)), int(match.group(3))
+            if math.isnan(value):
+                return " " * (whole + (fraction + 1 if fraction else 0))
+            width = whole + (fraction + 1 if fraction else 0) + 1  # Sign position
+            return f"{value:{width}.{fraction}f}"
+        return _DPRNT_VARIABLE_RE.sub(variable, text).replace("*", " ")
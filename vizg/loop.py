@@ -15,16 +15,23 @@ class Loop:
         """Adds a block of G-code inside the loop."""
         self.blocks.append(block)
 
-    def __repr__(self):
+    def iter_lines(self):
         """
-        Returns the string representation of the loop (WHILE-DO/END format with loop ID numbers).
+        Lazily yields the lines of the loop (WHILE-DO/END format with loop ID numbers).
         """
         loop_id_str = f"{self.loop_id}" if self.loop_id else ""
-        lines = []
-        lines.append(f"WHILE{self.condition_expression}DO{loop_id_str}")  # Start of the loop
+        yield f"WHILE{self.condition_expression}DO{loop_id_str}"  # Start of the loop
 
         for block in self.blocks:
-            lines.append(str(block))  # Add each block inside the loop
+            if hasattr(block, "iter_lines"):
+                yield from block.iter_lines()  # Nested loop
+            else:
+                yield str(block)  # Add each block inside the loop
 
-        lines.append(f"END{loop_id_str}")  # End of the loop with the same loop ID
-        return '\n'.join(lines)
\ No newline at end of file
+        yield f"END{loop_id_str}"  # End of the loop with the same loop ID
+
+    def __repr__(self):
+        """
+        Returns the string representation of the loop (WHILE-DO/END format with loop ID numbers).
+        """
+        return '\n'.join(self.iter_lines())
\ No newline at end of file
@@ -0,0 +1,241 @@
+import re
+from typing import Iterable, Optional
+
+import numpy as np
+
+from vizg.block import Block
+from vizg.commands import IncrementVariable, SetVariable
+from vizg.loop import Loop
+from vizg.macroVariable import MacroVariable
+from vizg.modalIndex import _is_word
+from vizg.numeric import Numeric
+from vizg.program import Program
+from vizg.words import AddressWord, AWord, XWord, YWord, ZWord
+
+# Letters whose values may advance from one iteration to the next, and the word class that takes a variable
+_STEPPED = {"X": XWord, "Y": YWord, "Z": ZWord, "A": AWord, "I": None, "J": None, "K": None, "R": None}
+_MAX_PRECISION = 4  # Precision of the values written by SetVariable
+
+_VARIABLE_RE = re.compile(r"#(\d+)")
+
+
+def _stepped(word):
+    """True if a word's value may change between iterations (a plain, not too precise X/Y/Z/A/I/J/K/R value)."""
+    numeric = word.numeric
+    return (word.address.__name__ in _STEPPED and type(numeric) is Numeric
+            and numeric.variable is None and numeric.precision <= _MAX_PRECISION)
+
+
+def _analyse(item):
+    """
+    Return (shape, values) of a program entry.
+
+    The shape is the block with the stepped words' values left out, values holds
+    those values as scaled integers. Entries that cannot be folded (Loops, blocks
+    with N labels) have no shape.
+    """
+    block = item.get_block() if hasattr(item, "get_block") else item
+    if type(block) is not Block:
+        return None, ()
+    shape = []
+    values = []
+    for word in block.words:
+        if _is_word(type(word)) and word.numeric is not None:
+            if word.address.__name__ == "N":
+                return None, ()
+            if _stepped(word):
+                shape.append((word.address.__name__, word.numeric.precision))
+                values.append(word.numeric.scaled)
+                continue
+        shape.append(repr(word))
+    return tuple(shape), tuple(values)
+
+
+def _window_sum(counts, width):
+    """Return the sums of every `width` consecutive entries."""
+    totals = np.concatenate(([0], np.cumsum(counts, dtype=np.int64)))
+    return totals[width:] - totals[:-width]
+
+
+def _screen(shapes, values, max_period):
+    """
+    Return, per period, which start indices can begin a profitable run (screens[period][start]).
+
+    Tests every start at once on the arrays of shapes and values: a run needs
+    its first two repetitions to have the same shapes, and then either pays off
+    with two repetitions (few values change) or has a third one (zero second
+    differences). Starts that fail both cannot give a run in _best_run.
+    """
+    count = len(shapes)
+    shape_ids = np.asarray(shapes, dtype=np.int64)
+    matrix = np.zeros((count, max((len(item_values) for item_values in values), default=0) or 1), dtype=np.int64)
+    for index, item_values in enumerate(values):
+        matrix[index, :len(item_values)] = item_values
+
+    screens = [None]
+    for period in range(1, max_period + 1):
+        if 2 * period > count:
+            break
+        same = (shape_ids[:-period] >= 0) & (shape_ids[:-period] == shape_ids[period:])
+        delta = matrix[period:] - matrix[:-period]
+        # Two repetitions save period - (period + 2 * stepped + 4) blocks
+        two = (_window_sum(~same, period) == 0) & (period - 2 * _window_sum(np.count_nonzero(delta, axis=1), period) - 4 > 0)
+        progression = same[:-period] & same[period:] & ~(delta[period:] != delta[:-period]).any(axis=1)
+        if len(progression) >= period:
+            two[:len(progression) - period + 1] |= _window_sum(~progression, period) == 0
+        screens.append(two)
+    return screens
+
+
+def _variable_word(word, variable):
+    cls = _STEPPED[word.address.__name__]
+    if cls is None:
+        return AddressWord(word.address, variable)
+    return cls(variable)
+
+
+class LoopFolder:
+    """
+    Rewrites runs of blocks whose coordinates advance by a constant step into WHILE/DO loops.
+
+    A run is `iterations` repetitions of a group of `period` blocks that are
+    identical except for X/Y/Z/A/I/J/K/R values, each of which changes by the
+    same amount from one repetition to the next (grid drilling, step-down
+    passes...). The run becomes:
+
+        #100 = 0            (counter)
+        #101 = <first X>    (one variable per value that changes)
+        WHILE [#100 LT <iterations>] DO1
+        <group, with X#101...>
+        #101 = #101 + <step>
+        #100 = #100 + 1
+        END1
+
+    Runs are folded only when that is shorter than the original blocks. Folding
+    uses macro variables from `variables` that the program does not reference
+    itself; they must not be used by subprograms called from the folded blocks
+    either. Values are accumulated by the control in floating point, which is
+    exact to well below the 0.0001 resolution of the words.
+    """
+
+    def __init__(self, variables: Iterable[int] = range(100, 200), max_period: int = 16):
+        """
+        :param variables: Macro variables the folder may use (common variables #100-#199 by default).
+        :param max_period: Maximum number of blocks in one loop iteration.
+        """
+        self.variables = list(variables)
+        self.max_period = max_period
+        self.folded_blocks = 0  # Blocks replaced by loops in the last fold()
+        self.loops = 0
+
+    def fold(self, program) -> Program:
+        """Return a copy of the program with arithmetic-progression runs folded into loops."""
+        items = list(program.blocks)
+        used = set()
+        for item in items:
+            used.update(int(number) for number in _VARIABLE_RE.findall(str(item)))
+        pool = [number for number in self.variables if number not in used]
+
+        shapes = []
+        values = []
+        interned = {}
+        for index, item in enumerate(items):
+            shape, item_values = _analyse(item)
+            shapes.append(-index - 1 if shape is None else interned.setdefault(shape, len(interned)))
+            values.append(item_values)
+
+        screens = _screen(shapes, values, self.max_period)
+
+        self.folded_blocks = 0
+        self.loops = 0
+        folded = Program(program.o_number, program.comment, line_ending=program.line_ending)
+        index = 0
+        while index < len(items):
+            run = self._best_run(shapes, values, index, len(pool) - 1, screens) if len(pool) > 1 else None
+            if run is None:
+                folded.add_block(items[index])
+                index += 1
+                continue
+            period, iterations, steps = run
+            folded.blocks.extend(self._loop(items, values, index, period, iterations, steps, pool))
+            self.folded_blocks += period * iterations
+            self.loops += 1
+            index += period * iterations
+        return folded
+
+    def _best_run(self, shapes, values, start, available, screens):
+        """Return (period, iterations, steps) of the most profitable run starting at `start`, or None."""
+        count = len(shapes)
+        best = None
+        best_saving = 0
+        for period in range(1, self.max_period + 1):
+            if start + 2 * period > count:
+                break
+            if not screens[period][start]:
+                continue
+            if any(shapes[start + j] < 0 or shapes[start + j] != shapes[start + period + j] for j in range(period)):
+                continue
+            steps = [tuple(b - a for a, b in zip(values[start + j], values[start + period + j])) for j in range(period)]
+
+            iterations = 2
+            position = start + 2 * period
+            while position + period <= count:
+                if any(shapes[position + j] != shapes[start + j] for j in range(period)):
+                    break
+                if any(value != first + iterations * step
+                       for j in range(period)
+                       for value, first, step in zip(values[position + j], values[start + j], steps[j])):
+                    break
+                iterations += 1
+                position += period
+
+            stepped = sum(1 for step in steps for delta in step if delta)
+            if stepped > available:
+                continue
+            # Counter and variable initialisation, WHILE, body, increments, END
+            saving = period * iterations - (period + 2 * stepped + 4)
+            if saving > best_saving:
+                best, best_saving = (period, iterations, steps), saving
+        return best
+
+    @staticmethod
+    def _loop(items, values, start, period, iterations, steps, pool):
+        counter = pool[0]
+        free = iter(pool[1:])
+        yield SetVariable(counter, 0, False)
+
+        body = []
+        increments = []
+        for j in range(period):
+            item = items[start + j]
+            if not any(steps[j]):
+                body.append(item)
+                continue
+            block = item.get_block() if hasattr(item, "get_block") else item
+            rewritten = Block()
+            slot = 0
+            for word in block.words:
+                if _is_word(type(word)) and word.numeric is not None and _stepped(word):
+                    step = steps[j][slot]
+                    precision = word.numeric.precision
+                    slot += 1
+                    if step:
+                        number = next(free)
+                        yield SetVariable(number, Numeric.from_scaled(values[start + j][slot - 1], precision).value, False)
+                        increments.append(IncrementVariable(number, Numeric.from_scaled(step, precision).value, precision))
+                        rewritten.add_word(_variable_word(word, MacroVariable(f"#{number}", number)))
+                        continue
+                rewritten.add_word(word)
+            body.append(rewritten)
+
+        loop = Loop(f"[#{counter} LT {iterations}]", loop_id=1)
+        for item in body + increments:
+            loop.add_block(item)
+        loop.add_block(IncrementVariable(counter, 1, 1))
+        yield loop
+
+
+def fold_loops(program, variables: Optional[Iterable[int]] = None, max_period: int = 16) -> Program:
+    """Return a copy of the program with arithmetic-progression runs folded into WHILE/DO loops (see LoopFolder)."""
+    folder = LoopFolder(max_period=max_period) if variables is None else LoopFolder(variables, max_period)
+    return folder.fold(program)
@@ -0,0 +1,407 @@
+from array import array
+from collections.abc import MutableMapping
+from typing import Iterable, Iterator, Optional, Union
+
+
+class MacroRange:
+    """A contiguous range of macro variables (#start to #stop - 1) as documented by Haas."""
+    __slots__ = ('start', 'stop', 'name', 'read_only', 'defaults')
+
+    def __init__(self, start: int, stop: int, name: str, read_only: bool = False, defaults: Optional[dict] = None):
+        """
+        :param start: First variable number in the range.
+        :param stop: One past the last variable number.
+        :param name: Description of the range.
+        :param read_only: If True, the variables cannot be set.
+        :param defaults: Optional non-zero initial values (e.g. text) by variable number.
+        """
+        self.start = start
+        self.stop = stop
+        self.name = name
+        self.read_only = read_only
+        self.defaults = defaults or {}
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __contains__(self, number):
+        return self.start <= number < self.stop
+
+    def __repr__(self):
+        return f"<MacroRange #{self.start}-#{self.stop - 1} {self.name}>"
+
+
+def _offsets(base, name):
+    """One range per 6-axis (X Y Z A B C) offset table."""
+    return MacroRange(base, base + 6, name)
+
+
+# Official Macro Variables Table (Haas CNC Mill Macros documentation)
+MACRO_RANGES = (
+    MacroRange(0, 1, "Not a number", read_only=True, defaults={0: "NaN"}),
+    MacroRange(1, 34, "Macro arguments"),
+    MacroRange(100, 200, "User variables (volatile)"),
+    MacroRange(500, 1000, "User variables (non-volatile)"),
+    MacroRange(1000, 1006, "Probe positions"),
+    MacroRange(1601, 1801, "Tool flute counts"),
+    MacroRange(1801, 2001, "Tool maximum vibrations"),
+    MacroRange(2001, 2201, "Tool length offsets"),
+    MacroRange(2201, 2401, "Tool length wear"),
+    MacroRange(2401, 2601, "Tool diameter offsets"),
+    MacroRange(2601, 2801, "Tool diameter wear"),
+    MacroRange(3000, 3001, "Programmable alarm", defaults={3000: "Programmable alarm"}),
+    MacroRange(3001, 3003, "Timers"),
+    MacroRange(3003, 3009, "Position (work coordinates)"),
+    MacroRange(3010, 3016, "Position (machine coordinates)"),
+    MacroRange(3020, 3026, "Distance to go"),
+    MacroRange(3030, 3031, "Remaining motion time"),
+    MacroRange(3040, 3042, "Feed rate and spindle speed"),
+    _offsets(3050, "G54 work offset"),
+    _offsets(3060, "G55 work offset"),
+    _offsets(3070, "G56 work offset"),
+    _offsets(3080, "G57 work offset"),
+    _offsets(3090, "G58 work offset"),
+    _offsets(3100, "G59 work offset"),
+    _offsets(3110, "G110 fixture offset"),
+    _offsets(3120, "G111 fixture offset"),
+    _offsets(3130, "G112 fixture offset"),
+    _offsets(3140, "G113 fixture offset"),
+    _offsets(3150, "G114 fixture offset"),
+    _offsets(3180, "G119 fixture offset"),
+)
+
+# Variable number -> (range index, offset in the range), shared by every storage
+_SLOTS = [None] * MACRO_RANGES[-1].stop
+for _index, _range in enumerate(MACRO_RANGES):
+    for _number in range(_range.start, _range.stop):
+        _SLOTS[_number] = (_index, _number - _range.start)
+_NUMBERS = tuple(number for number, slot in enumerate(_SLOTS) if slot is not None)
+_READ_ONLY = tuple(r.read_only for r in MACRO_RANGES)
+_TEXT_DEFAULTS = {number: value for r in MACRO_RANGES for number, value in r.defaults.items()}
+_NAN = float("nan")
+
+
+def _as_number(number, value) -> float:
+    """Return a non-text value as a float; None (a vacant variable) is stored as NaN."""
+    if value is None:
+        return _NAN
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Macro variable #{number} cannot hold {value!r}")
+
+
+def range_of(number: int) -> MacroRange:
+    """Return the documented range holding a variable number."""
+    return MACRO_RANGES[_slot(number)[0]]
+
+
+def _slot(number):
+    if type(number) is not int:
+        try:
+            as_int = int(number)
+        except (TypeError, ValueError):
+            raise KeyError(number)
+        if as_int != number:
+            raise KeyError(number)
+        number = as_int
+    slot = _SLOTS[number] if 0 <= number < len(_SLOTS) else None
+    if slot is None:
+        raise KeyError(number)
+    return slot
+
+
+class MacroVariableStorage(MutableMapping):
+    """
+    Compact macro variable table backed by one float array per documented range.
+
+    Behaves like the dict Machine used to hold (variable number -> value), but
+    lookups index a shared slot table instead of hashing, and a range's array is
+    only allocated the first time one of its variables is set, so an untouched
+    table costs a few hundred bytes. Text values (#0, #3000 messages) are kept
+    aside and their array slot holds NaN. None sets a variable vacant (NaN) and
+    any other value that is not a number raises ValueError. Variables cannot be
+    added or deleted.
+    """
+    __slots__ = ('_arrays', '_text', '_changes', '_versions')
+
+    def __init__(self):
+        self._arrays = [None] * len(MACRO_RANGES)
+        self._versions = [0] * len(MACRO_RANGES)  # Bumped on every write to the range
+        self._text = None  # Variable number -> text value, once a text value is set
+        self._changes = None  # Numbers set since the last pop_changes(), once tracking is on
+
+    def __getitem__(self, number) -> Union[float, str]:
+        index, offset = _slot(number)
+        values = self._arrays[index]
+        if values is None:
+            return _TEXT_DEFAULTS.get(number, 0.0) if MACRO_RANGES[index].defaults else 0.0
+        value = values[offset]
+        if value != value and self._text is not None:
+            return self._text.get(MACRO_RANGES[index].start + offset, value)
+        return value
+
+    def __setitem__(self, number, value: Union[float, str]):
+        index, offset = _slot(number)
+        if _READ_ONLY[index]:
+            raise ValueError(f"Macro variable #{number} is read-only.")
+        self._store(index, offset, value)
+
+    def _store(self, index, offset, value):
+        self._versions[index] += 1
+        if self._changes is not None:
+            self._changes.add(MACRO_RANGES[index].start + offset)
+        values = self._arrays[index]
+        if values is None:
+            values = self._allocate(index)
+        if isinstance(value, str):
+            if self._text is None:
+                self._text = {}
+            self._text[MACRO_RANGES[index].start + offset] = value
+            values[offset] = _NAN
+            return
+        values[offset] = _as_number(MACRO_RANGES[index].start + offset, value)
+        if self._text is not None:
+            self._text.pop(MACRO_RANGES[index].start + offset, None)
+
+    def _allocate(self, index):
+        macro_range = MACRO_RANGES[index]
+        values = self._arrays[index] = array('d', bytes(8 * len(macro_range)))
+        for number, default in macro_range.defaults.items():
+            values[number - macro_range.start] = _NAN
+            if self._text is None:
+                self._text = {}
+            self._text.setdefault(number, default)
+        return values
+
+    def __delitem__(self, number):
+        raise TypeError("Macro variables cannot be deleted")
+
+    def __contains__(self, number):
+        try:
+            _slot(number)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(_NUMBERS)
+
+    def __len__(self):
+        return len(_NUMBERS)
+
+    def get_range(self, start: int, stop: int) -> array:
+        """
+        Return a copy of the values of #start to #stop - 1 as a float array.
+
+        The span must lie inside one documented range (e.g. 2001, 2201 for the tool
+        length offsets). Text values read as NaN.
+        """
+        index, offset = self._span(start, stop)
+        values = self._arrays[index]
+        if values is None:
+            values = array('d', bytes(8 * (stop - start)))
+            for number in MACRO_RANGES[index].defaults:
+                if start <= number < stop:
+                    values[number - start] = _NAN
+            return values
+        return values[offset:offset + stop - start]
+
+    def set_range(self, start: int, values: Iterable[float]):
+        """Set consecutive variables from #start on; the span must lie inside one documented range."""
+        if not isinstance(values, array) or values.typecode != 'd':
+            values = list(values)
+            try:
+                values = array('d', values)
+            except TypeError:
+                values = array('d', [_as_number(start + position, value) for position, value in enumerate(values)])
+        index, offset = self._span(start, start + len(values))
+        if _READ_ONLY[index]:
+            raise ValueError(f"Macro variable #{start} is read-only.")
+        target = self._arrays[index]
+        if target is None:
+            target = self._allocate(index)
+        target[offset:offset + len(values)] = values
+        self._versions[index] += 1
+        if self._changes is not None:
+            self._changes.update(range(start, start + len(values)))
+        if self._text is not None:
+            for number in range(start, start + len(values)):
+                self._text.pop(number, None)
+
+    def _span(self, start, stop):
+        try:
+            index, offset = _slot(start)
+        except KeyError:
+            raise ValueError(f"Macro variable #{start} is out of the valid range.")
+        if not start < stop <= MACRO_RANGES[index].stop:
+            raise ValueError(f"Macro variables #{start}-#{stop - 1} do not lie in one range ({MACRO_RANGES[index]!r})")
+        return index, offset
+
+    def track_changes(self):
+        """Start recording which variables are set (see pop_changes)."""
+        if self._changes is None:
+            self._changes = set()
+
+    def pop_changes(self) -> dict:
+        """Return {number: current value} for every variable set since the last call, and reset the record."""
+        if not self._changes:
+            return {}
+        changes = {number: self[number] for number in sorted(self._changes)}
+        self._changes.clear()
+        return changes
+
+    def range_values(self, index: int) -> array:
+        """Return a copy of the whole array of MACRO_RANGES[index] (text values read as NaN)."""
+        macro_range = MACRO_RANGES[index]
+        return self.get_range(macro_range.start, macro_range.stop)
+
+    def load_range(self, index: int, values: array):
+        """Adopt a float array as the values of MACRO_RANGES[index], bypassing read-only checks."""
+        if len(values) != len(MACRO_RANGES[index]):
+            raise ValueError(f"Expected {len(MACRO_RANGES[index])} values for {MACRO_RANGES[index]!r}, got {len(values)}")
+        self._arrays[index] = values
+        self._versions[index] += 1
+
+    def version(self, index: int) -> int:
+        """Return the write counter of MACRO_RANGES[index]; it changes whenever a variable in the range is set."""
+        return self._versions[index]
+
+    def version_of(self, number: int) -> int:
+        """Return the write counter of the range holding a variable number."""
+        return self.version(_slot(number)[0])
+
+    def copy(self) -> "MacroVariableStorage":
+        """Return an independent copy of the table."""
+        duplicate = MacroVariableStorage()
+        duplicate._arrays = [None if values is None else array('d', values) for values in self._arrays]
+        duplicate._text = None if self._text is None else dict(self._text)
+        return duplicate
+
+    @classmethod
+    def from_items(cls, items) -> "MacroVariableStorage":
+        """Build a table from (number, value) pairs, including read-only variables; unknown numbers are ignored."""
+        storage = cls()
+        for number, value in items:
+            try:
+                index, offset = _slot(number)
+            except KeyError:
+                continue
+            storage._store(index, offset, value)
+        return storage
+
+    def __sizeof__(self):
+        size = object.__sizeof__(self) + self._arrays.__sizeof__()
+        size += sum(values.__sizeof__() for values in self._arrays if values is not None)
+        if self._text is not None:
+            size += self._text.__sizeof__()
+        return size
+
+    def __repr__(self):
+        allocated = sum(values is not None for values in self._arrays)
+        return f"<MacroVariableStorage {len(self)} variables, {allocated}/{len(MACRO_RANGES)} ranges allocated>"
+
+
+_MISSING = object()
+
+
+def _same(a, b):
+    return a == b or (a != a and b != b)
+
+
+class ForkedVariableStorage(MacroVariableStorage):
+    """
+    Copy-on-write child of another macro variable table.
+
+    Only the variables set on the fork are stored (in a dict); everything else
+    is read from the parent, so forking and reading cost nothing and memory
+    grows with the number of changes. Variables the fork has not overridden
+    follow later changes to the parent. merge() writes the overrides back.
+    """
+    __slots__ = ('parent', '_overrides', '_bases')
+
+    def __init__(self, parent: MacroVariableStorage):
+        super().__init__()
+        self.parent = parent
+        self._overrides = {}  # Variable number -> value set on the fork
+        self._bases = {}  # Variable number -> parent value when the fork first overrode it
+
+    def __getitem__(self, number) -> Union[float, str]:
+        index, offset = _slot(number)
+        number = MACRO_RANGES[index].start + offset
+        value = self._overrides.get(number, _MISSING)
+        if value is _MISSING:
+            return self.parent[number]
+        return value
+
+    def version(self, index: int) -> int:
+        # Parent writes show through, so they count as well
+        return self._versions[index] + self.parent.version(index)
+
+    def _store(self, index, offset, value):
+        number = MACRO_RANGES[index].start + offset
+        self._versions[index] += 1
+        if self._changes is not None:
+            self._changes.add(number)
+        if number not in self._overrides:
+            self._bases[number] = self.parent[number]
+        self._overrides[number] = _as_number(number, value) if not isinstance(value, str) else value
+
+    def get_range(self, start: int, stop: int) -> array:
+        values = self.parent.get_range(start, stop)
+        for number, value in self._overrides.items():
+            if start <= number < stop:
+                values[number - start] = _NAN if isinstance(value, str) else value
+        return values
+
+    def set_range(self, start: int, values: Iterable[float]):
+        values = list(values)
+        index, offset = self._span(start, start + len(values))
+        if _READ_ONLY[index]:
+            raise ValueError(f"Macro variable #{start} is read-only.")
+        for position, value in enumerate(values):
+            self._store(index, offset + position, value)
+
+    def load_range(self, index: int, values: array):
+        if len(values) != len(MACRO_RANGES[index]):
+            raise ValueError(f"Expected {len(MACRO_RANGES[index])} values for {MACRO_RANGES[index]!r}, got {len(values)}")
+        for offset, value in enumerate(values):
+            self._store(index, offset, value)
+
+    def overrides(self) -> dict:
+        """Return {number: value} for the variables set on the fork."""
+        return dict(self._overrides)
+
+    def conflicts(self) -> list:
+        """Return the numbers of variables the fork overrode that have also changed in the parent since."""
+        return [number for number, base in self._bases.items() if not _same(self.parent[number], base)]
+
+    def merge(self, force: bool = False) -> int:
+        """
+        Write the fork's overrides into the parent and forget them. Returns the number of variables merged.
+
+        :param force: If False, raise ValueError when the parent changed a variable the fork also changed.
+        """
+        if not force:
+            conflicts = self.conflicts()
+            if conflicts:
+                raise ValueError(f"Macro variables changed in both the fork and its parent: {', '.join(f'#{number}' for number in conflicts)}")
+        for number, value in self._overrides.items():
+            self.parent._store(*_slot(number), value)
+        merged = len(self._overrides)
+        self._overrides.clear()
+        self._bases.clear()
+        return merged
+
+    def copy(self) -> "ForkedVariableStorage":
+        """Return another fork of the same parent with the same overrides."""
+        duplicate = ForkedVariableStorage(self.parent)
+        duplicate._overrides = dict(self._overrides)
+        duplicate._bases = dict(self._bases)
+        return duplicate
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + self._overrides.__sizeof__() + self._bases.__sizeof__()
+
+    def __repr__(self):
+        return f"<ForkedVariableStorage {len(self._overrides)} overrides>"
@@ -1,7 +1,12 @@
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 from typing import Optional, Union
 
+from vizg.fixedPoint import quantum
+
 class MacroVariable:
+    """Immutable, hashable reference to a Haas macro variable (#n)."""
+    __slots__ = ('alias', 'num', 'default_value', 'machine', 'precision', '__weakref__')
+
     def __init__(self, alias: Union[int, float, Decimal, str], num: int, default_value: Optional[Union[Decimal, int, float]] = None, machine: Optional[object] = None, precision: int = 4) -> None:
         """
         Initialize a MacroVariable instance.
@@ -12,11 +17,21 @@ class MacroVariable:
         :param machine: Optional machine object for resolving the macro variable value
         :param precision: Precision to use when formatting the value (default 4)
         """
-        self.alias = alias
-        self.num = num
-        self.default_value = default_value
-        self.machine = machine
-        self.precision = precision
+        _set = object.__setattr__
+        _set(self, 'alias', alias)
+        _set(self, 'num', num)
+        _set(self, 'default_value', default_value)
+        _set(self, 'machine', machine)
+        _set(self, 'precision', precision)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __hash__(self) -> int:
+        return hash((self.num, self.precision))
 
     def resolve(self) -> Decimal:
         """
@@ -25,6 +40,9 @@ class MacroVariable:
         :return: The resolved value as a Decimal, rounded to the specified precision.
         """
         if self.machine is not None:
+            resolve = getattr(self.machine, "resolve_macro_variable", None)
+            if resolve is not None:
+                return resolve(self.num, self.precision)  # Cached by the machine
             value = Decimal(self.machine.get_macro_variable(self.num))
         elif self.default_value is not None:
             try:
@@ -34,17 +52,18 @@ class MacroVariable:
         else:
             raise ValueError(f"Macro variable #{self.num} has no machine or default value.")
         
-        return value.quantize(Decimal(f'1.{"0" * self.precision}'), rounding=ROUND_HALF_UP)
+        return value.quantize(quantum(self.precision), rounding=ROUND_HALF_UP)
 
     @property
     def value(self) -> Decimal:
         """Get the resolved value of the macro variable."""
-        print("var value get")
         return self.resolve()
 
+    def __float__(self) -> float:
+        return float(self.resolve())
+
     def __repr__(self) -> str:
         """Return the string representation of the macro variable as #<num>."""
-        print("var repr")
         return f"#{self.num}"
 
     def validate(self, block: Optional[object] = None) -> None:
@@ -89,12 +108,16 @@ class MacroVariable:
         try:
             other_decimal = Decimal(other)
             other_precision = self._get_precision(other)
-            return other_decimal.quantize(Decimal(f'1.{"0" * other_precision}'), rounding=ROUND_HALF_UP)
+            return other_decimal.quantize(quantum(other_precision), rounding=ROUND_HALF_UP)
         except InvalidOperation:
             raise ValueError(f"Cannot convert {other} to Decimal.")
 
     def __eq__(self, other: Union[int, float, Decimal]) -> bool:
         """Compare if two macro variables are equal."""
+        if isinstance(other, MacroVariable):
+            # Another reference: equal if it names the same variable the same way
+            return (self.num == other.num and self.precision == other.precision and self.alias == other.alias
+                    and self.default_value == other.default_value and self.machine is other.machine)
         if isinstance(other, (float, int, Decimal)):
             other_value = self._convert_to_decimal(other)
             return self.value == other_value
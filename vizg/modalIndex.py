@@ -0,0 +1,245 @@
+from typing import Optional
+
+from vizg.block import Block
+from vizg.loop import Loop
+from vizg.fixedPoint import scale
+from vizg.macroVariable import MacroVariable
+from vizg.modalState import ModalState
+from vizg.modals import ModalGroup, modal_group_of, word_code
+from vizg.numeric import Numeric
+from vizg.word import Word
+from vizg.words import G65
+
+AXES = ("X", "Y", "Z", "A")
+
+# Non-modal G codes whose axis words are arguments, not end points (dwell, offset setting)
+_ARGUMENT_G_CODES = {4, 10}
+# Non-modal G codes that move the named axes to a position not given in work coordinates
+_MACHINE_MOVE_G_CODES = {28, 30, 53}
+# Controller-resident G65 macros: P9810 (protected positioning) moves to its X/Y/Z, the other
+# O98xx cycles (probe on/off, measuring cycles, see G65.RESIDENT_PROGRAMS) end where they started
+_MOTION_MACROS = {9810}
+
+# Entry type -> True for Word subclasses; isinstance() against the ABC-based Word is slow in scans
+_IS_WORD = {}
+
+
+def _is_word(cls):
+    is_word = _IS_WORD.get(cls)
+    if is_word is None:
+        is_word = _IS_WORD[cls] = issubclass(cls, Word)
+    return is_word
+
+
+def word_value(word):
+    """Return a word's value as a float, or its MacroVariable when the value is a variable."""
+    numeric = word.numeric
+    if type(numeric) is Numeric:
+        if numeric.variable is not None:
+            return numeric.variable
+        return numeric.scaled / scale(numeric.precision)
+    if isinstance(numeric, MacroVariable):
+        return numeric
+    return float(numeric)
+
+
+def _number(word):
+    """Return an integer-valued word (T, H) as an int, or its value otherwise."""
+    code = word_code(word)
+    return code if code is not None else word_value(word)
+
+
+class ProgramState:
+    """
+    Modal context in effect at a point of a program: the active modal words plus
+    position, tool, tool length offset, feed, spindle and coolant.
+
+    Built by a static scan of the blocks; macro variables are not evaluated, so a
+    value set from a variable is kept as the MacroVariable. An axis whose work
+    position cannot be told is None: after an incremental move by a variable or
+    from an unknown position, after G28/G30/G53 machine moves and after a G65
+    call to a macro that is not controller-resident. Axis words of G04/G10
+    blocks and of resident measuring cycles are arguments and leave the
+    position alone; G65 P9810 moves to its X/Y/Z.
+    """
+    __slots__ = ('modal', 'position', 'tool', 'next_tool', 'length_offset', 'feed', 'spindle_speed', 'spindle', 'work_offset', 'coolant')
+
+    def __init__(self):
+        self.modal = ModalState()
+        self.position = {}  # Axis letter -> last programmed position (work coordinates)
+        self.tool = None  # Tool in the spindle (T of the last M06)
+        self.next_tool = None  # Last T word, loaded by the next M06
+        self.length_offset = None  # H value of the active G43
+        self.feed = None
+        self.spindle_speed = None
+        self.spindle = None  # Last M03, M04 or M05 word
+        self.work_offset = None  # Words selecting the work offset, e.g. (G54,) or (G154, P12)
+        self.coolant = False
+
+    def copy(self) -> "ProgramState":
+        """Return an independent copy."""
+        state = ProgramState.__new__(ProgramState)
+        state.modal = ModalState.__new__(ModalState)
+        state.modal.active_commands = dict(self.modal.active_commands)
+        state.position = dict(self.position)
+        state.tool = self.tool
+        state.next_tool = self.next_tool
+        state.length_offset = self.length_offset
+        state.feed = self.feed
+        state.spindle_speed = self.spindle_speed
+        state.spindle = self.spindle
+        state.work_offset = self.work_offset
+        state.coolant = self.coolant
+        return state
+
+    def active(self, group: ModalGroup):
+        """Return the active word of a modal group."""
+        return self.modal.active_commands.get(group)
+
+    def apply(self, item):
+        """Update the state with one program entry (Block, Command or Loop, whose body is scanned once)."""
+        if type(item) is not Block:
+            if isinstance(item, Loop):
+                for block in item.blocks:
+                    self.apply(block)
+                return
+            if hasattr(item, "get_block"):
+                item = item.get_block()
+        words = item.words if isinstance(item, Block) else (item,)
+
+        active = self.modal.active_commands
+        axes = []
+        non_modal = None
+        p_word = None
+        tool_change = False
+        for word in words:
+            if not _is_word(type(word)) or word.numeric is None:
+                continue
+            letter = word.address.__name__
+            if letter in AXES:
+                axes.append(word)
+                continue
+
+            group = modal_group_of(word)
+            if group is not None:
+                active[group] = word
+                if group is ModalGroup.WORK_COORDINATE_SYSTEM:
+                    self.work_offset = (word,)
+                elif group is ModalGroup.TOOL_LENGTH_COMPENSATION and word_code(word) == 49:
+                    self.length_offset = None
+                continue
+
+            if letter == "G":
+                non_modal = word_code(word)
+            elif letter == "F":
+                self.feed = word_value(word)
+            elif letter == "S":
+                self.spindle_speed = word_value(word)
+            elif letter == "T":
+                self.next_tool = _number(word)
+            elif letter == "H":
+                self.length_offset = _number(word)
+            elif letter == "P":
+                p_word = word
+            elif letter == "M":
+                code = word_code(word)
+                if code in (3, 4, 5):
+                    self.spindle = word
+                elif code == 6:
+                    tool_change = True
+                elif code in (8, 9):
+                    self.coolant = code == 8
+
+        if non_modal == 65:
+            self._call(p_word, axes)
+        elif axes and non_modal not in _ARGUMENT_G_CODES:
+            self._move(axes, non_modal in _MACHINE_MOVE_G_CODES)
+        if tool_change and self.next_tool is not None:
+            self.tool = self.next_tool
+        if p_word is not None and non_modal is None and self.work_offset is not None and word_code(self.work_offset[0]) == 154 and len(self.work_offset) == 1:
+            self.work_offset = (self.work_offset[0], p_word)
+
+    def _call(self, p_word, axes):
+        """Record where a G65 macro call leaves the axes."""
+        macro = word_code(p_word) if p_word is not None else None
+        if macro in _MOTION_MACROS:
+            if axes:
+                self._move(axes, False)
+        elif macro not in G65.RESIDENT_PROGRAMS:
+            for letter in AXES:
+                self.position[letter] = None  # A program's own macro can move any axis
+
+    def _move(self, axes, machine_move):
+        """Record the end point of a move; axes whose work position cannot be told become None."""
+        position = self.position
+        incremental = word_code(self.modal.active_commands.get(ModalGroup.DISTANCE_MODE)) == 91
+        for word in axes:
+            letter = word.address.__name__
+            value = None if machine_move else word_value(word)
+            if incremental and value is not None:
+                current = position.get(letter)
+                value = current + value if isinstance(current, float) and isinstance(value, float) else None
+            position[letter] = value
+
+    def __repr__(self):
+        modal = " ".join(repr(word) for word in self.modal.active_commands.values())
+        position = " ".join(f"{axis}{value}" for axis, value in self.position.items())
+        return (f"<ProgramState {modal} | {position} | T{self.tool} H{self.length_offset} "
+                f"F{self.feed} S{self.spindle_speed} {self.spindle!r} {self.work_offset}>")
+
+
+class ModalCheckpointIndex:
+    """
+    Random access to the modal context of a long program.
+
+    The state before every `interval`-th block is recorded the first time it is
+    needed, so the state at any block is recovered by copying the nearest
+    checkpoint and replaying at most `interval` blocks. Indices refer to
+    program.blocks (a Loop counts as one entry). After editing the program,
+    call invalidate(index) with the first changed block.
+    """
+
+    def __init__(self, program, interval: int = 1000):
+        """
+        :param program: Program (or anything with a `blocks` sequence) to index.
+        :param interval: Number of blocks between checkpoints.
+        """
+        if interval < 1:
+            raise ValueError("Checkpoint interval must be at least 1")
+        self.program = program
+        self.interval = interval
+        self.checkpoints = [ProgramState()]  # checkpoints[i]: state before block i * interval
+
+    def build(self) -> "ModalCheckpointIndex":
+        """Record every checkpoint now instead of on demand."""
+        self._ensure(len(self.program.blocks) // self.interval)
+        return self
+
+    def _ensure(self, checkpoint):
+        blocks = self.program.blocks
+        while len(self.checkpoints) <= checkpoint:
+            state = self.checkpoints[-1].copy()
+            start = (len(self.checkpoints) - 1) * self.interval
+            for index in range(start, min(start + self.interval, len(blocks))):
+                state.apply(blocks[index])
+            self.checkpoints.append(state)
+
+    def state_before(self, index: int) -> ProgramState:
+        """Return the state in effect when block `index` starts."""
+        if not 0 <= index <= len(self.program.blocks):
+            raise IndexError(f"Block index {index} is out of range")
+        checkpoint = index // self.interval
+        self._ensure(checkpoint)
+        state = self.checkpoints[checkpoint].copy()
+        blocks = self.program.blocks
+        for position in range(checkpoint * self.interval, index):
+            state.apply(blocks[position])
+        return state
+
+    def state_at(self, index: int) -> ProgramState:
+        """Return the state after block `index` has run (what an editor shows for that line)."""
+        return self.state_before(index + 1)
+
+    def invalidate(self, index: Optional[int] = 0):
+        """Drop the checkpoints that depend on blocks from `index` on."""
+        del self.checkpoints[index // self.interval + 1:]
@@ -0,0 +1,301 @@
+from typing import Iterable, Iterator, Optional
+
+from vizg.block import Block
+from vizg.macroVariable import MacroVariable
+from vizg.modalIndex import ProgramState, _is_word
+from vizg.modals import ModalGroup, modal_group_of, word_code
+from vizg.numeric import Numeric
+from vizg.program import Program
+from vizg.rules import RequireAddress, RequireOneOfAddresses
+
+AXES = {"X", "Y", "Z", "A"}
+
+# Modal groups whose words can be dropped when the same word is already active
+_DROPPABLE_GROUPS = {ModalGroup.MOTION, ModalGroup.PLANE_SELECTION, ModalGroup.DISTANCE_MODE, ModalGroup.UNIT_SELECTION, ModalGroup.WORK_COORDINATE_SYSTEM}
+
+# Words that make axis words mean something other than an end point (arc centers, cycle data...)
+_AXIS_MODIFIERS = {"I", "J", "K", "R", "P", "Q", "L", "H", "D"}
+
+# M codes after which positions and modes are no longer known (subprogram calls, returns, ends, tool change)
+_BARRIER_M_CODES = {2, 6, 30, 97, 98, 99}
+
+
+def _plain_value(word):
+    """Return a word's value as a Decimal, or None when it is a macro variable or missing."""
+    numeric = word.numeric
+    if type(numeric) is Numeric and numeric.variable is None:
+        return numeric.value
+    return None
+
+
+class ModalOptimizer:
+    """
+    Streaming pass that removes words the controller would ignore because they are already in effect.
+
+    Drops modal G words that repeat the active word (motion, plane, distance
+    mode, units, work offset, and G40/G80 when already cancelled), F and S
+    values equal to the active ones, and absolute (G90) axis words equal to the
+    current position; blocks left empty are removed. Words that the
+    RequireAddress/RequireOneOfAddresses rules of a kept word ask for stay (F
+    with G01-G03, S with M03/M04, an axis with G00/G01), so the output still
+    validates. The pass is conservative: it never touches words set from macro
+    variables, axis words in arc, canned cycle, cutter compensation or
+    length-offset blocks, and it forgets what it knows after loops, subprogram
+    calls, tool changes and non-modal G codes, and before blocks with N labels,
+    which M97 and M99 P can jump to.
+    Every input block produces at most one output block, in order, so it can
+    run over a stream of any length.
+    """
+
+    def __init__(self, assume_reset: bool = True):
+        """
+        :param assume_reset: If True, the stream starts in the control's reset state with cutter
+            compensation and canned cycles cancelled (G40, G80). Use False for program fragments.
+        """
+        self.removed_words = 0
+        self.removed_blocks = 0
+        self.reset()
+        if assume_reset:
+            self.modal[ModalGroup.TOOL_RADIUS_COMPENSATION] = 40
+            self.modal[ModalGroup.CANNED_CYCLES] = 80
+
+    def reset(self):
+        """Forget the tracked state, e.g. after a subprogram call."""
+        self.modal = {}  # ModalGroup -> active integer code
+        self.feed = None
+        self.speed = None
+        self.position = {}  # Axis letter -> Decimal (only while G90 is known)
+
+    def optimize(self, blocks: Iterable) -> Iterator:
+        """Yield the optimized blocks of a stream of blocks."""
+        for item in blocks:
+            optimized = self.process(item)
+            if optimized is not None:
+                yield optimized
+
+    def process(self, item):
+        """Return the optimized form of one program entry, or None if it can be dropped entirely."""
+        block = item.get_block() if hasattr(item, "get_block") else item
+        if not isinstance(block, Block):
+            self.reset()  # Loops and other entries: their effect on the state is unknown
+            return item
+
+        words = block.words
+        if not words or type(words[0]) is MacroVariable:
+            return item  # Empty block or macro assignment
+
+        codes = {}  # ModalGroup -> code set in this block
+        letters = set()
+        barrier = False
+        for word in words:
+            if not _is_word(type(word)) or word.numeric is None:
+                continue
+            letter = word.address.__name__
+            letters.add(letter)
+            if letter == "N":
+                self.reset()  # Jump target: the state on arrival is not the one tracked so far
+            elif letter == "G":
+                group = modal_group_of(word)
+                if group is None:
+                    barrier = True  # Non-modal G code (G04, G28, G53, G65...) or G set from a variable
+                else:
+                    codes[group] = word_code(word)
+            elif letter == "M":
+                code = word_code(word)
+                if code is None or code in _BARRIER_M_CODES:
+                    barrier = True
+
+        if barrier:
+            self.reset()
+            return item
+
+        dropped = [self._redundant(word, codes, letters) for word in words]
+        if any(dropped):
+            _keep_required(words, dropped)
+        kept = [word for word, drop in zip(words, dropped) if not drop]
+        self._update(words, codes, letters)
+
+        if len(kept) == len(words):
+            return item
+        self.removed_words += len(words) - len(kept)
+        if not kept:
+            self.removed_blocks += 1
+            return None
+        optimized = Block()
+        for word in kept:
+            optimized.add_word(word)
+        return optimized
+
+    def _redundant(self, word, codes, letters):
+        if not _is_word(type(word)) or word.numeric is None:
+            return False
+        letter = word.address.__name__
+
+        if letter == "G":
+            group = modal_group_of(word)
+            code = codes[group]
+            if code is None or self.modal.get(group) != code:
+                return False
+            if group is ModalGroup.MOTION:
+                return self.modal.get(ModalGroup.CANNED_CYCLES) == 80  # G00/G01 also cancel an active cycle
+            if group is ModalGroup.WORK_COORDINATE_SYSTEM:
+                return code != 154  # G154 comes with its P word
+            if group in _DROPPABLE_GROUPS:
+                return True
+            return (group is ModalGroup.TOOL_RADIUS_COMPENSATION and code == 40) or (group is ModalGroup.CANNED_CYCLES and code == 80)
+
+        if letter == "F":
+            value = _plain_value(word)
+            return value is not None and value == self.feed and ModalGroup.UNIT_SELECTION not in codes
+        if letter == "S":
+            value = _plain_value(word)
+            return value is not None and value == self.speed
+
+        if letter in AXES:
+            value = _plain_value(word)
+            return value is not None and value == self.position.get(letter) and self._axes_droppable(codes, letters)
+        return False
+
+    def _axes_droppable(self, codes, letters):
+        """True if an axis word equal to the current position has no effect in this block."""
+        if letters & _AXIS_MODIFIERS:
+            return False
+        for group in (ModalGroup.TOOL_LENGTH_COMPENSATION, ModalGroup.WORK_COORDINATE_SYSTEM, ModalGroup.UNIT_SELECTION, ModalGroup.TOOL_RADIUS_COMPENSATION, ModalGroup.CANNED_CYCLES):
+            if group in codes:
+                return False
+        modal = self.modal
+        return (codes.get(ModalGroup.DISTANCE_MODE, modal.get(ModalGroup.DISTANCE_MODE)) == 90
+                and codes.get(ModalGroup.MOTION, modal.get(ModalGroup.MOTION)) in (0, 1)
+                and modal.get(ModalGroup.CANNED_CYCLES) == 80
+                and modal.get(ModalGroup.TOOL_RADIUS_COMPENSATION) == 40)
+
+    def _update(self, words, codes, letters):
+        """Apply a block to the tracked state."""
+        modal = self.modal
+        if ModalGroup.UNIT_SELECTION in codes and codes[ModalGroup.UNIT_SELECTION] != modal.get(ModalGroup.UNIT_SELECTION):
+            self.feed = None
+            self.position = {}
+        if ModalGroup.TOOL_LENGTH_COMPENSATION in codes or ModalGroup.WORK_COORDINATE_SYSTEM in codes:
+            self.position = {}  # Same numbers now mean another machine position
+        if ModalGroup.MOTION in codes and modal.get(ModalGroup.CANNED_CYCLES) != 80:
+            modal.pop(ModalGroup.CANNED_CYCLES, None)  # Whether the motion word cancelled the cycle is controller specific
+        for group, code in codes.items():
+            if code is None:
+                modal.pop(group, None)
+            else:
+                modal[group] = code
+
+        absolute = modal.get(ModalGroup.DISTANCE_MODE) == 90
+        if not absolute:
+            self.position = {}
+        for word in words:
+            if not _is_word(type(word)) or word.numeric is None:
+                continue
+            letter = word.address.__name__
+            if letter in AXES:
+                value = _plain_value(word)
+                if absolute and value is not None and not letters & _AXIS_MODIFIERS - {"I", "J", "K", "R"}:
+                    self.position[letter] = value
+                else:
+                    self.position.pop(letter, None)
+            elif letter == "F":
+                self.feed = _plain_value(word)
+            elif letter == "S":
+                self.speed = _plain_value(word)
+
+
+def _keep_required(words, dropped):
+    """Un-drop the words that a kept word's RequireAddress/RequireOneOfAddresses rules ask for."""
+    kept_letters = {word.address.__name__ for word, drop in zip(words, dropped) if not drop and _is_word(type(word))}
+    for word, drop in zip(words, dropped):
+        if drop or not _is_word(type(word)):
+            continue
+        for rule in word.rules:
+            if type(rule) is RequireAddress:
+                required = {rule.address.__name__}
+            elif type(rule) is RequireOneOfAddresses:
+                required = {address.__name__ for address in rule.addresses}
+            else:
+                continue
+            if required & kept_letters:
+                continue
+            for index, other in enumerate(words):
+                if dropped[index] and other.address.__name__ in required:
+                    dropped[index] = False
+                    kept_letters.add(other.address.__name__)
+                    break
+
+
+def optimize_program(program, optimizer: Optional[ModalOptimizer] = None) -> Program:
+    """Return a copy of a Program with redundant modal words removed (see ModalOptimizer)."""
+    optimizer = optimizer or ModalOptimizer()
+    optimized = Program(program.o_number, program.comment, line_ending=program.line_ending)
+    for block in optimizer.optimize(program.blocks):
+        optimized.add_block(block)
+    return optimized
+
+
+def _action_words(item, state):
+    """Words of a block that are not plain modal/axis/F/S words, i.e. what the block does besides moving."""
+    block = item.get_block() if hasattr(item, "get_block") else item
+    if not isinstance(block, Block):
+        return (repr(item),)
+    actions = []
+    axes = False
+    for word in block.words:
+        if _is_word(type(word)) and word.numeric is not None:
+            letter = word.address.__name__
+            if letter in AXES:
+                axes = True
+                continue
+            if letter in ("F", "S") or (letter == "G" and modal_group_of(word) is not None):
+                continue
+        actions.append(repr(word))
+    if axes and word_code(state.active(ModalGroup.CANNED_CYCLES)) not in (None, 80):
+        actions.append("<cycle>")  # Every block with axis words runs the cycle again
+    return tuple(actions)
+
+
+def _is_jump(item):
+    """True for blocks that continue somewhere else in the same program (M97, M99 P)."""
+    block = item.get_block() if hasattr(item, "get_block") else item
+    if not isinstance(block, Block):
+        return False
+    letters = {word.address.__name__: word for word in block.words if _is_word(type(word)) and word.numeric is not None}
+    code = word_code(letters.get("M"))
+    return code == 97 or (code == 99 and "P" in letters)
+
+
+def _trace(blocks):
+    state = ProgramState()
+    previous = repr(state)
+    for item in blocks:
+        if _is_jump(item):
+            raise ValueError(f"Cannot verify programs with jumps: {item}")
+        state.apply(item)
+        current = repr(state)
+        actions = _action_words(item, state)
+        if current != previous or actions:
+            yield current, actions
+        previous = current
+
+
+def verify_equivalent(original: Iterable, optimized: Iterable) -> bool:
+    """
+    Check that two block streams drive the machine the same way.
+
+    Both streams are replayed through ProgramState; the sequences of state
+    changes and of non-motion actions (M codes, comments, non-modal G codes,
+    canned cycle repeats...) must match exactly. The replay is linear, so
+    streams with jumps (M97, M99 P) are refused with a ValueError.
+    """
+    original_trace = _trace(original)
+    optimized_trace = _trace(optimized)
+    missing = object()
+    while True:
+        a = next(original_trace, missing)
+        b = next(optimized_trace, missing)
+        if a != b:
+            return False
+        if a is missing:
+            return True
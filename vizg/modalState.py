@@ -1,7 +1,7 @@
-from word import Word
-from address import G
-from numeric import Numeric
-from modals import ModalGroup, MODAL_GROUPS
+from vizg.word import Word
+from vizg.address import G
+from vizg.numeric import Numeric
+from vizg.modals import ModalGroup, modal_group_of
 
 class ModalState:
     def __init__(self):
@@ -22,9 +22,8 @@ class ModalState:
     
     def _validate_word_in_group(self, group, word):
         """Ensure the Word passed is in the correct group based on MODAL_GROUPS."""
-        word_repr = repr(word)
-        if word_repr not in MODAL_GROUPS[group]:
-            raise ValueError(f"Word {word_repr} is not valid for group {group.name}")
+        if modal_group_of(word) is not group:
+            raise ValueError(f"Word {word!r} is not valid for group {group.name}")
 
     def update(self, group, word):
         """Update the active command for a given modal group with validation."""
@@ -1,5 +1,7 @@
 from enum import Enum
 
+from vizg.fixedPoint import scale
+
 class ModalGroup(Enum):
     MOTION = 1
     PLANE_SELECTION = 2
@@ -7,6 +9,8 @@ class ModalGroup(Enum):
     UNIT_SELECTION = 4
     CANNED_CYCLES = 6
     TOOL_RADIUS_COMPENSATION = 7
+    TOOL_LENGTH_COMPENSATION = 8
+    WORK_COORDINATE_SYSTEM = 12
 
 MODAL_GROUPS = {
     ModalGroup.MOTION: {"G00", "G01", "G02", "G03"},
@@ -15,13 +19,82 @@ MODAL_GROUPS = {
     ModalGroup.UNIT_SELECTION: {"G20", "G21"},
     ModalGroup.CANNED_CYCLES: {"G80", "G81", "G83", "G84", "G85"},
     ModalGroup.TOOL_RADIUS_COMPENSATION: {"G40", "G41", "G42"},
+    ModalGroup.TOOL_LENGTH_COMPENSATION: {"G43", "G44", "G49"},
+    ModalGroup.WORK_COORDINATE_SYSTEM: {"G54", "G55", "G56", "G57", "G58", "G59", "G154", *(f"G{code}" for code in range(110, 130))},
 }
 
 
+# (address letter, integer code) -> modal group, e.g. ("G", 1) -> ModalGroup.MOTION
+_MODAL_INDEX = {}
+
+
+def _split_word(text):
+    """Split word text such as 'G01' into ('G', 1)."""
+    return text[0].upper(), int(text[1:])
+
+
+def register_modal_group(group, codes, address="G"):
+    """
+    Add words to the modal group index.
+
+    Controller-specific groups can be described by members of another Enum
+    (e.g. a Haas M-code spindle group) and registered the same way.
+
+    :param group: ModalGroup member, or a member of another Enum.
+    :param codes: Word texts such as "G01" or "M03", or integer codes for the given address.
+    :param address: Address letter used for integer codes.
+    """
+    if not isinstance(group, Enum):
+        raise TypeError(f"Modal groups must be Enum members, not {type(group).__name__}")
+    for code in codes:
+        letter, number = _split_word(code) if isinstance(code, str) else (address, int(code))
+        existing = _MODAL_INDEX.get((letter, number))
+        if existing is not None and existing is not group:
+            raise ValueError(f"{letter}{number:02d} already belongs to modal group {existing.name}")
+        _MODAL_INDEX[(letter, number)] = group
+        _MODAL_ADDRESSES.add(letter)
+        MODAL_GROUPS.setdefault(group, set()).add(f"{letter}{number:02d}")
+
+
+for _group, _words in MODAL_GROUPS.items():
+    for _text in _words:
+        _MODAL_INDEX[_split_word(_text)] = _group
+_MODAL_ADDRESSES = {letter for letter, _ in _MODAL_INDEX}
+
+
+def is_modal_group(group):
+    """Return True for ModalGroup members and registered controller-specific groups."""
+    return isinstance(group, ModalGroup) or (isinstance(group, Enum) and group in MODAL_GROUPS)
+
+
+def word_code(word):
+    """Return the integer code of a word (1 for G01), or None if its value is not a plain integer."""
+    numeric = getattr(word, "numeric", None)
+    scaled = getattr(numeric, "scaled", None)
+    if scaled is None:
+        return None  # No value, or a macro variable
+    whole, fraction = divmod(scaled, scale(numeric.precision))
+    return whole if fraction == 0 else None
+
+
+def modal_group_of(word):
+    """Return the modal group the given Word belongs to, or None if it is not modal."""
+    address = getattr(word, "address", None)
+    if address is None or address.__name__ not in _MODAL_ADDRESSES:
+        return None  # Axis words and the like are rejected without looking at the value
+    numeric = word.numeric
+    code = getattr(numeric, "scaled", None)
+    if code is None:
+        return None
+    if numeric.precision:
+        code, fraction = divmod(code, scale(numeric.precision))
+        if fraction:
+            return None
+    return _MODAL_INDEX.get((address.__name__, code))
+
+
 def is_word_in_group(group, word):
     """Class method to return True if the given Word is part of the specified ModalGroup."""
-    if not isinstance(group, ModalGroup):
+    if not is_modal_group(group):
         raise ValueError("Group must be of type ModalGroup")
-   
-    word_repr = repr(word)
-    return word_repr in MODAL_GROUPS.get(group, set())
+    return modal_group_of(word) is group
@@ -1,65 +1,95 @@
-from decimal import Decimal, InvalidOperation
+from decimal import Decimal
 from vizg.macroVariable import MacroVariable
+from vizg.fixedPoint import to_scaled, to_decimal, format_fixed, scale
 
 class Numeric:
+    """Immutable, hashable fixed-point number used as the value of a G-code word."""
+    __slots__ = ('precision', 'leading_zero', 'variable', 'scaled', 'original_value', '_decimal')
+
     def __init__(self, value, precision=4, leading_zero=False):
         """
-        Initialize a Numeric object using Decimal for precise arithmetic.
-        The value can be a number or a MacroVariable.
-        
+        Initialize a Numeric object stored as a scaled integer (value * 10 ** precision).
+        The value can be a number, another Numeric or a MacroVariable.
+
         :param value: Numeric value (can be a MacroVariable or a number).
         :param precision: Precision for floating-point numbers (default: 4).
         :param leading_zero: If True, force a leading zero (for G-code like G01 to be G01 instead of G1).
         """
-        self.precision = precision
-        self.leading_zero = leading_zero
-        
+        if isinstance(value, Numeric):
+            value = value.value  # Re-quantize another Numeric at this precision
+
+        _set = object.__setattr__
+        _set(self, 'precision', precision)
+        _set(self, 'leading_zero', leading_zero)
+        _set(self, '_decimal', None)  # Decimal view of scaled, built on first use
         if isinstance(value, MacroVariable):
-            self.value = value  # Store the MacroVariable instance
-            self.original_value = str(value)  # Keep the original string representation
+            _set(self, 'variable', value)  # Store the MacroVariable instance
+            _set(self, 'scaled', None)
+            _set(self, 'original_value', str(value))  # Keep the original string representation
         else:
-            try:
-                # Store the value as a Decimal for precision handling
-                self.value = Decimal(value).quantize(Decimal(f'1.{"0" * precision}'))
-            except (InvalidOperation, ValueError):
-                raise ValueError(f"Invalid numeric value: {value}")
-                
+            _set(self, 'variable', None)
+            _set(self, 'scaled', to_scaled(value, precision))  # Fixed-point payload
+
+    @classmethod
+    def from_scaled(cls, scaled, precision=4, leading_zero=False):
+        """Build a Numeric directly from a scaled integer payload, skipping conversion."""
+        numeric = object.__new__(cls)
+        _set = object.__setattr__
+        _set(numeric, 'precision', precision)
+        _set(numeric, 'leading_zero', leading_zero)
+        _set(numeric, '_decimal', None)
+        _set(numeric, 'variable', None)
+        _set(numeric, 'scaled', scaled)
+        return numeric
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    @property
+    def value(self):
+        """The MacroVariable, or the value as a Decimal quantized to the precision."""
+        if self.variable is not None:
+            return self.variable
+        if self._decimal is None:
+            object.__setattr__(self, '_decimal', to_decimal(self.scaled, self.precision))
+        return self._decimal
+
     def validate(self, block=None):
         pass
 
+    def __int__(self):
+        return int(self.value)
+
+    def __float__(self):
+        if self.variable is not None:
+            return float(self.variable.resolve())
+        return self.scaled / scale(self.precision)
+
     def __repr__(self):
         """
         For G-code output, if it's a MacroVariable, show the variable reference (e.g., #101).
         Otherwise, format the numeric value with the specified precision.
         """
-        if isinstance(self.value, MacroVariable):
-            return repr(self.value)  # This will call MacroVariable's __repr__ method (e.g., #101)
-    
-        # Handle leading zero for integer-like values
-        sign = '-' if self.value < 0 else ''
-        abs_value = abs(self.value)
-        
-        if abs_value == abs_value.to_integral_value() and self.leading_zero:
-            if not self.precision == 0:
-                return f"{sign}{int(abs_value):02d}.{'0' * self.precision}"  # Ensure proper formatting with leading zero
-            else:
-                return f"{sign}{int(abs_value):02d}"
-    
-        # Ensure consistent formatting for floating-point values
-        value_str = f"{abs_value:{self.precision}f}"
-        
-        # Handle the case where Decimal might not include a decimal point (e.g., integers)
-        if '.' in value_str:
-            integer_part, decimal_part = value_str.split('.')
-            return f"{sign}{int(integer_part)}.{decimal_part[:self.precision]}"
-        else:
-        # No decimal part; return the integer value
-            return f"{sign}{int(abs_value):02d}"
+        if self.variable is not None:
+            return repr(self.variable)  # This will call MacroVariable's __repr__ method (e.g., #101)
+        return format_fixed(self.scaled, self.precision, self.leading_zero)
 
     def __eq__(self, other):
-        """Override equality to compare with both Decimal and float values."""
+        """Override equality to compare with both Decimal and float values, or another Numeric rendered the same way."""
+        if isinstance(other, Numeric):
+            return (self.scaled == other.scaled and self.precision == other.precision
+                    and self.leading_zero == other.leading_zero and self.variable == other.variable)
         if isinstance(other, (float, int)):
             return self.value == Decimal(other)
         if isinstance(other, Decimal):
             return self.value == other
-        return False
\ No newline at end of file
+        return False
+
+    def __hash__(self):
+        """Hash consistently with Decimal, int and float equality."""
+        if self.variable is not None:
+            return hash(self.variable)
+        return hash(self.value)
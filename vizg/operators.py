@@ -24,12 +24,20 @@ class OperatorWord:
         if self.operator not in self.VALID_OPERATORS:
             raise ValueError(f"Invalid operator: '{self.operator}'. Must be one of {self.VALID_OPERATORS}")
 
+    def __eq__(self, other):
+        if not isinstance(other, OperatorWord):
+            return NotImplemented
+        return self.operator == other.operator
+
+    def __hash__(self):
+        return hash(self.operator)
+
     def __repr__(self):
         """
         Return the string representation of the operator.
         """
         return self.operator
-        
+
 class Expression:
     """
     Represents an expression in a G-code block, such as `#101 = #102 + 5.02`.
@@ -53,38 +61,56 @@ class Expression:
         """
         # Validate the operator
         self.operator.validate(None)
-        
-        # Validate that the left and right sides are valid macro variables or numbers
-        if not isinstance(self.left, (MacroVariable, Numeric)):
+
+        # Validate that the left and right sides are valid macro variables, numbers or sub-expressions
+        if not isinstance(self.left, (MacroVariable, Numeric, Expression)):
             raise ValueError(f"Invalid left operand: {self.left}")
-        if not isinstance(self.right, (MacroVariable, Numeric)):
+        if not isinstance(self.right, (MacroVariable, Numeric, Expression)):
             raise ValueError(f"Invalid right operand: {self.right}")
+        for operand in (self.left, self.right):
+            if isinstance(operand, Expression):
+                operand.validate(block)
+
+    def __eq__(self, other):
+        if not isinstance(other, Expression):
+            return NotImplemented
+        return (self.left, self.operator, self.right) == (other.left, other.operator, other.right)
+
+    def __hash__(self):
+        return hash((self.left, self.operator, self.right))
+
+    def _operand_repr(self, operand):
+        """Wrap nested expressions in Haas brackets so grouping survives a round-trip."""
+        if isinstance(operand, Expression):
+            return f"[{operand}]"
+        return str(operand)
 
     def __repr__(self):
         """
         Return a string representation of the expression.
         """
-        return f"{self.left} {self.operator} {self.right}"
-        
-# Create an expression like #101 = #102 + 5.02
-left_var = MacroVariable(101, num="#101")
-right_var = MacroVariable(102, num="#102")
-constant = Numeric(5.02)
-
-# Create an expression with the "+" operator
-expression = Expression(left_var, OperatorWord('+'), constant)
-
-# Validate the expression
-expression.validate()
-
-# Add the expression's components to the block
-block = Block()
-block.add_word(left_var)      # Add left variable
-block.add_word(OperatorWord('='))  # Add assignment operator
-block.add_word(expression)    # Add the full expression (this will include the right side and operator)
-
-# Validate the block
-block.validate()
-
-# Output the block
-print(block)
\ No newline at end of file
+        return f"{self._operand_repr(self.left)} {self.operator} {self._operand_repr(self.right)}"
+
+if __name__ == "__main__":
+    # Create an expression like #101 = #102 + 5.02
+    left_var = MacroVariable(101, num="#101")
+    right_var = MacroVariable(102, num="#102")
+    constant = Numeric(5.02)
+
+    # Create an expression with the "+" operator
+    expression = Expression(left_var, OperatorWord('+'), constant)
+
+    # Validate the expression
+    expression.validate()
+
+    # Add the expression's components to the block
+    block = Block()
+    block.add_word(left_var)      # Add left variable
+    block.add_word(OperatorWord('='))  # Add assignment operator
+    block.add_word(expression)    # Add the full expression (this will include the right side and operator)
+
+    # Validate the block
+    block.validate()
+
+    # Output the block
+    print(block)
\ No newline at end of file
@@ -0,0 +1,304 @@
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Iterable, Iterator, Optional
+
+from vizg.address import D, I, J, K, N, Q, R
+from vizg.block import Block
+from vizg.loop import Loop
+from vizg.macroVariable import MacroVariable
+from vizg.numeric import Numeric
+from vizg.operators import OperatorWord, Expression
+from vizg.program import Program
+from vizg.specialWords import Comment, DPRNT
+from vizg.words import (
+    AddressWord,
+    AWord, FWord, GWord, HWord, LWord, MWord, PWord, SWord, TWord, XWord, YWord, ZWord,
+    G00, G01, G02, G03, G04, G43, G65, G154,
+    M00, M01, M02, M03, M04, M05, M06, M98, M99,
+)
+
+# Address letters that have a dedicated AddressWord subclass taking a single value
+ADDRESS_WORDS = {
+    "X": XWord, "Y": YWord, "Z": ZWord, "A": AWord,
+    "F": FWord, "H": HWord, "L": LWord, "P": PWord, "S": SWord, "T": TWord,
+}
+
+# Address letters without a dedicated subclass; these become plain AddressWords
+GENERIC_ADDRESSES = {"D": D, "I": I, "J": J, "K": K, "N": N, "Q": Q, "R": R}
+
+# Parameterless G/M words keyed by their integer code
+G_WORDS = {0: G00, 1: G01, 2: G02, 3: G03, 4: G04, 43: G43, 65: G65, 154: G154}
+M_WORDS = {0: M00, 1: M01, 2: M02, 3: M03, 4: M04, 5: M05, 6: M06, 99: M99}
+
+_HEADER_RE = re.compile(r"^O(\d+)\s*(?:\((.*)\))?$")
+_WHILE_RE = re.compile(r"^WHILE\s*(\[.*\])\s*DO(\d*)$")
+_END_RE = re.compile(r"^END(\d*)$")
+
+_TOKEN_RE = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>\([^)]*\))
+  | (?P<dprnt>DPRNT\[.*\])
+  | (?P<word>[A-Z])\s*(?P<value>[-+]?(?:\d+\.?\d*|\.\d+)|\#\d+)
+  | (?P<var>\#\d+)
+  | (?P<number>\d+\.?\d*|\.\d+)
+  | (?P<op>[=+\-*/])
+  | (?P<lbracket>\[)
+  | (?P<rbracket>\])
+""", re.VERBOSE)
+
+# Binding strength of the arithmetic operators understood by Expression
+_PRECEDENCE = {"+": 1, "-": 1, "*": 2, "/": 2}
+
+
+def tokenize(line: str) -> Iterator[tuple]:
+    """
+    Split a single G-code line into (kind, text, value) tokens.
+
+    Word tokens carry the address letter as text and the value text separately,
+    every other token carries its matched text twice.
+
+    :param line: A G-code line without its line-ending character.
+    """
+    pos = 0
+    while pos < len(line):
+        match = _TOKEN_RE.match(line, pos)
+        if match is None:
+            raise ValueError(f"Unexpected character {line[pos]!r} at column {pos + 1}")
+        pos = match.end()
+        kind = match.lastgroup
+        if kind == "space":
+            continue
+        if kind == "value":
+            yield ("word", match.group("word"), match.group("value"))
+        else:
+            text = match.group(kind)
+            yield (kind, text, text)
+
+
+def precision_of(text: str) -> int:
+    """
+    Return the number of digits written after the decimal point in a number literal.
+
+    A literal with a bare trailing point (X1.) gets precision 1, so it is written
+    back with a decimal point: with decimal point programming, X1 and X1. are
+    different values.
+    """
+    if "." not in text:
+        return 0
+    return max(1, len(text.split(".", 1)[1]))
+
+
+class GCodeParser:
+    """
+    Streaming parser that turns G-code text back into Block and Word objects.
+
+    Lines are consumed one at a time and blocks are yielded as soon as they are
+    complete, so memory use does not grow with the size of the file. The only
+    exception is WHILE/DO loops, whose bodies are collected into a Loop before it
+    is yielded.
+    """
+
+    def __init__(self, line_ending: str = ";", machine: Optional[object] = None, validate: bool = False, intern_words: bool = False):
+        """
+        :param line_ending: Line-ending character stripped from each line (default is ';').
+        :param machine: Optional Machine bound to every parsed MacroVariable.
+        :param validate: If True, validate every block as it is parsed.
+        :param intern_words: If True, share one instance between identical address/value words.
+        """
+        self.line_ending = line_ending
+        self.machine = machine
+        self.validate = validate
+        self.intern_words = intern_words
+        self.o_number = None  # Set when an O-number header line is read
+        self.comment = ""
+        self.line_number = 0
+
+    def iter_blocks(self, lines: Iterable[str]) -> Iterator[object]:
+        """
+        Lazily parse an iterable of lines (e.g. an open file) into blocks.
+
+        Yields Block objects, and Loop objects for WHILE/DO ... END sections.
+        """
+        loops = []  # Stack of open loops, innermost last
+        for line_number, line in enumerate(lines, start=1):
+            self.line_number = line_number
+            text = self._strip(line)
+            if not text or text == "%":
+                continue
+
+            try:
+                header = _HEADER_RE.match(text)
+                if header:
+                    self.o_number = int(header.group(1))
+                    self.comment = header.group(2) or ""
+                    continue
+
+                loop_start = _WHILE_RE.match(text)
+                if loop_start:
+                    loop_id = int(loop_start.group(2)) if loop_start.group(2) else None
+                    loops.append(Loop(loop_start.group(1), machine=self.machine, loop_id=loop_id))
+                    continue
+
+                loop_end = _END_RE.match(text)
+                if loop_end:
+                    if not loops:
+                        raise ValueError("END without matching WHILE")
+                    block = loops.pop()
+                else:
+                    block = self.parse_line(text)
+            except ValueError as e:
+                raise ValueError(f"Line {line_number}: {e}") from e
+
+            if loops:
+                loops[-1].add_block(block)
+            else:
+                yield block
+
+        if loops:
+            raise ValueError(f"Line {self.line_number}: WHILE without matching END")
+
+    def iter_file(self, path: str, encoding: str = "ascii") -> Iterator[object]:
+        """Lazily parse the G-code file at the given path."""
+        with open(path, "r", encoding=encoding) as fp:
+            yield from self.iter_blocks(fp)
+
+    def read_program(self, path: str, encoding: str = "ascii") -> Program:
+        """Read a whole G-code file into a Program, using its O-number header if present."""
+        blocks = list(self.iter_file(path, encoding))
+        program = Program(self.o_number, self.comment, line_ending=self.line_ending)
+        for block in blocks:
+            program.add_block(block)
+        return program
+
+    def parse_line(self, line: str) -> Optional[Block]:
+        """Parse a single G-code line into a Block, returning None for blank lines."""
+        text = self._strip(line)
+        if not text:
+            return None
+
+        tokens = list(tokenize(text))
+        block = Block()
+        if tokens[0][0] == "var":
+            self._parse_assignment(tokens, block)
+        else:
+            self._parse_words(tokens, block)
+
+        if self.validate:
+            block.validate()
+        return block
+
+    def _strip(self, line: str) -> str:
+        text = line.strip()
+        if self.line_ending:
+            text = text.rstrip(self.line_ending).rstrip()
+        return text
+
+    def _parse_words(self, tokens, block):
+        """Parse a line of address words, comments and DPRNT statements."""
+        # M98 needs its P and L words at construction time, so look them up first
+        values = {text: value for kind, text, value in tokens if kind == "word"}
+
+        for kind, text, value in tokens:
+            if kind == "comment":
+                block.add_word(Comment(text[1:-1]))
+            elif kind == "dprnt":
+                block.add_word(DPRNT(text[len("DPRNT["):-1]))
+            elif kind == "word":
+                word = self._make_word(text, value, values)
+                block.add_word(word.intern() if self.intern_words else word)
+            else:
+                raise ValueError(f"Unexpected {text!r} outside of an expression")
+
+    def _make_word(self, letter, text, values):
+        """Map an address letter and its value text onto the matching Word subclass."""
+        if text.startswith("#"):
+            numeric = self._make_variable(text)
+        else:
+            numeric = self._make_numeric(text)
+
+        if letter in ("G", "M") and not isinstance(numeric, MacroVariable) and numeric.precision == 0:
+            code = int(numeric.value)
+            if letter == "G":
+                if code in G_WORDS:
+                    return G_WORDS[code]()
+                return GWord(code)
+            if code == 98:
+                if "P" not in values:
+                    raise ValueError("M98 requires a P address")
+                repeat_count = self._make_numeric(values["L"]) if "L" in values else None
+                return M98(self._make_numeric(values["P"]), repeat_count)
+            if code in M_WORDS:
+                return M_WORDS[code]()
+            return MWord(code)
+
+        if letter == "G":
+            return GWord(numeric)
+        if letter == "M":
+            return MWord(numeric)
+        if letter in ADDRESS_WORDS:
+            return ADDRESS_WORDS[letter](numeric)
+        if letter in GENERIC_ADDRESSES:
+            return AddressWord(GENERIC_ADDRESSES[letter], numeric)
+        raise ValueError(f"Unsupported address letter: {letter}")
+
+    def _make_numeric(self, text):
+        try:
+            value = Decimal(text)
+        except InvalidOperation:
+            raise ValueError(f"Invalid numeric value: {text}")
+        return Numeric(value, precision_of(text))
+
+    def _make_variable(self, text):
+        num = int(text[1:])
+        return MacroVariable(alias=text, num=num, machine=self.machine)
+
+    def _parse_assignment(self, tokens, block):
+        """Parse a macro assignment such as '#101 = [#102 + 5.02] * 2'."""
+        if len(tokens) < 3 or tokens[1][0] != "op" or tokens[1][1] != "=":
+            raise ValueError("Macro variable lines must be assignments (#n = ...)")
+
+        block.add_word(self._make_variable(tokens[0][1]))
+        block.add_word(OperatorWord("="))
+
+        expression, pos = self._parse_expression(tokens, 2, 1)
+        if pos != len(tokens):
+            raise ValueError(f"Unexpected {tokens[pos][1]!r} in expression")
+        block.add_word(expression)
+
+    def _parse_expression(self, tokens, pos, min_precedence):
+        """Precedence-climbing parser producing nested Expression objects."""
+        left, pos = self._parse_operand(tokens, pos)
+        while pos < len(tokens):
+            kind, text, _ = tokens[pos]
+            if kind != "op" or text not in _PRECEDENCE or _PRECEDENCE[text] < min_precedence:
+                break
+            right, pos = self._parse_expression(tokens, pos + 1, _PRECEDENCE[text] + 1)
+            left = Expression(left, OperatorWord(text), right)
+        return left, pos
+
+    def _parse_operand(self, tokens, pos):
+        if pos >= len(tokens):
+            raise ValueError("Expression ended unexpectedly")
+        kind, text, _ = tokens[pos]
+        if kind == "var":
+            return self._make_variable(text), pos + 1
+        if kind == "number":
+            return self._make_numeric(text), pos + 1
+        if kind == "op" and text in "+-" and pos + 1 < len(tokens) and tokens[pos + 1][0] == "number":
+            return self._make_numeric(text + tokens[pos + 1][1]), pos + 2
+        if kind == "lbracket":
+            expression, pos = self._parse_expression(tokens, pos + 1, 1)
+            if pos >= len(tokens) or tokens[pos][0] != "rbracket":
+                raise ValueError("Missing closing ']' in expression")
+            return expression, pos + 1
+        raise ValueError(f"Unexpected {text!r} in expression")
+
+
+def iter_blocks(lines: Iterable[str], line_ending: str = ";", machine: Optional[object] = None) -> Iterator[object]:
+    """Convenience wrapper around GCodeParser.iter_blocks."""
+    return GCodeParser(line_ending=line_ending, machine=machine).iter_blocks(lines)
+
+
+def iter_file(path: str, line_ending: str = ";", machine: Optional[object] = None) -> Iterator[object]:
+    """Convenience wrapper around GCodeParser.iter_file."""
+    return GCodeParser(line_ending=line_ending, machine=machine).iter_file(path)
@@ -1,3 +1,7 @@
+from vizg.validation import validate_blocks
+from vizg.block import Block
+from vizg.modals import word_code
+
 class Program:
     def __init__(self, o_number, comment="", line_ending=";"):
         """
@@ -15,18 +19,129 @@ class Program:
         """Adds a block of G-code to the program."""
         self.blocks.append(block)
 
+    def validate(self):
+        """Validates every block of the program, with one histogram pass per block."""
+        validate_blocks(self.blocks)
+
+    def iter_lines(self):
+        """
+        Lazily yields the G-code program line by line, each line ending with the line-ending character.
+        """
+        yield f"%{self.line_ending}"  # Start the program with %
+        yield f"O{self.o_number} ({self.comment}){self.line_ending}"  # O-number line with comment
+
+        for block in self.blocks:
+            if hasattr(block, "iter_lines"):
+                block_lines = block.iter_lines()  # Multi-line blocks (e.g. Loop) stream their own lines
+            else:
+                block_str = str(block)
+                block_lines = block_str.split('\n') if '\n' in block_str else (block_str,)
+            for line in block_lines:
+                yield f"{line}{self.line_ending}"  # Add line-ending to each G-code line
+
+        yield f"%{self.line_ending}"  # End the program with %
+
+    def write_to(self, fp, newline="\n", encoding="ascii", chunk_size=65536):
+        """
+        Streams the program as encoded bytes in buffered chunks, using constant extra memory.
+
+        :param fp: Binary file-like object (open(path, 'wb'), a pipe, sys.stdout.buffer) or a socket.
+        :param newline: Separator written between lines (the output matches str(program) by default).
+        :param encoding: Text encoding (default is ASCII, as expected by the controller).
+        :param chunk_size: Approximate number of bytes buffered before each write.
+        :return: The number of bytes written.
+        """
+        write = fp.sendall if hasattr(fp, "sendall") else fp.write
+        separator = newline.encode(encoding)
+        chunk = bytearray()
+        total = 0
+
+        for index, line in enumerate(self.iter_lines()):
+            if index:
+                chunk += separator
+            chunk += line.encode(encoding)
+            if len(chunk) >= chunk_size:
+                write(bytes(chunk))
+                total += len(chunk)
+                chunk.clear()
+
+        if chunk:
+            write(bytes(chunk))
+            total += len(chunk)
+        return total
+
+    def write_file(self, path, newline="\n", encoding="ascii"):
+        """Writes the program to a file at the given path. Returns the number of bytes written."""
+        with open(path, "wb") as fp:
+            return self.write_to(fp, newline=newline, encoding=encoding)
+
     def __repr__(self):
         """
         Generates the G-code program as a string, with each block ending with the line-ending character.
         """
-        lines = []
-        lines.append(f"%{self.line_ending}")  # Start the program with %
-        lines.append(f"O{self.o_number} ({self.comment}){self.line_ending}")  # O-number line with comment
+        return '\n'.join(self.iter_lines())
 
-        for block in self.blocks:
-            block_str = str(block).split('\n')  # Split the block into individual lines
-            for line in block_str:
-                lines.append(f"{line}{self.line_ending}")  # Add line-ending to each G-code line
+class ProgramBundle:
+    def __init__(self, main, subprograms=()):
+        """
+        A main program and the subprograms it calls, written as one file.
+
+        Haas controls load every O-number found between the % marks, so a bundle
+        transfers like a single program.
+        :param main: The main Program.
+        :param subprograms: Programs called from the main program (M98), each ending with M99.
+        """
+        self.main = main
+        self.subprograms = list(subprograms)
+
+    @property
+    def programs(self):
+        """The main program followed by the subprograms (e.g. for MacroInterpreter)."""
+        return [self.main] + self.subprograms
+
+    def validate(self):
+        for program in self.programs:
+            program.validate()
 
-        lines.append(f"%{self.line_ending}")  # End the program with %
-        return '\n'.join(lines)
\ No newline at end of file
+    def iter_lines(self):
+        """Lazily yields the bundle line by line: every program's O-number line and blocks, inside a single % pair."""
+        line_ending = self.main.line_ending
+        yield f"%{line_ending}"
+        for program in self.programs:
+            lines = program.iter_lines()
+            next(lines)  # Opening %
+            previous = next(lines)
+            for line in lines:
+                yield previous
+                previous = line  # Held back so the closing % is dropped
+        yield f"%{line_ending}"
+
+    write_to = Program.write_to
+    write_file = Program.write_file
+
+    def inline(self):
+        """Return the main program with every M98 call to a bundled subprogram replaced by its blocks."""
+        subprograms = {int(program.o_number): program for program in self.subprograms}
+
+        def expand(blocks):
+            for item in blocks:
+                block = item.get_block() if hasattr(item, "get_block") else item
+                target, repeat = None, 1
+                if isinstance(block, Block):
+                    codes = {word.address.__name__: word_code(word) for word in block.words if hasattr(word, "address")}
+                    if codes.get("M") == 98 and codes.get("P") in subprograms:
+                        target = subprograms[codes["P"]]
+                        repeat = codes.get("L") or 1
+                if target is None:
+                    yield item
+                    continue
+                body = target.blocks[:-1]  # Without the closing M99
+                for _ in range(repeat):
+                    yield from expand(body)
+
+        program = Program(self.main.o_number, self.main.comment, line_ending=self.main.line_ending)
+        program.blocks.extend(expand(self.main.blocks))
+        return program
+
+    def __repr__(self):
+        return '\n'.join(self.iter_lines())
@@ -0,0 +1,166 @@
+from typing import Optional
+
+from vizg.block import Block
+from vizg.commands import AddComment, LinearFeedMove, RapidMove, SafeMove, SpindleDirection, SpindleOn, ToolChange
+from vizg.modalIndex import ModalCheckpointIndex, ProgramState
+from vizg.modals import ModalGroup, word_code
+from vizg.numeric import Numeric
+from vizg.program import Program
+from vizg.words import GWord, M00, MWord, ZWord
+
+
+def _g_block(code):
+    block = Block()
+    block.add_word(GWord(code))
+    return block
+
+
+class RestartGenerator:
+    """
+    Builds the preamble needed to restart a program in the middle, e.g. after a broken tool.
+
+    The modal context at the restart block comes from a ModalCheckpointIndex,
+    so only the blocks since the nearest checkpoint are replayed. Build the
+    generator once per program (index.build() can run ahead of time, e.g. when
+    the file is opened) and every preamble after that takes a few milliseconds.
+
+    The preamble cancels cutter compensation and canned cycles, restores the
+    plane and units, retracts Z in machine coordinates (G53), reloads the tool
+    with its length offset, selects the work offset, starts the spindle and
+    coolant, positions over the restart point at a clearance height, feeds down
+    to it and finally restores the motion and distance modes.
+
+    When the position of an X/Y/Z axis at the restart block cannot be told from
+    the program (see ProgramState), preamble() raises ValueError, or with
+    allow_unknown_position writes a comment and an M00 stop before the approach.
+    """
+
+    def __init__(self, program, interval: int = 1000, clearance: float = 1.0, approach_feed: Optional[float] = None, protected: bool = False, allow_unknown_position: bool = False):
+        """
+        :param program: Program to restart.
+        :param interval: Checkpoint interval of the modal index.
+        :param clearance: Z height (work coordinates) used while positioning over the restart point.
+        :param approach_feed: Feed for the final Z approach; defaults to the program's active feed.
+        :param protected: If True, position with protected probe moves (G65 P9810, SafeMove) instead of G00/G01.
+        :param allow_unknown_position: If True, build a preamble that stops (M00) for the operator
+            instead of raising ValueError when an axis position is unknown.
+        """
+        self.program = program
+        self.index = ModalCheckpointIndex(program, interval)
+        self.clearance = clearance
+        self.approach_feed = approach_feed
+        self.protected = protected
+        self.allow_unknown_position = allow_unknown_position
+
+    def state(self, block_index: int) -> ProgramState:
+        """Return the modal context in effect when the given block starts."""
+        return self.index.state_before(block_index)
+
+    def preamble(self, block_index: int, o_number=None) -> Program:
+        """
+        Return a validated Program holding the blocks to run before restarting at `block_index`.
+
+        :param block_index: Index in program.blocks of the first block to run again.
+        :param o_number: O-number of the preamble program (defaults to the program's).
+        :raises ValueError: If an axis position is unknown and allow_unknown_position is False.
+        """
+        state = self.state(block_index)
+        unknown = self.unknown_axes(state)
+        if unknown and not self.allow_unknown_position:
+            raise ValueError(f"Cannot restart at block {block_index}: the {' '.join(unknown)} position is unknown")
+        preamble = Program(o_number if o_number is not None else self.program.o_number,
+                           f"RESTART AT BLOCK {block_index}", line_ending=self.program.line_ending)
+        for block in self._blocks(state, block_index):
+            preamble.add_block(block)
+        preamble.validate()
+        return preamble
+
+    def restart_program(self, block_index: int, o_number=None) -> Program:
+        """Return the preamble followed by the program's blocks from `block_index` on."""
+        program = self.preamble(block_index, o_number)
+        program.blocks.extend(self.program.blocks[block_index:])
+        return program
+
+    @staticmethod
+    def unknown_axes(state: ProgramState) -> list:
+        """Return the X/Y/Z axes whose position the preamble cannot restore."""
+        return [axis for axis in ("X", "Y", "Z") if axis in state.position and state.position[axis] is None]
+
+    def _blocks(self, state, block_index):
+        yield AddComment(f"RESTART AT BLOCK {block_index}")
+
+        active = state.active
+        radius_compensation = word_code(active(ModalGroup.TOOL_RADIUS_COMPENSATION))
+        if radius_compensation in (41, 42):
+            yield AddComment(f"G{radius_compensation} WAS ACTIVE - CHECK THE LEAD-IN")
+        canned_cycle = word_code(active(ModalGroup.CANNED_CYCLES))
+        if canned_cycle not in (None, 80):
+            yield AddComment(f"G{canned_cycle} CYCLE WAS ACTIVE - RESTART AT ITS FIRST BLOCK")
+
+        # Cancel compensation and cycles, restore plane and units, absolute positioning
+        yield _g_block(40)
+        yield _g_block(80)
+        for group in (ModalGroup.PLANE_SELECTION, ModalGroup.UNIT_SELECTION):
+            code = word_code(active(group))
+            if code is not None:
+                yield _g_block(code)
+        yield _g_block(90)
+
+        # Retract Z to machine home before touching the tool
+        retract = Block()
+        retract.add_word(GWord(53))
+        retract.add_word(ZWord(Numeric(0, 4)))
+        yield retract
+
+        if state.tool is not None:
+            yield ToolChange(state.tool, state.length_offset if state.length_offset is not None else state.tool)
+
+        if state.work_offset is not None:
+            block = Block()
+            for word in state.work_offset:
+                block.add_word(word)
+            yield block
+
+        spindle = word_code(state.spindle)
+        if spindle in (3, 4) and state.spindle_speed is not None:
+            yield SpindleOn(SpindleDirection.CW if spindle == 3 else SpindleDirection.CCW, state.spindle_speed)
+
+        if state.coolant:
+            coolant = Block()
+            coolant.add_word(MWord(8))
+            yield coolant
+
+        yield from self._approach(state)
+
+        if word_code(active(ModalGroup.DISTANCE_MODE)) == 91:
+            yield _g_block(91)
+        motion = word_code(active(ModalGroup.MOTION))
+        if motion is not None:
+            yield _g_block(motion)
+
+    def _approach(self, state):
+        """Position over the restart point at the clearance height, then feed down to it."""
+        position = state.position
+        unknown = self.unknown_axes(state)
+        if unknown:
+            yield AddComment(f"UNKNOWN {' '.join(unknown)} POSITION - CHECK BEFORE CYCLE START")
+            stop = Block()
+            stop.add_word(M00())
+            yield stop
+
+        x, y, z = position.get("X"), position.get("Y"), position.get("Z")
+        feed = self.approach_feed if self.approach_feed is not None else state.feed
+        if self.protected:
+            if x is not None or y is not None:
+                yield SafeMove(x=x, y=y, f=feed)
+            yield SafeMove(z=z if z is not None else self.clearance, f=feed)
+            return
+
+        yield RapidMove(z=self.clearance)
+        if x is not None or y is not None:
+            yield RapidMove(x=x, y=y)
+        if z is not None:
+            if feed is not None:
+                yield LinearFeedMove(z=z, f=feed)
+            else:
+                yield RapidMove(z=z)
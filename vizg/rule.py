@@ -2,6 +2,14 @@ from abc import ABC, abstractmethod
 
 class Rule(ABC):
     """Base class for rules that can be applied to a Word or G-code block."""
+    # Relative cost of checking the rule; rule plans run the cheapest rules first
+    cost = 10
+
+    @property
+    def key(self):
+        """Identity used to skip rules that check exactly the same thing. Defaults to the rule instance."""
+        return id(self)
+
     @abstractmethod
     def validate(self, value):
         """Subclasses must implement this method."""
@@ -17,3 +25,7 @@ class BlockRule(Rule):
     def validate(self, block):
         """Subclasses of BlockRule must implement this method."""
         pass  # Abstract method to enforce implementation
+
+    def check(self, histogram):
+        """Validate against a prebuilt BlockHistogram. Falls back to scanning the block."""
+        self.validate(histogram.block)
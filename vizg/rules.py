@@ -1,17 +1,36 @@
 from abc import ABC, abstractmethod
 
-from vizg.modals import is_word_in_group, ModalGroup
+from vizg.modals import is_modal_group
 from vizg.address import Address 
 from vizg.word import Word
 from vizg.specialWords import SpecialWord
 from vizg.macroVariable import MacroVariable
 from vizg.rule import Rule, NumericRule, BlockRule
+from vizg.validation import BlockHistogram
+
+class HistogramRule(BlockRule):
+    """BlockRule answered from a BlockHistogram instead of rescanning the block for every rule."""
+    cost = 2
+
+    def validate(self, block):
+        self.check(BlockHistogram(block))
+
+    @abstractmethod
+    def check(self, histogram):
+        """Subclasses of HistogramRule must implement this method."""
+        pass  # Abstract method to enforce implementation
 
 class NumericRangeRule(NumericRule):
+    cost = 1
+
     def __init__(self, min_value=None, max_value=None):
         self.min_value = min_value
         self.max_value = max_value
 
+    @property
+    def key(self):
+        return (NumericRangeRule, self.min_value, self.max_value)
+
     def validate(self, numeric):
         """Validate that the numeric value falls within the allowed range."""
         if isinstance(numeric, SpecialWord):
@@ -32,6 +51,12 @@ class NumericIntegerRule(NumericRule):
     """
     Rule to ensure that the numeric value is an integer (no decimal).
     """
+    cost = 1
+
+    @property
+    def key(self):
+        return (NumericIntegerRule,)
+
     def validate(self, numeric):
         """Validate that the numeric value is an integer."""
         if numeric is None:
@@ -49,24 +74,23 @@ class NumericPrecisionRule(NumericRule):
     """
     Rule to enforce specific precision on floating-point numbers.
     """
+    cost = 1
+
     def __init__(self, precision):
         self.precision = precision
 
+    @property
+    def key(self):
+        return (NumericPrecisionRule, self.precision)
+
     def validate(self, numeric):
         """Validate that the numeric value has the correct precision."""
         if numeric is None:
             return
-            
-            
-        value_str = str(numeric.value)
-        # Check if the value is a MacroVariable
-        if isinstance(numeric.value, MacroVariable):
-            value_str = str(numeric.value.value)
-            
-        # Extract the actual precision of the Decimal value (or numeric type)
-        
-        decimal_part = value_str.split('.')[1] if '.' in value_str else ''
-        actual_precision = len(decimal_part)
+
+        # Precision is a stored attribute; a Numeric wrapping a MacroVariable uses the variable's precision
+        variable = getattr(numeric, "variable", None)
+        actual_precision = variable.precision if variable is not None else numeric.precision
 
         # Check for too few decimal places
         if actual_precision < self.precision:
@@ -80,35 +104,38 @@ class NumericLeadingZeroRule(NumericRule):
     """
     Rule to ensure that the numeric value is an integer and has a leading zero if the value is 0-9.
     """
+    cost = 3
+
+    @property
+    def key(self):
+        return (NumericLeadingZeroRule,)
+
     def validate(self, numeric):
         """Validate that the numeric value has a leading zero if in the range 0-9."""
         if numeric is None:
             return
         value = numeric.value
-        print(f"value in lead value rule = {numeric}")
         if 0 <= value <= 9:
             if not repr(numeric).startswith('0'):
                 raise ValueError(f"Numeric value {value} must have a leading zero for values 0-9.")
 
-class ExcludeModalGroup(BlockRule):
+class ExcludeModalGroup(HistogramRule):
     def __init__(self, modal_group):
-        if not isinstance(modal_group, ModalGroup):
+        if not is_modal_group(modal_group):
             raise TypeError(f"modal_group must be of type ModalGroup, not {type(modal_group).__name__}")
         self.modal_group = modal_group
+
+    @property
+    def key(self):
+        return (ExcludeModalGroup, self.modal_group)
         
-    def validate(self, block):
-        """Validate that no words in the block belong to the excluded modal group."""
-        count = 0
-        for word in block:
-            if not isinstance(word, Word):
-                continue  # Skip special words
-            
-            if is_word_in_group(self.modal_group, word):
-                count += 1
-            if count > 1:
-                raise ValueError(f"Word {word} belongs to the excluded modal group {self.modal_group.name}")
+    def check(self, histogram):
+        """Validate that no more than one word in the block belongs to the excluded modal group."""
+        words = histogram.modal_words_in(self.modal_group)
+        if len(words) > 1:
+            raise ValueError(f"Word {words[1]} belongs to the excluded modal group {self.modal_group.name}")
                 
-class LimitAddress(BlockRule):
+class LimitAddress(HistogramRule):
     def __init__(self, address, num=1):
         # Ensure the provided address is a valid subclass of Address
         if not issubclass(address, Address):
@@ -116,53 +143,48 @@ class LimitAddress(BlockRule):
         self.address = address
         self.max_num = num
 
-    def validate(self, block):
-        """Validate that no words in the block contain the excluded address."""
-        count = 0
-        for word in block:
-            if not isinstance(word, Word):
-                continue  # Skip special words
-            
-            if word.address == self.address:
-                count += 1
-            if count > self.max_num:
-                raise ValueError(f"Word with address {self.address.letter()} is excluded from this block.")
+    @property
+    def key(self):
+        return (LimitAddress, self.address, self.max_num)
+
+    def check(self, histogram):
+        """Validate that no more than max_num words in the block contain the address."""
+        if histogram.count(self.address) > self.max_num:
+            raise ValueError(f"Word with address {self.address.letter()} is excluded from this block.")
 
-class ExcludeAddress(BlockRule):
+class ExcludeAddress(HistogramRule):
     def __init__(self, address):
         # Ensure the provided address is a valid subclass of Address
         if not issubclass(address, Address):
             raise TypeError(f"Address must be a subclass of Address, not {type(address).__name__}")
         self.address = address
 
-    def validate(self, block):
+    @property
+    def key(self):
+        return (ExcludeAddress, self.address)
+
+    def check(self, histogram):
         """Validate that no words in the block contain the excluded address."""
-        
-        for word in block:
-            if not isinstance(word, Word):
-                continue  # Skip special words
-            
-            if word.address == self.address:
-                raise ValueError(f"Word with address {self.address.letter()} is excluded from this block.")
+        if histogram.count(self.address):
+            raise ValueError(f"Word with address {self.address.letter()} is excluded from this block.")
                 
-class RequireAddress(BlockRule):
+class RequireAddress(HistogramRule):
     def __init__(self, address):
         # Ensure the provided address is a valid subclass of Address
         if not issubclass(address, Address):
             raise TypeError(f"Address must be a subclass of Address, not {type(address).__name__}")
         self.address = address
 
-    def validate(self, block):
+    @property
+    def key(self):
+        return (RequireAddress, self.address)
+
+    def check(self, histogram):
         """Validate that at least one word in the block contains the required address."""
-        for word in block:
-            if not isinstance(word, Word):
-                continue  # Skip special words
-            
-            if word.address == self.address:
-                return  # Found a word with the required address, validation passed
-        raise ValueError(f"Block does not contain a word with address {self.address.letter()}.")
+        if not histogram.count(self.address):
+            raise ValueError(f"Block does not contain a word with address {self.address.letter()}.")
         
-class RequireOneOfAddresses(BlockRule):
+class RequireOneOfAddresses(HistogramRule):
     def __init__(self, addresses):
         # Ensure each address in the list is a valid subclass of Address
         for address in addresses:
@@ -170,19 +192,19 @@ class RequireOneOfAddresses(BlockRule):
                 raise TypeError(f"All addresses must be subclasses of Address, found {type(address).__name__}")
         self.addresses = addresses
 
-    def validate(self, block):
+    @property
+    def key(self):
+        return (RequireOneOfAddresses, tuple(self.addresses))
+
+    def check(self, histogram):
         """Validate that at least one word in the block contains one of the required addresses."""
-        for word in block:
-            if not isinstance(word, Word):
-                continue  # Skip special words
-            
-            if any(word.address == address for address in self.addresses):
-                return  # Found at least one address, validation passed
+        if any(histogram.count(address) for address in self.addresses):
+            return  # Found at least one address, validation passed
         # If none of the required addresses were found, raise an error
         address_letters = [address.letter() for address in self.addresses]
         raise ValueError(f"Block does not contain a word with any of the addresses {', '.join(address_letters)}.")
 
-class RequireExactlyOneOfAddresses(BlockRule):
+class RequireExactlyOneOfAddresses(HistogramRule):
     def __init__(self, addresses):
         """
         Initializes the rule to enforce that exactly one of the given addresses must be present in the block.
@@ -195,19 +217,17 @@ class RequireExactlyOneOfAddresses(BlockRule):
                 raise TypeError(f"All addresses must be subclasses of Address, found {type(address).__name__}")
         self.addresses = addresses
 
-    def validate(self, block):
+    @property
+    def key(self):
+        return (RequireExactlyOneOfAddresses, tuple(self.addresses))
+
+    def check(self, histogram):
         """
         Validates that exactly one of the given addresses is present in the block.
         """
         matching_addresses = []
-
-        for word in block:
-            if not isinstance(word, Word):
-                continue  # Skip special words
-
-            # Check if the word's address matches any of the given addresses
-            if any(word.address == address for address in self.addresses):
-                matching_addresses.append(word.address)
+        for address in self.addresses:
+            matching_addresses.extend([address] * histogram.count(address))
 
         # Ensure exactly one address was found
         if len(matching_addresses) == 0:
@@ -215,7 +235,7 @@ class RequireExactlyOneOfAddresses(BlockRule):
         elif len(matching_addresses) > 1:
             raise ValueError(f"Block must contain exactly one of the addresses: {', '.join([address.letter() for address in self.addresses])}. Found multiple: {', '.join([address.letter() for address in matching_addresses])}.")
 
-class RequireAllAddresses(BlockRule):
+class RequireAllAddresses(HistogramRule):
     def __init__(self, addresses):
         # Ensure each address in the list is a valid subclass of Address
         for address in addresses:
@@ -223,35 +243,29 @@ class RequireAllAddresses(BlockRule):
                 raise TypeError(f"All addresses must be subclasses of Address, found {type(address).__name__}")
         self.addresses = addresses
 
-    def validate(self, block):
+    @property
+    def key(self):
+        return (RequireAllAddresses, tuple(self.addresses))
+
+    def check(self, histogram):
         """Validate that the block contains all of the required addresses."""
-        missing_addresses = []
-        for address in self.addresses:
-            if not any(word.address == address for word in block if isinstance(word, Word)):
-                missing_addresses.append(address.letter())
+        missing_addresses = [address.letter() for address in self.addresses if not histogram.count(address)]
         
         if missing_addresses:
             raise ValueError(f"Block is missing required addresses: {', '.join(missing_addresses)}.")
             
 class DuplicateAddress(ExcludeAddress):
     """Rule that ensures no duplicate addresses appear in the block."""
+    cost = 3
+
+    @property
+    def key(self):
+        # Every DuplicateAddress checks the whole block, whichever address it was created for
+        return (DuplicateAddress,)
     
-    def validate(self, block):
+    def check(self, histogram):
         """Validate that no words in the block contain duplicate addresses."""
-        address_count = {}
-        
-        for word in block:
-            if not isinstance(word, Word):
-                continue  # Skip special words
-            
-            # Count occurrences of each address
-            if word.address in address_count:
-                address_count[word.address] += 1
-            else:
-                address_count[word.address] = 1
-        
-        # Check for duplicates
-        duplicates = [address.letter() for address, count in address_count.items() if count > 1]
+        duplicates = [address.letter() for address in histogram.duplicates()]
         
         if duplicates:
             raise ValueError(f"Duplicate addresses found in the block: {', '.join(duplicates)}.")
\ No newline at end of file
@@ -0,0 +1,307 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from typing import Optional
+
+from vizg.machine import Machine
+from vizg.macroStorage import MACRO_RANGES, MacroVariableStorage
+
+# Snapshot layout (little-endian):
+#   header   : magic, version, range count, metadata offset, metadata length
+#   ranges   : start, stop, data offset for every range
+#   data     : float64 values of every range, 8-byte aligned
+#   metadata : UTF-8 JSON {"machine_id", "state", "text"}, zero padded to 8 bytes
+SNAPSHOT_MAGIC = b"VZMS"
+SNAPSHOT_VERSION = 1
+_SNAPSHOT_HEADER = struct.Struct("<4sHHQQ")
+_SNAPSHOT_RANGE = struct.Struct("<IIQ")
+
+# Journal layout (little-endian): header (magic, version), then batches of
+#   count, payload length, payload, CRC32 of the payload
+# where the payload holds `count` entries of number, kind, then a float64 (kind 0)
+# or a length-prefixed UTF-8 text (kind 1).
+JOURNAL_MAGIC = b"VZMJ"
+JOURNAL_VERSION = 1
+_JOURNAL_HEADER = struct.Struct("<4sHH")
+_BATCH_HEADER = struct.Struct("<II")
+_BATCH_CRC = struct.Struct("<I")
+_FLOAT_ENTRY = struct.Struct("<IBd")
+_TEXT_ENTRY = struct.Struct("<IBI")
+_FLOAT, _TEXT = 0, 1
+
+
+def _little_endian(values: array) -> array:
+    if sys.byteorder == "big":
+        values = array('d', values)
+        values.byteswap()
+    return values
+
+
+def write_snapshot(machine: Machine, path: str) -> int:
+    """
+    Write a binary snapshot of a Machine's macro variables, id and state.
+
+    The file is written next to `path` and renamed into place, so readers never
+    see a partial snapshot. Returns the number of bytes written.
+    """
+    storage = machine.macro_variables
+    text = {}
+    chunks = []
+    offset = _SNAPSHOT_HEADER.size + _SNAPSHOT_RANGE.size * len(MACRO_RANGES)
+    offset += -offset % 8
+    table = []
+    for index, macro_range in enumerate(MACRO_RANGES):
+        values = storage.range_values(index)
+        for position, value in enumerate(values):
+            if value != value:
+                number = macro_range.start + position
+                if isinstance(storage[number], str):
+                    text[number] = storage[number]
+        table.append(_SNAPSHOT_RANGE.pack(macro_range.start, macro_range.stop, offset))
+        chunks.append(_little_endian(values).tobytes())
+        offset += 8 * len(macro_range)
+
+    metadata = json.dumps({"machine_id": machine.machine_id, "state": machine.state, "text": text}).encode("utf-8")
+    header = _SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(MACRO_RANGES), offset, len(metadata))
+
+    head = header + b"".join(table)
+    head += bytes(-len(head) % 8)
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as fp:
+        fp.write(head)
+        for chunk in chunks:
+            fp.write(chunk)
+        fp.write(metadata + bytes(-len(metadata) % 8))  # Whole file stays a multiple of 8 bytes
+    os.replace(temporary, path)
+    return offset + len(metadata) + -len(metadata) % 8
+
+
+class MachineSnapshot:
+    """
+    Read-only, memory-mapped view of a snapshot file.
+
+    Variable values are read straight from the mapping without loading the
+    whole table; to_machine() builds a full Machine.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fp:
+            self._map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, count, metadata_offset, metadata_length = _SNAPSHOT_HEADER.unpack_from(self._map, 0)
+        except struct.error:
+            self.close()
+            raise ValueError(f"{path} is not a machine snapshot")
+        if magic != SNAPSHOT_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a machine snapshot")
+        if version != SNAPSHOT_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported snapshot version {version} in {path}")
+
+        self.version = version
+        self.ranges = [
+            _SNAPSHOT_RANGE.unpack_from(self._map, _SNAPSHOT_HEADER.size + i * _SNAPSHOT_RANGE.size)
+            for i in range(count)
+        ]
+        metadata = json.loads(self._map[metadata_offset:metadata_offset + metadata_length].decode("utf-8"))
+        self.machine_id = metadata["machine_id"]
+        self.state = metadata["state"]
+        self.text = {int(number): value for number, value in metadata["text"].items()}
+        self._floats = memoryview(self._map).cast('d') if sys.byteorder == "little" else None
+
+    def values(self, start: int, stop: int):
+        """
+        Return the values of #start to #stop - 1 (inside one stored range).
+
+        On little-endian hosts this is a memoryview into the mapping; release it before close().
+        """
+        for range_start, range_stop, offset in self.ranges:
+            if range_start <= start and stop <= range_stop:
+                first = (offset + 8 * (start - range_start)) // 8
+                if self._floats is not None:
+                    return self._floats[first:first + stop - start]
+                values = array('d', self._map[8 * first:8 * (first + stop - start)])
+                values.byteswap()
+                return values
+        raise ValueError(f"Macro variables #{start}-#{stop - 1} do not lie in one stored range")
+
+    def get(self, number: int):
+        """Return one variable's value."""
+        if number in self.text:
+            return self.text[number]
+        return self.values(number, number + 1)[0]
+
+    def to_machine(self, machine_id: Optional[str] = None) -> Machine:
+        """Build a Machine holding the snapshot's state."""
+        machine = Machine(machine_id or self.machine_id)
+        machine.state = json.loads(json.dumps(self.state))
+        storage = MacroVariableStorage.from_items(self.text.items())
+        current = {(r.start, r.stop): index for index, r in enumerate(MACRO_RANGES)}
+        for start, stop, offset in self.ranges:
+            values = array('d', self.values(start, stop))
+            index = current.get((start, stop))
+            if index is not None:
+                storage.load_range(index, values)
+            else:
+                # Range layout changed since the snapshot was written: copy what still exists
+                for number, value in zip(range(start, stop), values):
+                    if number in storage and number not in self.text:
+                        storage[number] = value
+        machine.macro_variables = storage
+        return machine
+
+    def close(self):
+        if getattr(self, "_floats", None) is not None:
+            self._floats.release()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_snapshot(path: str) -> Machine:
+    """Load a Machine from a snapshot file."""
+    with MachineSnapshot(path) as snapshot:
+        return snapshot.to_machine()
+
+
+class MachineJournal:
+    """
+    Append-only journal of macro variable changes.
+
+    Every flush() appends one batch holding the variables set since the last
+    flush, so saving costs in proportion to what changed. Batches carry a CRC,
+    and a torn batch at the end of the file (e.g. after a crash) is ignored on
+    replay and cut off when the journal is opened again. checkpoint() writes a
+    snapshot and empties the journal.
+    """
+
+    def __init__(self, machine: Machine, path: str, sync: bool = False):
+        """
+        :param machine: Machine whose changes are journaled.
+        :param path: Journal file; appended to if it exists, after cutting off a torn batch at its end.
+        :param sync: If True, fsync after every flush.
+        """
+        self.machine = machine
+        self.path = path
+        self.sync = sync
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            _check_journal_header(path)
+            with open(path, "rb") as fp:
+                data = fp.read()
+            valid = _JOURNAL_HEADER.size
+            for _, _, valid in _batches(data):
+                pass
+        self._fp = open(path, "ab")
+        if exists and valid < len(data):
+            # New batches must follow the last intact one, or replay would stop before them
+            self._fp.truncate(valid)
+        if not exists:
+            self._fp.write(_JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, 0))
+            self._fp.flush()
+        machine.macro_variables.track_changes()
+
+    def flush(self) -> int:
+        """Append the changes since the last flush. Returns the number of variables written."""
+        changes = self.machine.macro_variables.pop_changes()
+        if not changes:
+            return 0
+        entries = []
+        for number, value in changes.items():
+            if isinstance(value, str):
+                encoded = value.encode("utf-8")
+                entries.append(_TEXT_ENTRY.pack(number, _TEXT, len(encoded)) + encoded)
+            else:
+                entries.append(_FLOAT_ENTRY.pack(number, _FLOAT, value))
+        payload = b"".join(entries)
+        self._fp.write(_BATCH_HEADER.pack(len(entries), len(payload)) + payload + _BATCH_CRC.pack(zlib.crc32(payload)))
+        self._fp.flush()
+        if self.sync:
+            os.fsync(self._fp.fileno())
+        return len(entries)
+
+    def checkpoint(self, snapshot_path: str) -> int:
+        """Write a snapshot of the machine and empty the journal. Returns the snapshot size."""
+        size = write_snapshot(self.machine, snapshot_path)
+        self.machine.macro_variables.pop_changes()
+        self._fp.truncate(_JOURNAL_HEADER.size)
+        self._fp.seek(0, os.SEEK_END)
+        return size
+
+    def close(self):
+        self.flush()
+        self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _check_journal_header(path):
+    with open(path, "rb") as fp:
+        header = fp.read(_JOURNAL_HEADER.size)
+    if len(header) < _JOURNAL_HEADER.size or header[:4] != JOURNAL_MAGIC:
+        raise ValueError(f"{path} is not a machine journal")
+    version = _JOURNAL_HEADER.unpack(header)[1]
+    if version != JOURNAL_VERSION:
+        raise ValueError(f"Unsupported journal version {version} in {path}")
+
+
+def _batches(data):
+    """Yield (count, payload, end offset) for the intact batches of journal data, up to the first torn or corrupt one."""
+    position = _JOURNAL_HEADER.size
+    while position + _BATCH_HEADER.size <= len(data):
+        count, length = _BATCH_HEADER.unpack_from(data, position)
+        start = position + _BATCH_HEADER.size
+        end = start + length
+        if end + _BATCH_CRC.size > len(data):
+            return  # Torn write at the end of the journal
+        payload = data[start:end]
+        if _BATCH_CRC.unpack_from(data, end)[0] != zlib.crc32(payload):
+            return
+        position = end + _BATCH_CRC.size
+        yield count, payload, position
+
+
+def replay_journal(path: str, machine: Machine) -> int:
+    """Apply a journal's batches to a Machine in order. Returns the number of variables set."""
+    _check_journal_header(path)
+    with open(path, "rb") as fp:
+        data = fp.read()
+
+    applied = 0
+    for count, payload, _ in _batches(data):
+        offset = 0
+        for _ in range(count):
+            number, kind = struct.unpack_from("<IB", payload, offset)
+            if kind == _FLOAT:
+                value = _FLOAT_ENTRY.unpack_from(payload, offset)[2]
+                offset += _FLOAT_ENTRY.size
+            else:
+                length = _TEXT_ENTRY.unpack_from(payload, offset)[2]
+                offset += _TEXT_ENTRY.size
+                value = payload[offset:offset + length].decode("utf-8")
+                offset += length
+            machine.set_macro_variable(number, value)
+            applied += 1
+    return applied
+
+
+def load_machine(snapshot_path: str, journal_path: Optional[str] = None) -> Machine:
+    """Load a Machine from a snapshot and replay its journal, if any, on top."""
+    machine = read_snapshot(snapshot_path)
+    if journal_path is not None and os.path.exists(journal_path):
+        replay_journal(journal_path, machine)
+    return machine
@@ -11,6 +11,14 @@ class SpecialWord():
     def validate(self, block):
         pass
 
+    def __eq__(self, other):
+        if not isinstance(other, SpecialWord):
+            return NotImplemented
+        return type(self) is type(other) and self.text == other.text
+
+    def __hash__(self):
+        return hash((type(self), self.text))
+
     def __repr__(self):
         return f"<SpecialWord: {self.text}>"
         
@@ -0,0 +1,312 @@
+from typing import Optional
+
+import numpy as np
+
+from vizg.block import Block
+from vizg.commands import RemoteSub
+from vizg.loop import Loop
+from vizg.modalIndex import _is_word
+from vizg.modals import word_code
+from vizg.program import Program, ProgramBundle
+from vizg.words import MWord
+
+# Blocks that must stay where they are: program end and return, subprogram and macro calls
+# (their nesting depth is unknown) and blocks with N labels (M97 and GOTO targets)
+_BARRIER_M_CODES = {2, 30, 97, 98, 99}
+_BARRIER_G_CODES = {65}
+
+# Polynomial hash modulo 2**64; the multiplier is odd, so it has an inverse
+_MULTIPLIER = 0x9E3779B97F4A7C15
+_INVERSE = pow(_MULTIPLIER, -1, 1 << 64)
+
+_MAX_REPEAT = 9999  # Largest L word of M98
+
+
+class _Call:
+    """Placeholder for a call to an extracted subprogram while the extraction runs."""
+    __slots__ = ('o_number', 'depth')
+
+    def __init__(self, o_number, depth):
+        self.o_number = o_number
+        self.depth = depth
+
+
+def _powers(base, count):
+    powers = np.empty(count + 1, dtype=np.uint64)
+    powers[0] = 1
+    np.cumprod(np.full(count, base, dtype=np.uint64), out=powers[1:])
+    return powers
+
+
+class _WindowHashes:
+    """Rolling hashes of every window of a token array, for any window length."""
+
+    def __init__(self, tokens):
+        count = len(tokens)
+        values = tokens.view(np.uint64)
+        self.powers = _powers(_MULTIPLIER, count)
+        prefix = np.zeros(count + 1, dtype=np.uint64)
+        np.cumsum(values * _powers(_INVERSE, count)[:count], out=prefix[1:])
+        self.prefix = prefix
+
+    def __call__(self, length):
+        """Hash of tokens[i:i + length] for every start i (position independent)."""
+        prefix = self.prefix
+        return (prefix[length:] - prefix[:-length]) * self.powers[:len(prefix) - length]
+
+
+class SubprogramExtractor:
+    """
+    Moves block sequences that repeat in a program into M98 subprograms.
+
+    Every block is reduced to an integer token (blocks with the same text share
+    a token) and windows of tokens are compared through rolling hashes computed
+    with NumPy. The extraction is greedy: each round hoists the repeated
+    sequence that saves the most lines, then replaces its occurrences by a call
+    token, so later rounds can extract sequences that contain calls (nested
+    subprograms). Adjacent calls to the same subprogram become one M98 with an
+    L repeat count.
+
+    Each round costs O(log n) hash sorts to bisect the longest repeated length
+    (bounded by max_length and by the previous round's longest, since
+    replacing occurrences never makes repeats longer), plus one sort per
+    candidate length tried; lengths grow geometrically from min_length, so a
+    round tries O(log max_length) of them. Lower max_length or
+    max_subprograms to bound the run time on very long programs.
+
+    Calls run the same blocks in the same order, so the output is equivalent to
+    the input; ProgramBundle.inline() expands the calls again.
+    """
+
+    def __init__(self, min_length: int = 3, max_subprograms: int = 100, first_o_number: int = 1000, max_depth: int = 4, candidates: int = 8, max_length: Optional[int] = None):
+        """
+        :param min_length: Shortest block sequence worth a subprogram.
+        :param max_subprograms: Maximum number of subprograms to create.
+        :param first_o_number: O-number of the first subprogram; the next ones count up from it.
+        :param max_depth: Maximum M98 nesting depth (the main program calling a subprogram is depth 1).
+        :param candidates: Number of most frequent sequences examined per candidate length.
+        :param max_length: Longest window searched for repeats (None: half the program); extension past it is still allowed.
+        """
+        if min_length < 2:
+            raise ValueError("Subprograms must hold at least 2 blocks")
+        if max_length is not None and max_length < min_length:
+            raise ValueError("max_length must not be shorter than min_length")
+        self.min_length = min_length
+        self.max_subprograms = max_subprograms
+        self.first_o_number = first_o_number
+        self.max_depth = max_depth
+        self.candidates = candidates
+        self.max_length = max_length
+        self.saved_lines = 0  # Lines saved by the last extract()
+
+    def extract(self, program) -> ProgramBundle:
+        """Return a ProgramBundle with the program's repeated sequences moved into subprograms."""
+        items = list(program.blocks)
+        keys = {}
+        tokens = np.fromiter((self._token(item, index, keys) for index, item in enumerate(items)), dtype=np.int64, count=len(items))
+
+        # O-numbers already in use: the program's own and every number it calls
+        taken = _called_numbers(items)
+        if program.o_number is not None:
+            taken.add(int(program.o_number))
+
+        subprograms = []
+        o_number = self.first_o_number
+        longest = self.max_length or len(tokens) // 2
+        while len(subprograms) < self.max_subprograms:
+            while o_number in taken:
+                o_number += 1
+            if o_number > 9999:
+                break
+            best, longest = self._best(tokens, items, longest)
+            if best is None:
+                break
+            _, length, positions = best
+            body = items[positions[0]:positions[0] + length]
+            depth = 1 + max((item.depth for item in body if type(item) is _Call), default=0)
+            call = _Call(o_number, depth)
+            token = keys.setdefault(("call", o_number), len(keys) + 1)
+            tokens, items = self._replace(tokens, items, positions, length, token, call)
+            subprograms.append(self._subprogram(o_number, body, program.line_ending))
+            o_number += 1
+
+        main = Program(program.o_number, program.comment, line_ending=program.line_ending)
+        main.blocks.extend(_calls(items))
+        # Every subprogram also costs its O-number line
+        self.saved_lines = len(program.blocks) - len(main.blocks) - sum(len(sub.blocks) + 1 for sub in subprograms)
+        return ProgramBundle(main, subprograms)
+
+    def _token(self, item, index, keys):
+        block = item.get_block() if hasattr(item, "get_block") else item
+        if not isinstance(block, Block):
+            return -index - 1  # Loops and other entries never repeat
+        for word in block.words:
+            if not _is_word(type(word)) or word.numeric is None:
+                continue
+            letter = word.address.__name__
+            if letter == "N" or (letter == "M" and word_code(word) in _BARRIER_M_CODES) or (letter == "G" and word_code(word) in _BARRIER_G_CODES):
+                return -index - 1
+        return keys.setdefault(str(block), len(keys) + 1)
+
+    def _best(self, tokens, items, longest):
+        """
+        Return (saving, length, positions) of the most profitable repeated sequence (or None)
+        and the longest repeated window length, searched up to longest.
+        """
+        count = len(tokens)
+        if count < 2 * self.min_length:
+            return None, longest
+        hashes = _WindowHashes(tokens)
+
+        def repeated(length):
+            window = np.sort(hashes(length))  # A plain sort beats np.unique's hash table here
+            return bool((window[1:] == window[:-1]).any())
+
+        # Repeats of length L imply repeats of every shorter length: bisect the longest one
+        low, high = self.min_length, min(longest, count // 2)
+        if not repeated(low):
+            return None, low
+        while low < high:
+            middle = (low + high + 1) // 2
+            if repeated(middle):
+                low = middle
+            else:
+                high = middle - 1
+
+        lengths = {low}
+        length = self.min_length
+        while length < low:
+            lengths.add(length)
+            length = max(length + 1, int(length * 1.5))
+
+        best = None
+        for length in sorted(lengths, reverse=True):
+            for positions in self._groups(hashes(length)):
+                chosen = _non_overlapping(tokens, positions, length)
+                if len(chosen) < 2:
+                    continue
+                chosen, extended = _extend(tokens, chosen, length)
+                body = items[chosen[0]:chosen[0] + extended]
+                depth = 1 + max((item.depth for item in body if type(item) is _Call), default=0)
+                if depth > self.max_depth:
+                    continue
+                saving = len(chosen) * extended - _call_count(chosen, extended) - (extended + 2)
+                if saving > 0 and (best is None or saving > best[0]):
+                    best = (saving, extended, chosen)
+        return best, low
+
+    def _groups(self, window):
+        """Yield the start positions (ascending) of the most frequent window hashes."""
+        order = np.argsort(window, kind="stable")
+        ordered = window[order]
+        starts = np.flatnonzero(np.concatenate(([True], ordered[1:] != ordered[:-1])))
+        counts = np.diff(np.append(starts, len(ordered)))
+        for group in np.argsort(counts, kind="stable")[::-1][:self.candidates]:
+            if counts[group] < 2:
+                break
+            yield np.sort(order[starts[group]:starts[group] + counts[group]])
+
+    @staticmethod
+    def _replace(tokens, items, positions, length, token, call):
+        pieces = []
+        new_items = []
+        previous = 0
+        for position in positions.tolist():
+            pieces.append(tokens[previous:position])
+            pieces.append(np.array([token], dtype=np.int64))
+            new_items.extend(items[previous:position])
+            new_items.append(call)
+            previous = position + length
+        pieces.append(tokens[previous:])
+        new_items.extend(items[previous:])
+        return np.concatenate(pieces), new_items
+
+    @staticmethod
+    def _subprogram(o_number, body, line_ending):
+        subprogram = Program(o_number, line_ending=line_ending)
+        subprogram.blocks.extend(_calls(body))
+        end = Block()
+        end.add_word(MWord(99))
+        subprogram.add_block(end)
+        return subprogram
+
+
+def _non_overlapping(tokens, positions, length):
+    """Keep the positions whose window does not overlap the previous one and matches the first one (hash collisions)."""
+    chosen = []
+    end = -1
+    for position in positions.tolist():
+        if position >= end:
+            chosen.append(position)
+            end = position + length
+    chosen = np.array(chosen)
+    windows = tokens[np.add.outer(chosen, np.arange(length))]
+    return chosen[(windows == windows[0]).all(axis=1)]
+
+
+def _extend(tokens, positions, length):
+    """Grow equal, non-overlapping windows to the right and to the left as far as they stay equal."""
+    gap = int(np.diff(positions).min())
+    limit = min(gap, len(tokens) - int(positions[-1]))
+    while length < limit:
+        following = tokens[positions + length]
+        if following[0] < 0 or (following != following[0]).any():
+            break
+        length += 1
+    while positions[0] > 0 and length < gap:
+        preceding = tokens[positions - 1]
+        if preceding[0] < 0 or (preceding != preceding[0]).any():
+            break
+        positions = positions - 1
+        length += 1
+    return positions, length
+
+
+def _called_numbers(items):
+    """Return the P values of the M97, M98 and G65 calls in program entries, loop bodies included."""
+    numbers = set()
+    for item in items:
+        if isinstance(item, Loop):
+            numbers |= _called_numbers(item.blocks)
+            continue
+        block = item.get_block() if hasattr(item, "get_block") else item
+        if not isinstance(block, Block):
+            continue
+        codes = {word.address.__name__: word_code(word) for word in block.words if _is_word(type(word))}
+        if codes.get("M") in (97, 98) or codes.get("G") == 65:
+            if codes.get("P") is not None:
+                numbers.add(codes["P"])
+    return numbers
+
+
+def _call_count(positions, length):
+    """Number of M98 blocks needed once back-to-back occurrences share one call with an L count."""
+    return 1 + int(np.count_nonzero(np.diff(positions) != length))
+
+
+def _calls(items):
+    """Replace call placeholders by RemoteSub commands, merging back-to-back calls into an L count."""
+    blocks = []
+    commands = {}  # (O-number, repeat) -> RemoteSub, shared (frozen) by identical calls
+    index = 0
+    while index < len(items):
+        item = items[index]
+        if type(item) is not _Call:
+            blocks.append(item)
+            index += 1
+            continue
+        repeat = 1
+        while index + repeat < len(items) and items[index + repeat] is item and repeat < _MAX_REPEAT:
+            repeat += 1
+        command = commands.get((item.o_number, repeat))
+        if command is None:
+            command = commands[item.o_number, repeat] = RemoteSub(item.o_number, repeat if repeat > 1 else None)
+            command.block.freeze()
+        blocks.append(command)
+        index += repeat
+    return blocks
+
+
+def extract_subprograms(program, **options) -> ProgramBundle:
+    """Return a ProgramBundle with repeated block sequences moved into M98 subprograms (see SubprogramExtractor)."""
+    return SubprogramExtractor(**options).extract(program)
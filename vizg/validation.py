@@ -0,0 +1,95 @@
+from typing import Iterable
+
+from vizg.modals import modal_group_of
+from vizg.word import Word
+
+
+class BlockHistogram:
+    """
+    One-pass summary of the addresses and modal groups used in a block.
+
+    Built once per block and shared by every BlockRule, so validation costs a
+    single scan of the words instead of one scan per rule.
+    """
+
+    def __init__(self, block):
+        self.block = block
+        self.counts = {}       # Address -> number of words using it
+        self.first_words = {}  # Address -> first word using it
+        self.modal_words = {}  # ModalGroup -> words belonging to it, in block order
+
+        for word in block:
+            if not isinstance(word, Word):
+                continue  # Skip special words
+
+            address = word.address
+            if address in self.counts:
+                self.counts[address] += 1
+            else:
+                self.counts[address] = 1
+                self.first_words[address] = word
+
+            group = modal_group_of(word)
+            if group is not None:
+                self.modal_words.setdefault(group, []).append(word)
+
+    def count(self, address):
+        """Return the number of words in the block using the given address."""
+        return self.counts.get(address, 0)
+
+    def first(self, address):
+        """Return the first word in the block using the given address, or None."""
+        return self.first_words.get(address)
+
+    def duplicates(self):
+        """Return the addresses used more than once, in order of first appearance."""
+        return [address for address, count in self.counts.items() if count > 1]
+
+    def modal_words_in(self, group):
+        """Return the words in the block belonging to the given ModalGroup."""
+        return self.modal_words.get(group, [])
+
+
+def validate_block(block):
+    """
+    Validate a single block with one histogram pass.
+
+    Every Word checks its rules against the shared histogram, and block rules
+    that test the same thing (e.g. the DuplicateAddress rule every AddressWord
+    carries) are only checked once.
+    """
+    histogram = BlockHistogram(block)
+    checked = set()
+    for word in block:
+        if isinstance(word, Word):
+            word.check(histogram, checked)
+        else:
+            word.validate(block)
+
+
+def validate_blocks(blocks: Iterable[object]) -> int:
+    """
+    Validate a stream of blocks (e.g. Program.blocks or GCodeParser.iter_blocks).
+
+    Loops are validated block by block. Errors are re-raised with the index of the
+    offending top-level block.
+
+    :return: The number of top-level blocks validated.
+    """
+    count = 0
+    for index, block in enumerate(blocks):
+        try:
+            _validate_any(block)
+        except ValueError as e:
+            raise ValueError(f"Block {index}: {e}") from e
+        count += 1
+    return count
+
+
+def _validate_any(block):
+    nested = getattr(block, "blocks", None)
+    if nested is not None:
+        for inner in nested:
+            _validate_any(inner)
+    else:
+        block.validate()
@@ -4,25 +4,95 @@ from vizg.address import Address
 from vizg.numeric  import Numeric
 from vizg.macroVariable import MacroVariable
 from vizg.rule import NumericRule, BlockRule
+from vizg.flyweight import FlyweightMeta, intern_word
+
+class Word(metaclass=FlyweightMeta):
+    """Immutable, hashable G-code word. Subclasses must declare __slots__ too."""
+    __slots__ = ('address', 'numeric', 'rules', '__weakref__')
+
+    # Parameterless classes set this to share a single instance (see FlyweightMeta)
+    FLYWEIGHT = False
+
+    # Rules shared by every instance of the class; collected along the MRO by compile_rules
+    CLASS_RULES = ()
+
+    # Compiled rule plans, keyed by (word class, instance-specific key)
+    _rule_plans = {}
 
-class Word:
     def __init__(self, address: Address, numeric: Numeric, rules=None):
         """Represents a G-code word with an address (subclass of Address), a numeric value, and optional rules."""
         if not issubclass(address, Address):
             raise TypeError(f"Address must be a subclass of Address, not {type(address).__name__}")
-        self.address = address
+        object.__setattr__(self, 'address', address)
         
         is_numeric = isinstance(numeric, Numeric)
         is_var = isinstance(numeric, MacroVariable)
         if numeric is not None and not is_numeric and not is_var:
             raise TypeError(f"Numeric value must be of type Numeric, not {type(numeric).__name__}")
-        self.numeric = numeric
+        object.__setattr__(self, 'numeric', numeric)
 
-        # Initialize rules if not provided, ensuring that the DuplicateAddress and NumericLeadingZeroRule are always applied
-        self.rules = rules if rules is not None else []
-        
-        # Ensure that duplicate addresses are not allowed in a block
-        #self.rules.append(DuplicateAddress(address))
+        # Rules are normally a shared, precompiled plan (see rule_plan)
+        object.__setattr__(self, 'rules', tuple(rules) if rules is not None else ())
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def _key(self):
+        """Tuple identifying the word for equality and hashing."""
+        return (type(self), self.address, self.numeric, self.rules)
+
+    def intern(self):
+        """Return the shared instance equal to this word (see flyweight.intern_word)."""
+        return intern_word(self)
+
+    def __eq__(self, other):
+        if not isinstance(other, Word):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    @classmethod
+    def compile_rules(cls, rules=()):
+        """
+        Build a validation plan from the class rules along the MRO plus the given rules.
+
+        Rules that check the same thing (same rule key) are only kept once, and the
+        plan is ordered cheapest rule first.
+
+        :param rules: Instance-specific rules to add to the class rules.
+        :return: A tuple of rules.
+        """
+        collected = []
+        for klass in reversed(cls.__mro__):
+            collected.extend(vars(klass).get("CLASS_RULES", ()))
+        collected.extend(rules)
+
+        unique = {}
+        for rule in collected:
+            unique.setdefault(rule.key, rule)
+        return tuple(sorted(unique.values(), key=lambda rule: rule.cost))
+
+    @classmethod
+    def rule_plan(cls, key, build):
+        """
+        Return the build-once validation plan of this class for the given key.
+
+        :param key: Hashable description of the instance-specific rules (e.g. address, precision, range).
+        :param build: Callable returning the instance-specific rules; only called when compiling the plan.
+        """
+        try:
+            return Word._rule_plans[(cls, key)]
+        except KeyError:
+            plan = Word._rule_plans[(cls, key)] = cls.compile_rules(build())
+            return plan
+        except TypeError:
+            # Unhashable key (e.g. a MacroVariable range bound), compile without caching
+            return cls.compile_rules(build())
 
     def __repr__(self):
         """Return the G-code word in its conventional format (e.g., G01 or F1500)."""
@@ -38,3 +108,20 @@ class Word:
                 rule.validate(self.numeric)
             if block is not None and isinstance(rule, BlockRule):
                 rule.validate(block)
+
+    def check(self, histogram, checked=None):
+        """
+        Validate the word against a prebuilt BlockHistogram.
+
+        :param histogram: BlockHistogram of the block containing this word.
+        :param checked: Optional set of rule keys already checked for this block; matching rules are skipped.
+        """
+        for rule in self.rules:
+            if isinstance(rule, NumericRule):
+                rule.validate(self.numeric)
+            elif isinstance(rule, BlockRule):
+                if checked is not None:
+                    if rule.key in checked:
+                        continue
+                    checked.add(rule.key)
+                rule.check(histogram)
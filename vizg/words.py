@@ -2,7 +2,7 @@ from abc import ABC
 from typing import Optional, Union, List
 from decimal import Decimal
 
-from vizg.address import Address, A, F, G, H, I, J, K, L, M, P, S, T, X, Y, Z
+from vizg.address import Address, A, D, F, G, H, I, J, K, L, M, P, S, T, X, Y, Z
 from vizg.numeric import Numeric
 from vizg.macroVariable import MacroVariable 
 from vizg.modals import ModalGroup
@@ -22,15 +22,20 @@ from vizg.rules import (
     LimitAddress,
 )
 
+def _bound(value):
+    """Return a range bound as a plain number; Numeric bounds hash like their value but do not order against it."""
+    if isinstance(value, Numeric):
+        return value.value
+    return value
+
 class AddressWord(Word):
+    __slots__ = ()
+
     def __init__(self, address: Address, value: Union[Decimal, MacroVariable, Numeric], min_value: Optional[Union[Decimal, int, float]] = None, max_value: Optional[Union[Decimal, int, float]] = None, precision: Optional[int] = None, rules: Optional[List[Rule]] = None):
                    
         numeric = value
         if not isinstance(value, MacroVariable):
             if not isinstance(value, Numeric):
-                if not isinstance(value, Decimal):
-                    value = Decimal(value)
-                
                 leading_zero = False
                 if precision is None or precision == 0:
                     precision = 0
@@ -38,14 +43,21 @@ class AddressWord(Word):
                 numeric = Numeric(value, precision, leading_zero)
                 
         precision = numeric.precision
-            
-        rules = rules if rules is not None else []
-        rules.append(DuplicateAddress(address))
-        rules.append(NumericPrecisionRule(precision)) 
-        if min_value is not None and max_value is not None:
-            rules.append(NumericRangeRule(min_value, max_value))
-            
-        super().__init__(address, numeric, rules=rules)
+        min_value = _bound(min_value)
+        max_value = _bound(max_value)
+
+        def build():
+            plan_rules = [DuplicateAddress(address), NumericPrecisionRule(precision)]
+            if min_value is not None and max_value is not None:
+                plan_rules.append(NumericRangeRule(min_value, max_value))
+            return plan_rules
+
+        if rules:
+            plan = self.compile_rules(build() + list(rules))
+        else:
+            plan = self.rule_plan((address, precision, min_value, max_value), build)
+
+        super().__init__(address, numeric, rules=plan)
         
     def validate(self, block=None):
         for rule in self.rules:
@@ -55,133 +67,195 @@ class AddressWord(Word):
                 rule.validate(block)
 
 class AxisWord(AddressWord):
+    __slots__ = ()
+
     def __init__(self, address, value: Union[Decimal, MacroVariable, Numeric], min_value: Optional[Union[int, float, Decimal]] =None, max_value: Optional[Union[int, float, Decimal]] =None, precision: Optional[int] =None, rules: Optional[List[Rule]]=None):
         super().__init__(address, value, min_value=min_value, max_value=max_value, precision=precision, rules=rules)
 
 class XWord(AxisWord):
+    __slots__ = ()
+
     def __init__(self, value: Union[Decimal, MacroVariable, Numeric], min_value: Optional[Union[int, float, Decimal]] =None, max_value: Optional[Union[int, float, Decimal]] =None, precision: Optional[int] =None, rules: Optional[List[Rule]]=None):
         super().__init__(X, value, min_value=min_value, max_value=max_value, precision=precision, rules=rules)
 
 class YWord(AxisWord):
+    __slots__ = ()
+
     def __init__(self, value: Union[Decimal, MacroVariable, Numeric], min_value: Optional[Union[int, float, Decimal]] =None, max_value: Optional[Union[int, float, Decimal]] =None, precision: Optional[int] =None, rules: Optional[List[Rule]]=None):
         super().__init__(Y, value, min_value=min_value, max_value=max_value, precision=precision, rules=rules)
 
 class ZWord(AxisWord):
+    __slots__ = ()
+
     def __init__(self, value: Union[Decimal, MacroVariable, Numeric], min_value: Optional[Union[int, float, Decimal]] =None, max_value: Optional[Union[int, float, Decimal]] =None, precision: Optional[int] =None, rules: Optional[List[Rule]]=None):
         super().__init__(Z, value, min_value=min_value, max_value=max_value, precision=precision, rules=rules)
 
 class AWord(AxisWord):
+    __slots__ = ()
+
     def __init__(self, value: Union[Decimal, MacroVariable, Numeric], min_value: Optional[Union[int, float, Decimal]] =None, max_value: Optional[Union[int, float, Decimal]] =None, precision: Optional[int] =None, rules: Optional[List[Rule]]=None):
         super().__init__(A, value, min_value=min_value, max_value=max_value, precision=precision, rules=rules)
                 
 class FWord(AddressWord):
+    __slots__ = ()
+
     def __init__(self, value: Union[Decimal, MacroVariable, Numeric], min_value: Optional[Union[int, float, Decimal]] =None, max_value: Optional[Union[int, float, Decimal]] =None, precision: Optional[int] =None, rules: Optional[List[Rule]]=None):
         super().__init__(F, value, min_value=min_value, max_value=max_value, precision=precision, rules=rules)
         
 class GWord(AddressWord):
+    __slots__ = ()
+
     def __init__(self, value: Union[Decimal, MacroVariable, Numeric], min_value: Optional[Union[int, float, Decimal]] =None, max_value: Optional[Union[int, float, Decimal]] =None, precision: Optional[int] =None, rules: Optional[List[Rule]]=None):
         super().__init__(G, value, min_value=min_value, max_value=max_value, precision=precision, rules=rules)
         
 class HWord(AddressWord):
+    __slots__ = ()
+
     def __init__(self, value: Union[Decimal, MacroVariable, Numeric], min_value: Optional[Union[int, float, Decimal]] =None, max_value: Optional[Union[int, float, Decimal]] =None, precision: Optional[int] =None, rules: Optional[List[Rule]]=None):
         super().__init__(H, value, min_value=min_value, max_value=max_value, precision=precision, rules=rules)
 
 class LWord(AddressWord):
+    __slots__ = ()
+
     def __init__(self, value: Union[Decimal, MacroVariable, Numeric], min_value: Optional[Union[int, float, Decimal]] =None, max_value: Optional[Union[int, float, Decimal]] =None, precision: Optional[int] =None, rules: Optional[List[Rule]]=None):
         super().__init__(L, value, min_value=min_value, max_value=max_value, precision=precision, rules=rules)
         
 class PWord(AddressWord):
+    __slots__ = ()
+
     def __init__(self, value: Union[Decimal, MacroVariable, Numeric], min_value: Optional[Union[int, float, Decimal]] =None, max_value: Optional[Union[int, float, Decimal]] =None, precision: Optional[int] =None, rules: Optional[List[Rule]]=None):
         super().__init__(P, value, min_value=min_value, max_value=max_value, precision=precision, rules=rules)
         
 class SWord(AddressWord):
+    __slots__ = ()
+
     def __init__(self, value: Union[Decimal, MacroVariable, Numeric], min_value: Optional[Union[int, float, Decimal]] =None, max_value: Optional[Union[int, float, Decimal]] =None, precision: Optional[int] =None, rules: Optional[List[Rule]]=None):
         super().__init__(S, value, min_value=min_value, max_value=max_value, precision=precision, rules=rules)
         
 class TWord(AddressWord):
+    __slots__ = ()
+
     def __init__(self, value: Union[Decimal, MacroVariable, Numeric], min_value: Optional[Union[int, float, Decimal]] =None, max_value: Optional[Union[int, float, Decimal]] =None, precision: Optional[int] =None, rules: Optional[List[Rule]]=None):
         super().__init__(T, value, min_value=min_value, max_value=max_value, precision=precision, rules=rules)
 
 class MotionWord(GWord):
+    __slots__ = ()
+    CLASS_RULES = (ExcludeModalGroup(ModalGroup.MOTION),)
+
     def __init__(self, value: Union[Decimal, MacroVariable, Numeric], rules: Optional[List[Rule]]=None):
-        rules = rules if rules is not None else []
-        rules.append(ExcludeModalGroup(ModalGroup.MOTION))
         super().__init__(value, min_value=value, max_value=value, precision=0, rules=rules)
 
 class G00(MotionWord):
+    __slots__ = ()
+    FLYWEIGHT = True
+    CLASS_RULES = (RequireOneOfAddresses([X, Y, Z, A]),)
+
     def __init__(self):
-        rules = [RequireOneOfAddresses([X, Y, Z, A])]
-        super().__init__(Decimal(0), rules=rules)
+        super().__init__(Decimal(0))
 
 class G01(MotionWord):
+    __slots__ = ()
+    FLYWEIGHT = True
+    CLASS_RULES = (RequireOneOfAddresses([X, Y, Z, A]), RequireAddress(F))
+
     def __init__(self):
-        axis_require_rule = RequireOneOfAddresses([X, Y, Z, A])
-        require_f_rule = RequireAddress(F)
-        rules = [axis_require_rule, require_f_rule]
-        super().__init__(Decimal(1), rules=rules)
+        super().__init__(Decimal(1))
 
 class G02(MotionWord):
+    __slots__ = ()
+    FLYWEIGHT = True
+    CLASS_RULES = (RequireAddress(F), RequireOneOfAddresses([X, Y, Z, I, J, K]))
+
     def __init__(self):
-        require_f_rule = RequireAddress(F)
-        axis_require_rule = RequireOneOfAddresses([X, Y, Z, I, J, K])
-        rules = [require_f_rule, axis_require_rule]
-        super().__init__(Decimal(2), rules=rules)
+        super().__init__(Decimal(2))
 
 class G03(MotionWord):
+    __slots__ = ()
+    FLYWEIGHT = True
+    CLASS_RULES = (RequireAddress(F), RequireOneOfAddresses([X, Y, Z, I, J, K]))
+
     def __init__(self):
-        require_f_rule = RequireAddress(F)
-        axis_require_rule = RequireOneOfAddresses([X, Y, Z, I, J, K])
-        rules = [require_f_rule, axis_require_rule]
-        super().__init__(3, rules=rules)
+        super().__init__(3)
 
 class G04(GWord):
+    __slots__ = ()
+    FLYWEIGHT = True
+    CLASS_RULES = (RequireAddress(P),)
+
     def __init__(self):
-        rules = [RequireAddress(P)]
-        super().__init__(4, precision=0, rules=rules)
+        super().__init__(4, precision=0)
         
 class G43(GWord):
+    __slots__ = ()
+    FLYWEIGHT = True
+    CLASS_RULES = (RequireAddress(H),)
+
     def __init__(self):
-        rules = [RequireAddress(H)]
-        super().__init__(43, precision=0, rules=rules)
+        super().__init__(43, precision=0)
                 
 class MWord(AddressWord):
+    __slots__ = ()
+    CLASS_RULES = (LimitAddress(M, 1),)
+
     def __init__(self, value: Union[Decimal, MacroVariable, Numeric], rules: Optional[List[Rule]] =None):
-        rules = rules if rules is not None else []
-        rules.append(LimitAddress(M, 1))
         super().__init__(M, value, min_value=value, max_value=value, precision=0, rules=rules)
 
 class M00(MWord):
+    __slots__ = ()
+    FLYWEIGHT = True
+
     def __init__(self):
         super().__init__(0)
 
 class M01(MWord):
+    __slots__ = ()
+    FLYWEIGHT = True
+
     def __init__(self):
         super().__init__(1)
 
 class M02(MWord):
+    __slots__ = ()
+    FLYWEIGHT = True
+
     def __init__(self):
         super().__init__(2)
         
 class M03(MWord):
+    __slots__ = ()
+    FLYWEIGHT = True
+    CLASS_RULES = (RequireAddress(S),)
+
     def __init__(self):
-        rules = [RequireAddress(S)]
-        super().__init__(3, rules=rules)
+        super().__init__(3)
         
 class M04(MWord):
+    __slots__ = ()
+    FLYWEIGHT = True
+    CLASS_RULES = (RequireAddress(S),)
+
     def __init__(self):
-        rules = [RequireAddress(S)]
-        super().__init__(4, rules=rules)
+        super().__init__(4)
         
 class M05(MWord):
+    __slots__ = ()
+    FLYWEIGHT = True
+
     def __init__(self):
         super().__init__(5)
         
 class M06(MWord):
+    __slots__ = ()
+    FLYWEIGHT = True
+    CLASS_RULES = (RequireAddress(T),)
+
     def __init__(self):
-        rules = [RequireAddress(T)]
-        super().__init__(6, rules=rules)
+        super().__init__(6)
         
 class M99(MWord):
+    __slots__ = ()
+    FLYWEIGHT = True
+
     def __init__(self):
         super().__init__(99)
 
@@ -194,13 +268,20 @@ class ParameterRuleSet:
         return self.parameter_rules.get(param_value, self.default_rules)
 
 class CompoundWord(Word, ABC):
+    __slots__ = ('compound_address', 'numeric_rules', 'parameter_rule_set')
+
     def __init__(self, address: Address, value: Union[Decimal, MacroVariable, Numeric], compound_address: Address, parameter_rules=None, numeric_rules=None, default_rules=None):
-        super().__init__(address, value)
-        self.compound_address = compound_address
-        self.numeric_rules = numeric_rules or []
+        rules = self.rule_plan(compound_address, lambda: [RequireAddress(compound_address)])
+        super().__init__(address, value, rules=rules)
+        object.__setattr__(self, 'compound_address', compound_address)
+        object.__setattr__(self, 'numeric_rules', numeric_rules or [])
         parameter_rules = parameter_rules or []
-        self.parameter_rule_set = ParameterRuleSet(parameter_rules, default_rules)
-        self.rules.append(RequireAddress(compound_address))
+        object.__setattr__(self, 'parameter_rule_set', ParameterRuleSet(parameter_rules, default_rules))
+
+    def _key(self):
+        rule_set = self.parameter_rule_set
+        parameter_rules = tuple((param, tuple(rules)) for param, rules in rule_set.parameter_rules.items())
+        return super()._key() + (self.compound_address, tuple(self.numeric_rules), parameter_rules, tuple(rule_set.default_rules))
 
     def get_parameter(self, block):
         word = next((word for word in block if word.address == self.compound_address), None)
@@ -218,6 +299,16 @@ class CompoundWord(Word, ABC):
             if isinstance(rule, BlockRule):
                 rule.validate(block)
 
+    def check(self, histogram, checked=None):
+        param_word = histogram.first(self.compound_address)
+        if param_word is None:
+            raise ValueError(f"No {self.compound_address.letter()} address found in the block")
+        super().check(histogram, checked)
+        self.apply_numeric_rules(param_word.numeric)
+        param_value = int(param_word.numeric.value)
+        for rule in self.parameter_rule_set.get_rules_for_param(param_value):
+            rule.check(histogram)
+
     def validate(self, block):
         super().validate()
         param_word = self.get_parameter(block)
@@ -229,30 +320,38 @@ class CompoundWord(Word, ABC):
             rule.validate(block)
 
 class G65(CompoundWord):
+    __slots__ = ()
+    FLYWEIGHT = True
+    PARAMETER_RULES = {
+        9810: [
+            RequireOneOfAddresses([X, Y, Z]),
+            RequireAddress(F),
+        ],
+        9811: [RequireOneOfAddresses([X, Y, Z])],
+        9812: [RequireExactlyOneOfAddresses([X, Y])],
+        9814: [RequireAddress(D)],
+    }
+    NUMERIC_RULES = [NumericRangeRule(0, 99999)]
+    # Probing macros resident in the controller (O9810 protected move, O9832 probe on, ...)
+    RESIDENT_PROGRAMS = range(9800, 9900)
+
     def __init__(self):
         numeric_value = Numeric(65, precision=0, leading_zero=False)
-        parameter_rules = {
-            9810: [
-                RequireOneOfAddresses([X, Y, Z]),
-                RequireAddress(F),
-            ],
-            9811: [RequireOneOfAddresses([X, Y, Z])],
-            9812: [RequireExactlyOneOfAddresses([X, Y])],
-            9814: [RequireAddress(D)],
-        }
-        numeric_rules = [NumericRangeRule(0, 99999)]
-        default_rules = []
-        super().__init__(G, numeric_value, P, parameter_rules, numeric_rules, default_rules)
+        super().__init__(G, numeric_value, P, self.PARAMETER_RULES, self.NUMERIC_RULES, [])
 
 class G154(CompoundWord):
+    __slots__ = ()
+    FLYWEIGHT = True
+    NUMERIC_RULES = [NumericRangeRule(1, 99)]
+
     def __init__(self):
         numeric_value = Numeric(154, precision=0, leading_zero=False)
-        parameter_rules = {}
-        numeric_rules = [NumericRangeRule(1, 99)]
-        default_rules = []
-        super().__init__(G, numeric_value, P, parameter_rules, numeric_rules, default_rules)
+        super().__init__(G, numeric_value, P, {}, self.NUMERIC_RULES, [])
 
 class M98(CompoundWord):
+    __slots__ = ()
+    NUMERIC_RULES = [NumericRangeRule(1, 99999)]
+
     def __init__(self, subprogram_o_number, repeat_count=None):
         numeric_value = Numeric(98, precision=0)
         default_rules = [
@@ -260,5 +359,4 @@ class M98(CompoundWord):
         ]
         if repeat_count is not None:
             default_rules.append(LWord(repeat_count, min_value=1, max_value=9999))
-        numeric_rules = [NumericRangeRule(1, 99999)]
-        super().__init__(M, numeric_value, P, parameter_rules={}, numeric_rules=numeric_rules, default_rules=default_rules)
\ No newline at end of file
+        super().__init__(M, numeric_value, P, parameter_rules={}, numeric_rules=self.NUMERIC_RULES, default_rules=default_rules)
\ No newline at end of file